@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, Product, ProductImage, ProductVideo, Review, AnalyticsEvent
+from .models import Category, Product, ProductImage, ProductVideo, Review, AnalyticsEvent, AnalyticsDailyRollup, AnalyticsSpoolSegment, SearchSynonym
 
 
 class ProductImageInline(admin.TabularInline):
@@ -136,6 +136,13 @@ class ReviewAdmin(admin.ModelAdmin):
     display_name.short_description = 'Reviewer'
 
 
+@admin.register(SearchSynonym)
+class SearchSynonymAdmin(admin.ModelAdmin):
+    list_display = ['term', 'variants', 'is_active', 'updated_at']
+    list_filter = ['is_active']
+    search_fields = ['term', 'variants']
+
+
 @admin.register(AnalyticsEvent)
 class AnalyticsEventAdmin(admin.ModelAdmin):
     list_display = [
@@ -217,6 +224,35 @@ class AnalyticsEventAdmin(admin.ModelAdmin):
     metadata_formatted.short_description = 'Event Metadata'
 
 
+@admin.register(AnalyticsDailyRollup)
+class AnalyticsDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['day', 'event_type', 'product', 'source', 'count']
+    list_filter = ['event_type', 'day']
+    search_fields = ['product__name', 'source']
+    date_hierarchy = 'day'
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AnalyticsSpoolSegment)
+class AnalyticsSpoolSegmentAdmin(admin.ModelAdmin):
+    list_display = ['name', 'loaded_events', 'skipped_lines', 'offset', 'completed_at', 'updated_at']
+    list_filter = ['completed_at']
+    search_fields = ['name']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # Unregister technical framework models from Django Admin interface for store owner cleanliness
 from django.contrib.auth.models import Group
 from django.contrib.sites.models import Site
@@ -0,0 +1,68 @@
+"""
+Conditional GET (ETag / Last-Modified) for read endpoints.
+
+Views compute cheap validators, typically one small indexed query over
+updated_at columns, before any serialization. A request whose
+If-None-Match / If-Modified-Since still matches gets a 304 straight away.
+"""
+import hashlib
+
+from django.db.models import IntegerField, Subquery, Value
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Weak ETag over the given validator parts (weak: gzip and identity bodies share it)."""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def aggregate_subquery(queryset, aggregate, output_field=None):
+    """Wraps an aggregate over `queryset` as a scalar subquery usable in another query's annotations."""
+    return Subquery(
+        queryset.order_by().annotate(_group=Value(1, output_field=IntegerField())).values('_group').annotate(
+            value=aggregate
+        ).values('value')[:1],
+        output_field=output_field
+    )
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag/Last-Modified handling to a view's GET.
+
+    Subclasses implement get_validators(request, *args, **kwargs) returning
+    (etag, last_modified_datetime), or None to skip conditional handling
+    (e.g. when the object does not exist and the view will answer 404).
+    Views that define their own get() wrap it with conditional_get().
+    """
+
+    def get_validators(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        return self.conditional_get(request, super().get, *args, **kwargs)
+
+    def conditional_get(self, request, respond, *args, **kwargs):
+        """Answers 304 when the validators still match, otherwise returns respond(request, ...)."""
+        validators = self.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return respond(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            return self._set_validators(not_modified, etag, timestamp)
+
+        response = respond(request, *args, **kwargs)
+        if response.status_code == 200:
+            self._set_validators(response, etag, timestamp)
+        return response
+
+    def _set_validators(self, response, etag, timestamp):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
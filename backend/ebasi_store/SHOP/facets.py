@@ -0,0 +1,106 @@
+"""
+Facet counts for the shop filter sidebar.
+
+One grouped query returns product counts per combination of the facet values
+(category, badge, stock status, on-sale flag, price bucket, and whether the price
+is inside the requested range). Each facet is then summed in Python from those
+rows, applying every *other* selected facet filter, so a facet's counts show
+what selecting one of its values would return.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import BooleanField, Case, Count, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce
+
+from .filters import price_range_q
+
+
+def price_buckets():
+    """[(key, min, max)] for CATALOG_PRICE_BUCKETS; the last bucket has no max."""
+    bounds = sorted(settings.CATALOG_PRICE_BUCKETS)
+    lows = [0, *bounds]
+    highs = [*bounds, None]
+    return [(f"{low}-{high}" if high is not None else f"{low}+", low, high) for low, high in zip(lows, highs)]
+
+
+def _row_filters(params):
+    """Per-facet predicates over a grouped row for the facet filters selected in `params`."""
+    category = params.get('category') or None
+    badge = params.get('badge') or None
+    return {
+        'category': lambda row: category is None or row['facet_category_slug'] == category,
+        'badge': lambda row: badge is None or row['facet_badge'] == badge,
+        'stock_status': lambda row: params.get('in_stock') != 'true' or row['facet_stock_status'] == 'in_stock',
+        'on_sale': lambda row: params.get('on_sale') != 'true' or row['facet_on_sale'],
+        'price': lambda row: row['facet_in_price_range'],
+    }
+
+
+def compute_facets(queryset, params):
+    """
+    Returns {'total': int, 'facets': {...}} for `queryset` (active products with the
+    non-facet filters applied) and the facet filters selected in `params`.
+    """
+    buckets = price_buckets()
+    price_range = price_range_q(params)
+    dimensions = {
+        'facet_category_slug': F('category__slug'),
+        'facet_category_name': F('category__name'),
+        'facet_badge': Coalesce('badge', Value('')),
+        'facet_stock_status': F('stock_status'),
+        'facet_on_sale': Case(
+            When(compare_price__gt=F('price'), then=Value(True)), default=Value(False), output_field=BooleanField()
+        ),
+        'facet_price_bucket': Case(
+            *[When(price__lt=high, then=Value(position)) for position, (_, _, high) in enumerate(buckets[:-1])],
+            default=Value(len(buckets) - 1),
+            output_field=IntegerField()
+        ),
+        'facet_in_price_range': (
+            Case(When(price_range, then=Value(True)), default=Value(False), output_field=BooleanField())
+            if price_range is not None else Value(True, output_field=BooleanField())
+        ),
+    }
+    rows = list(queryset.order_by().annotate(**dimensions).values(*dimensions).annotate(count=Count('id')))
+
+    filters = _row_filters(params)
+    categories, badges, stock_statuses, on_sale, prices = Counter(), Counter(), Counter(), Counter(), Counter()
+    names = {}
+    total = 0
+    for row in rows:
+        passes = {facet: check(row) for facet, check in filters.items()}
+        failed = [facet for facet, ok in passes.items() if not ok]
+        if not failed:
+            total += row['count']
+        # A row counts toward a facet when every other facet's filter accepts it.
+        if not failed or failed == ['category']:
+            categories[row['facet_category_slug']] += row['count']
+            names[row['facet_category_slug']] = row['facet_category_name']
+        if (not failed or failed == ['badge']) and row['facet_badge']:
+            badges[row['facet_badge']] += row['count']
+        if not failed or failed == ['stock_status']:
+            stock_statuses[row['facet_stock_status']] += row['count']
+        if not failed or failed == ['on_sale']:
+            on_sale[row['facet_on_sale']] += row['count']
+        if not failed or failed == ['price']:
+            prices[row['facet_price_bucket']] += row['count']
+
+    def ranked(counter):
+        return sorted(counter.items(), key=lambda item: (-item[1], str(item[0])))
+
+    return {
+        'total': total,
+        'facets': {
+            'category': [
+                {'slug': slug, 'name': names[slug], 'count': count} for slug, count in ranked(categories)
+            ],
+            'badge': [{'value': value, 'count': count} for value, count in ranked(badges)],
+            'stock_status': [{'value': value, 'count': count} for value, count in ranked(stock_statuses)],
+            'on_sale': {'true': on_sale[True], 'false': on_sale[False]},
+            'price': [
+                {'key': key, 'min': low, 'max': high, 'count': prices[position]}
+                for position, (key, low, high) in enumerate(buckets)
+            ],
+        },
+    }
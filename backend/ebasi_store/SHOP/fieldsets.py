@@ -0,0 +1,68 @@
+"""
+Sparse fieldsets for product endpoints.
+
+`?fields=id,name,price` serializes only the listed fields and `?view=grid` picks
+a named preset declared by the view. `id` is always included. Views check
+`wants_field()` before prefetching or annotating, so a relation that is not
+rendered is not loaded either. Only reads are affected; writes still return
+the full representation.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+class SparseFieldsetSerializerMixin:
+    """Drops every field not in `context['sparse_fields']` (when set)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        names = self.context.get('sparse_fields')
+        if names is not None:
+            for name in set(self.fields) - names:
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Parses ?fields= / ?view= for a view whose serializer uses
+    SparseFieldsetSerializerMixin. Views declare their presets in
+    `field_presets`, e.g. {'grid': ('id', 'name', 'price')}.
+    """
+    field_presets = {}
+
+    def get_sparse_fields(self):
+        """The requested field names, or None for the full representation."""
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self._parse_sparse_fields()
+        return self._sparse_fields
+
+    def _parse_sparse_fields(self):
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None
+        params = self.request.query_params
+        preset = params.get('view', '')
+        requested = [name.strip() for name in params.get('fields', '').split(',') if name.strip()]
+        if not preset and not requested:
+            return None
+
+        names = set(requested)
+        if preset:
+            if preset not in self.field_presets:
+                raise ValidationError({'view': f"Unknown view '{preset}'. Choose from: {', '.join(sorted(self.field_presets))}."})
+            names.update(self.field_presets[preset])
+        available = set(self.get_serializer_class().Meta.fields)
+        unknown = names - available
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}."})
+        names.add('id')
+        return frozenset(names)
+
+    def wants_field(self, *names):
+        """True when any of `names` will be rendered."""
+        fields = self.get_sparse_fields()
+        return fields is None or any(name in fields for name in names)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse_fields'] = self.get_sparse_fields()
+        return context
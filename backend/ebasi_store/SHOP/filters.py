@@ -0,0 +1,53 @@
+"""
+Storefront catalog filters shared by the product list and the facet counts.
+"""
+from django.db.models import F, Q
+
+# Query params read by apply_catalog_filters.
+CATALOG_FILTER_PARAMS = ('category', 'min_price', 'max_price', 'badge', 'in_stock', 'on_sale', 'is_featured')
+
+# Filters that are also facets (SHOP.facets counts each without its own filter).
+FACET_FILTERS = ('category', 'badge', 'in_stock', 'on_sale', 'price')
+
+
+def price_range_q(params):
+    """Q for ?min_price= / ?max_price=, or None when neither is given."""
+    condition = Q()
+    min_price = params.get('min_price', None)
+    if min_price:
+        condition &= Q(price__gte=min_price)
+    max_price = params.get('max_price', None)
+    if max_price:
+        condition &= Q(price__lte=max_price)
+    return condition or None
+
+
+def apply_catalog_filters(queryset, params, skip=()):
+    """
+    Applies ?category= (slug), ?min_price=, ?max_price=, ?badge=, ?in_stock=true,
+    ?on_sale=true and ?is_featured=true. Filters named in `skip` (see FACET_FILTERS)
+    are left out.
+    """
+    category_slug = params.get('category', None)
+    if category_slug and 'category' not in skip:
+        queryset = queryset.filter(category__slug=category_slug)
+
+    if 'price' not in skip:
+        price_range = price_range_q(params)
+        if price_range is not None:
+            queryset = queryset.filter(price_range)
+
+    badge = params.get('badge', None)
+    if badge and 'badge' not in skip:
+        queryset = queryset.filter(badge=badge)
+
+    if params.get('in_stock', None) == 'true' and 'in_stock' not in skip:
+        queryset = queryset.filter(stock_status='in_stock')
+
+    if params.get('on_sale', None) == 'true' and 'on_sale' not in skip:
+        queryset = queryset.filter(compare_price__gt=F('price'))
+
+    if params.get('is_featured', None) == 'true' and 'is_featured' not in skip:
+        queryset = queryset.filter(is_featured=True)
+
+    return queryset
@@ -0,0 +1,305 @@
+"""
+Typo-tolerant, transliteration-aware product search.
+
+Queries and product names are compared as spelling-folded text (SHOP.text), by
+trigram similarity, so "mekhla", "mekela sador" and "jokasiba" still find
+"Mekhela Chador" and "Jokaxiba". Candidates come from:
+
+- product names: on PostgreSQL, pg_trgm word similarity over Product.search_text
+  (GIN-indexed); elsewhere, each query word is corrected against a trigram index
+  of the catalog's vocabulary (SearchWordTrigram), and products are scored by
+  the corrected words their names contain;
+- category names and curated SearchSynonym variants, matched in memory
+  (both lists are small and cached).
+
+Every search runs under a time budget (FUZZY_SEARCH_BUDGET_MS); a search that
+runs out of time returns the candidates found so far.
+"""
+import logging
+import math
+import operator
+import time
+from contextlib import contextmanager
+from functools import reduce
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.db.models import BooleanField, Case, Count, FloatField, Q, Value, When
+from django.db.models.functions import Concat
+from django.db.models.expressions import RawSQL
+
+from .models import Category, Product, SearchSynonym, SearchWordTrigram
+from .text import fold_text, phrase_similarity, similarity, trigrams
+
+logger = logging.getLogger(__name__)
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    'CREATE INDEX IF NOT EXISTS "SHOP_product_search_text_trgm" ON "SHOP_product" USING GIN (search_text gin_trgm_ops)',
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS "SHOP_product_search_text_trgm"',
+]
+
+VOCABULARY_CACHE_KEY = 'shop:fuzzy_vocabulary'
+VOCABULARY_CACHE_TTL = 3600
+
+# Matches through a category name or a synonym rank slightly below direct name matches.
+CATEGORY_MATCH_WEIGHT = 0.8
+SYNONYM_MATCH_WEIGHT = 0.9
+
+MAX_QUERY_LENGTH = 100
+MAX_QUERY_WORDS = 6
+# Vocabulary words each query word may be corrected to.
+MAX_CORRECTIONS = 5
+
+
+def uses_word_index(conn=None):
+    return (conn or connection).vendor != 'postgresql'
+
+
+def vocabulary_rows(words):
+    """SearchWordTrigram rows for the indexable words in `words` (numbers and codes are skipped)."""
+    return [
+        SearchWordTrigram(word=word, trigram=gram)
+        for word in set(words) if word.isalpha() and len(word) <= 64
+        for gram in trigrams(word)
+    ]
+
+
+def index_words(search_text):
+    """Adds the words of a product's search_text to the vocabulary index."""
+    SearchWordTrigram.objects.bulk_create(vocabulary_rows(search_text.split()), ignore_conflicts=True)
+
+
+def install_fuzzy_index(conn):
+    """Creates (idempotently) the pg_trgm index on PostgreSQL; other databases use SearchWordTrigram."""
+    if conn.vendor != 'postgresql':
+        return False
+    with conn.cursor() as cursor:
+        for statement in POSTGRES_FORWARD:
+            cursor.execute(statement)
+    return True
+
+
+def uninstall_fuzzy_index(conn):
+    if conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cursor:
+        for statement in POSTGRES_BACKWARD:
+            cursor.execute(statement)
+
+
+@transaction.atomic
+def rebuild_fuzzy_index(batch_size=500):
+    """
+    Re-derives Product.search_text for every product (bulk updates skip Product.save)
+    and rebuilds the vocabulary index where it is used, dropping words no product
+    uses any more. Returns the number of products whose search_text was stale.
+    """
+    stale, words = [], set()
+    updated = 0
+    for product in Product.objects.only('id', 'name', 'search_text').order_by('pk').iterator(chunk_size=batch_size):
+        folded = fold_text(product.name)[:400]
+        words.update(folded.split())
+        if folded != product.search_text:
+            product.search_text = folded
+            stale.append(product)
+            updated += 1
+        if len(stale) >= batch_size:
+            Product.objects.bulk_update(stale, ['search_text'])
+            stale.clear()
+    Product.objects.bulk_update(stale, ['search_text'])
+
+    if uses_word_index():
+        SearchWordTrigram.objects.all().delete()
+        SearchWordTrigram.objects.bulk_create(vocabulary_rows(words), batch_size=2000)
+    return updated
+
+
+def word_trigrams(folded):
+    return [trigrams(word) for word in folded.split()]
+
+
+def get_fuzzy_vocabulary():
+    """Per-word trigrams of active category names and synonym variants, cached until either changes."""
+    vocabulary = cache.get(VOCABULARY_CACHE_KEY)
+    if vocabulary is None:
+        synonyms = []
+        for synonym in SearchSynonym.objects.filter(is_active=True):
+            term = fold_text(synonym.term)
+            for variant in synonym.variant_list():
+                synonyms.append((word_trigrams(fold_text(variant)), term))
+        vocabulary = {
+            'categories': [
+                (category_id, word_trigrams(fold_text(name)))
+                for category_id, name in Category.objects.filter(is_active=True).values_list('id', 'name')
+            ],
+            'synonyms': synonyms,
+        }
+        cache.set(VOCABULARY_CACHE_KEY, vocabulary, VOCABULARY_CACHE_TTL)
+    return vocabulary
+
+
+def invalidate_fuzzy_vocabulary():
+    cache.delete(VOCABULARY_CACHE_KEY)
+
+
+@contextmanager
+def query_budget(milliseconds):
+    """Aborts queries that run past `milliseconds` with OperationalError."""
+    if connection.vendor == 'sqlite':
+        connection.ensure_connection()
+        deadline = time.monotonic() + milliseconds / 1000
+        raw_connection = connection.connection
+        raw_connection.set_progress_handler(lambda: time.monotonic() > deadline, 100)
+        try:
+            yield
+        finally:
+            raw_connection.set_progress_handler(None, 0)
+    elif connection.vendor == 'postgresql':
+        # SET LOCAL is undone with the savepoint if the budget is exceeded.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL statement_timeout = %s", [int(milliseconds)])
+            yield
+            cursor.execute("SET LOCAL statement_timeout TO DEFAULT")
+    else:
+        yield
+
+
+class WordIndexBackend:
+    """Corrects query words against SearchWordTrigram, then scores products by the corrected words they contain."""
+    name = 'word-trigrams'
+
+    def corrections(self, word, threshold):
+        """Up to MAX_CORRECTIONS vocabulary words as (word, similarity), best first."""
+        grams = trigrams(word)
+        # similarity = hits / (|query| + |word| - hits) <= hits / |query|
+        min_hits = max(1, math.ceil(len(grams) * threshold))
+        candidates = SearchWordTrigram.objects.filter(trigram__in=grams).values('word').annotate(
+            hits=Count('id')
+        ).filter(hits__gte=min_hits).order_by('-hits', 'word')[:MAX_CORRECTIONS * 10]
+        scored = []
+        for row in candidates:
+            score = similarity(grams, trigrams(row['word']))
+            if score >= threshold:
+                scored.append((row['word'], score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:MAX_CORRECTIONS]
+
+    def name_matches(self, queryset, folded, threshold, limit):
+        words = folded.split()[:MAX_QUERY_WORDS]
+        per_word = [self.corrections(word, threshold) for word in words]
+        corrections = [correction for matches in per_word for correction in matches]
+        if not corrections:
+            return []
+        # Each query word scores its best corrected word present in the name; the
+        # product's score is the average over the query words.
+        score = sum(
+            (
+                Case(
+                    *[When(padded_search_text__contains=f" {word} ", then=Value(score)) for word, score in matches],
+                    default=Value(0.0),
+                    output_field=FloatField()
+                )
+                for matches in per_word if matches
+            ),
+            Value(0.0, output_field=FloatField())
+        ) / Value(float(len(words)), output_field=FloatField())
+        contains_any = reduce(operator.or_, (Q(padded_search_text__contains=f" {word} ") for word, _ in corrections))
+        return list(queryset.annotate(
+            padded_search_text=Concat(Value(' '), 'search_text', Value(' '))
+        ).filter(contains_any).annotate(fuzzy_score=score).filter(
+            fuzzy_score__gte=threshold
+        ).order_by('-fuzzy_score', 'pk').values_list('pk', 'fuzzy_score')[:limit])
+
+
+class PostgresTrigramBackend:
+    """pg_trgm word similarity, served by the GIN index on search_text."""
+    name = 'pg_trgm'
+
+    def name_matches(self, queryset, folded, threshold, limit):
+        column = f'"{Product._meta.db_table}"."search_text"'
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL pg_trgm.word_similarity_threshold = %s", [threshold])
+            matches = list(queryset.filter(
+                RawSQL(f"%s <%% {column}", (folded,), output_field=BooleanField())
+            ).annotate(
+                fuzzy_score=RawSQL(f"word_similarity(%s, {column})", (folded,), output_field=FloatField())
+            ).order_by('-fuzzy_score', 'pk').values_list('pk', 'fuzzy_score')[:limit])
+            cursor.execute("SET LOCAL pg_trgm.word_similarity_threshold TO DEFAULT")
+        return matches
+
+
+def get_fuzzy_backend():
+    return PostgresTrigramBackend() if connection.vendor == 'postgresql' else WordIndexBackend()
+
+
+def _vocabulary_matches(query_words, threshold):
+    """Returns ({category_id: similarity}, {synonym term: similarity}) for the query's word trigrams."""
+    def match(words):
+        # Either the query is (part of) the name, or the name is part of the query.
+        return max(phrase_similarity(query_words, words), phrase_similarity(words, query_words))
+
+    vocabulary = get_fuzzy_vocabulary()
+    categories = {}
+    for category_id, words in vocabulary['categories']:
+        score = match(words)
+        if score >= threshold:
+            categories[category_id] = score
+    terms = {}
+    for words, term in vocabulary['synonyms']:
+        score = match(words)
+        if score >= threshold and score > terms.get(term, 0):
+            terms[term] = score
+    return categories, terms
+
+
+def fuzzy_search_products(queryset, query):
+    """
+    Filters a product queryset to fuzzy matches for `query`, annotated with
+    `search_rank` (0..1, higher is better).
+    """
+    no_matches = queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    folded = fold_text(query[:MAX_QUERY_LENGTH])
+    if not folded:
+        return no_matches
+
+    threshold = settings.FUZZY_SEARCH_THRESHOLD
+    limit = settings.FUZZY_SEARCH_MAX_RESULTS
+    backend = get_fuzzy_backend()
+    scores = {}
+
+    def collect(matches, weight=1.0):
+        for product_id, score in matches:
+            scores[product_id] = max(scores.get(product_id, 0), score * weight)
+
+    started = time.monotonic()
+    try:
+        with query_budget(settings.FUZZY_SEARCH_BUDGET_MS):
+            categories, terms = _vocabulary_matches(word_trigrams(folded), threshold)
+            collect(backend.name_matches(queryset, folded, threshold, limit))
+            for term, score in sorted(terms.items(), key=lambda item: -item[1])[:3]:
+                if term != folded:
+                    collect(backend.name_matches(queryset, term, threshold, limit), SYNONYM_MATCH_WEIGHT * score)
+            for category_id, score in categories.items():
+                products = queryset.filter(category_id=category_id).order_by().values_list('pk', flat=True)[:limit]
+                collect(((product_id, 1.0) for product_id in products), CATEGORY_MATCH_WEIGHT * score)
+    except OperationalError:
+        logger.warning(
+            "Fuzzy search for %r exceeded its %sms budget after %.0fms; returning %s partial matches.",
+            query, settings.FUZZY_SEARCH_BUDGET_MS, (time.monotonic() - started) * 1000, len(scores)
+        )
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+    if not ranked:
+        return no_matches
+    return queryset.filter(pk__in=[product_id for product_id, _ in ranked]).annotate(
+        search_rank=Case(
+            *[When(pk=product_id, then=Value(round(score, 4))) for product_id, score in ranked],
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+    )
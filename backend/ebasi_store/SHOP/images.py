@@ -0,0 +1,239 @@
+"""
+Responsive image derivatives for uploaded photos.
+
+Staff upload full-size phone photos. When a registered image field receives a
+new upload, the file is re-encoded with Pillow into WebP/AVIF copies at
+IMAGE_DERIVATIVE_WIDTHS (never upscaled). EXIF is dropped after applying its
+orientation; the ICC profile is kept. The result is recorded in the model's
+`<field>_derivatives` JSON field:
+
+    {"source": "products/a.jpg", "width": 3000, "height": 4000,
+     "variants": [{"format": "webp", "width": 320, "height": 427,
+                   "name": "products/derivatives/a-320w.webp", "size": 18012}, ...]}
+
+Serializers expose it as a srcset (see SHOP.serializers.image_sources).
+Uploads are encoded once their save commits, on a background thread unless
+IMAGE_DERIVATIVE_BACKGROUND is off, so neither the upload response nor a
+rolled-back save writes variant files. Existing images, and uploads whose
+worker exited before encoding finished, are backfilled with
+`manage.py generate_image_derivatives`.
+
+Writing a record bumps the owner's `updated_at` (when it has one) and sends
+`derivatives_updated`, so receivers can purge cached responses that were built
+while the derivatives were still being encoded. Variant files of a replaced,
+regenerated or deleted image are removed once the change commits.
+"""
+import logging
+import posixpath
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_DIR = 'derivatives'
+# Encoder quality per format (AVIF looks as good as WebP at a lower setting).
+QUALITY = {'webp': 80, 'avif': 55}
+
+# (model, field name) pairs registered with register_derivatives().
+registry = []
+
+# Sent with the model as sender and `instance`, `field_name` after a record is written.
+derivatives_updated = Signal()
+
+
+def derivative_formats():
+    """IMAGE_DERIVATIVE_FORMATS that this Pillow build can encode."""
+    return [fmt for fmt in settings.IMAGE_DERIVATIVE_FORMATS if fmt in QUALITY and features.check(fmt)]
+
+
+def derivative_widths(width):
+    """Configured widths below `width`, plus `width` itself capped at the largest configured one."""
+    configured = sorted(settings.IMAGE_DERIVATIVE_WIDTHS)
+    if not configured:
+        return []
+    return sorted({target for target in configured if target < width} | {min(width, configured[-1])})
+
+
+def _derivative_name(source, width, fmt):
+    folder, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(folder, DERIVATIVE_DIR, f"{stem}-{width}w.{fmt}")
+
+
+def _load(field_file):
+    with field_file.storage.open(field_file.name, 'rb') as handle:
+        image = Image.open(handle)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    icc_profile = image.info.get('icc_profile')
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    image.info = {}
+    return image, icc_profile
+
+
+def generate_derivatives(field_file):
+    """
+    Encodes and stores the derivatives of `field_file`, returning the record
+    described in the module docstring, or {} when the file is not a raster
+    image Pillow can read.
+    """
+    if not field_file:
+        return {}
+    try:
+        image, icc_profile = _load(field_file)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning(f"Skipping image derivatives for {field_file.name}: {e}")
+        return {}
+
+    width, height = image.size
+    formats = derivative_formats()
+    variants = []
+    for target in derivative_widths(width):
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))), Image.Resampling.LANCZOS
+        )
+        for fmt in formats:
+            # A failed variant (encoder or storage error) is skipped rather than failing
+            # the upload, whose row is already saved; serializers only list stored ones.
+            try:
+                variants.append(_encode_variant(field_file, resized, target, fmt, icc_profile))
+            except Exception:
+                logger.exception(f"Could not store the {target}w {fmt} derivative of {field_file.name}")
+    return {'source': field_file.name, 'width': width, 'height': height, 'variants': variants}
+
+
+def _encode_variant(field_file, image, target, fmt, icc_profile):
+    buffer = BytesIO()
+    options = {'quality': QUALITY[fmt]}
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    image.save(buffer, format=fmt.upper(), **options)
+    name = field_file.storage.save(_derivative_name(field_file.name, target, fmt), ContentFile(buffer.getvalue()))
+    return {'format': fmt, 'width': image.width, 'height': image.height, 'name': name, 'size': buffer.tell()}
+
+
+def delete_variants_on_commit(storage, record, keep=()):
+    """Deletes the variant files listed in `record` (except `keep`) once the transaction commits."""
+    names = [variant['name'] for variant in (record or {}).get('variants', ()) if variant['name'] not in keep]
+    if not names:
+        return
+
+    def delete():
+        for name in names:
+            try:
+                storage.delete(name)
+            except Exception:
+                logger.exception(f"Could not delete image derivative {name}")
+
+    transaction.on_commit(delete)
+
+
+def refresh_derivatives(instance, field_name):
+    """
+    Regenerates and saves `<field_name>_derivatives` for one instance (without
+    calling save()), deletes the variants of the record it replaces and sends
+    `derivatives_updated`. If the stored file changed while encoding, the new
+    variants are discarded and {} is returned.
+    """
+    model = type(instance)
+    field_file = getattr(instance, field_name)
+    storage = model._meta.get_field(field_name).storage
+    derivatives_field = f"{field_name}_derivatives"
+    previous = getattr(instance, derivatives_field)
+    record = generate_derivatives(field_file)
+
+    changes = {derivatives_field: record}
+    timestamped = any(field.name == 'updated_at' for field in model._meta.concrete_fields)
+    if timestamped:
+        # Validators (ETags) must change now that the rendered sources do.
+        changes['updated_at'] = timezone.now()
+    current_file = {field_name: field_file.name} if field_file else {}
+    if not model._default_manager.filter(pk=instance.pk, **current_file).update(**changes):
+        # Deleted or given another file meanwhile; that change handles its own derivatives.
+        delete_variants_on_commit(storage, record)
+        return {}
+    setattr(instance, derivatives_field, record)
+    if timestamped:
+        instance.updated_at = changes['updated_at']
+
+    delete_variants_on_commit(storage, previous, keep={variant['name'] for variant in record.get('variants', ())})
+    derivatives_updated.send(sender=model, instance=instance, field_name=field_name)
+    return record
+
+
+def _refresh_in_background(instance, field_name):
+    try:
+        refresh_derivatives(instance, field_name)
+    except Exception:
+        logger.exception(f"Could not generate image derivatives for {instance._meta.label} {instance.pk}")
+    finally:
+        connections.close_all()
+
+
+def refresh_derivatives_on_commit(instance, field_name):
+    """
+    refresh_derivatives() once the current transaction commits: on a background
+    thread, or inline when IMAGE_DERIVATIVE_BACKGROUND is off.
+    """
+    def refresh():
+        if settings.IMAGE_DERIVATIVE_BACKGROUND:
+            threading.Thread(
+                target=_refresh_in_background, args=(instance, field_name), name='image-derivatives', daemon=True
+            ).start()
+        else:
+            refresh_derivatives(instance, field_name)
+
+    transaction.on_commit(refresh)
+
+
+def register_derivatives(model, *field_names):
+    """
+    Generates derivatives whenever one of `field_names` on `model` is saved with a
+    newly uploaded file. The model needs a `<field>_derivatives` JSONField per field.
+    """
+    registry.extend((model, field_name) for field_name in field_names)
+
+    def mark_uploads(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        pending, stale = [], []
+        for field_name in field_names:
+            field_file = getattr(instance, field_name)
+            record = getattr(instance, f"{field_name}_derivatives")
+            if not getattr(field_file, '_committed', True):
+                pending.append(field_name)
+            elif record.get('source') == (field_file.name or None):
+                continue
+            # A new upload, or replaced by an existing file name or cleared: the record is stale.
+            stale.append((field_name, record))
+            setattr(instance, f"{field_name}_derivatives", {})
+        instance._pending_derivatives = pending
+        instance._stale_derivatives = stale
+
+    def process_uploads(sender, instance, raw=False, **kwargs):
+        for field_name, record in getattr(instance, '_stale_derivatives', ()):
+            delete_variants_on_commit(model._meta.get_field(field_name).storage, record)
+        for field_name in getattr(instance, '_pending_derivatives', ()):
+            refresh_derivatives_on_commit(instance, field_name)
+        instance._pending_derivatives = instance._stale_derivatives = ()
+
+    def delete_derivatives(sender, instance, **kwargs):
+        for field_name in field_names:
+            delete_variants_on_commit(
+                model._meta.get_field(field_name).storage, getattr(instance, f"{field_name}_derivatives")
+            )
+
+    label = model._meta.label
+    pre_save.connect(mark_uploads, sender=model, weak=False, dispatch_uid=f"derivatives-pre-{label}")
+    post_save.connect(process_uploads, sender=model, weak=False, dispatch_uid=f"derivatives-post-{label}")
+    post_delete.connect(delete_derivatives, sender=model, weak=False, dispatch_uid=f"derivatives-delete-{label}")
@@ -0,0 +1,379 @@
+"""
+Analytics ingestion paths for TrackAnalyticsEventView.
+
+settings.ANALYTICS_INGEST_MODE selects how validated events are persisted:
+
+- 'sync'     (default) insert on the request thread.
+- 'buffered' queue in a bounded in-process buffer; a background thread writes
+             them with bulk_create once the buffer reaches a size threshold or
+             a time interval elapses, and on worker shutdown.
+- 'spool'    append them as JSON lines to a per-process segment file under
+             settings.ANALYTICS_SPOOL_DIR without touching the database.
+             Segments rotate by size or age and are bulk-loaded later by
+             `manage.py load_analytics_spool`.
+"""
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AnalyticsEvent, AnalyticsSpoolSegment
+from .serializers import resolve_event_products
+
+logger = logging.getLogger(__name__)
+
+INGEST_MODES = ('sync', 'buffered', 'spool')
+
+# Segments are written as "<host>-<pid>-<ns>.open" and renamed to ".jsonl" once
+# closed; only closed segments are ever loaded.
+SPOOL_OPEN_SUFFIX = '.open'
+SPOOL_READY_SUFFIX = '.jsonl'
+SPOOL_EVENT_FIELDS = (
+    'event_type', 'product_id', 'product_name', 'path',
+    'search_query', 'source', 'session_id', 'metadata',
+)
+
+
+def get_ingest_mode():
+    mode = getattr(settings, 'ANALYTICS_INGEST_MODE', 'sync')
+    return mode if mode in INGEST_MODES else 'sync'
+
+
+class EventBuffer:
+    """
+    Bounded, thread-safe buffer of unsaved AnalyticsEvent instances.
+    Events submitted while the buffer is full are dropped and counted.
+    """
+
+    def __init__(self, max_events=5000, flush_size=200, flush_interval=2.0, batch_size=500):
+        self.max_events = max_events
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+        self._last_drop_warning = 0.0
+
+        self.accepted = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+
+    def submit(self, events):
+        """Queues events for a later bulk insert. Returns the number accepted."""
+        self._ensure_flusher()
+        with self._lock:
+            space = max(0, self.max_events - len(self._events))
+            accepted = events[:space]
+            rejected = len(events) - len(accepted)
+            self._events.extend(accepted)
+            self.accepted += len(accepted)
+            self.dropped += rejected
+            pending = len(self._events)
+
+        if rejected:
+            self._warn_dropped(rejected)
+        if pending >= self.flush_size:
+            self._wakeup.set()
+        return len(accepted)
+
+    def flush(self):
+        """Writes every queued event to the database. Returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._events)
+                self._events.clear()
+            if not batch:
+                return 0
+
+            try:
+                AnalyticsEvent.objects.bulk_create(batch, batch_size=self.batch_size)
+            except Exception:
+                self.failed += len(batch)
+                logger.exception("Failed to flush %d buffered analytics events", len(batch))
+                return 0
+
+            self.flushed += len(batch)
+            return len(batch)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._events)
+        return {
+            'pending': pending,
+            'accepted': self.accepted,
+            'dropped': self.dropped,
+            'flushed': self.flushed,
+            'failed': self.failed,
+        }
+
+    def _warn_dropped(self, count):
+        now = time.monotonic()
+        if now - self._last_drop_warning >= 60:
+            self._last_drop_warning = now
+            logger.warning(
+                "Analytics buffer full (%d events): dropped %d events (%d dropped since start)",
+                self.max_events, count, self.dropped
+            )
+
+    def _ensure_flusher(self):
+        if os.getpid() != self._pid:
+            # Forked worker: the parent's thread and lock state do not carry over.
+            self.__init__(self.max_events, self.flush_size, self.flush_interval, self.batch_size)
+        if not self.flush_interval or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='analytics-event-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+_event_buffer = None
+_event_buffer_lock = threading.Lock()
+
+
+def get_event_buffer():
+    """Returns the process-wide EventBuffer configured from settings."""
+    global _event_buffer
+    if _event_buffer is None:
+        with _event_buffer_lock:
+            if _event_buffer is None:
+                _event_buffer = EventBuffer(
+                    max_events=getattr(settings, 'ANALYTICS_BUFFER_MAX_EVENTS', 5000),
+                    flush_size=getattr(settings, 'ANALYTICS_BUFFER_FLUSH_SIZE', 200),
+                    flush_interval=getattr(settings, 'ANALYTICS_BUFFER_FLUSH_INTERVAL', 2.0),
+                )
+                # Write out whatever is still queued when the worker shuts down.
+                atexit.register(_event_buffer.flush)
+    return _event_buffer
+
+
+class SpoolWriter:
+    """
+    Appends validated events to a per-process segment file, one JSON object per
+    line. A segment is closed (fsynced and renamed to .jsonl) once it reaches
+    `segment_bytes` or is older than `segment_seconds` when the next write arrives.
+    """
+
+    def __init__(self, directory, segment_bytes=16 * 1024 * 1024, segment_seconds=60):
+        self.directory = str(directory)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._size = 0
+
+        self.written = 0
+        self.segments = 0
+
+    def append(self, records):
+        """Writes records (dicts of SPOOL_EVENT_FIELDS plus created_at). Returns the number written."""
+        if not records:
+            return 0
+        data = ''.join(
+            json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+            for record in records
+        ).encode('utf-8')
+
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Forked worker: keep the parent's segment for the parent.
+                self._pid = os.getpid()
+                self._file = None
+            if self._file is not None and self._segment_expired():
+                self._close_segment()
+            if self._file is None:
+                self._open_segment()
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+            self.written += len(records)
+            if self._size >= self.segment_bytes:
+                self._close_segment()
+        return len(records)
+
+    def close(self):
+        """Closes the current segment so the loader can pick it up."""
+        with self._lock:
+            if os.getpid() == self._pid:
+                self._close_segment()
+
+    def _segment_expired(self):
+        return time.monotonic() - self._opened_at >= self.segment_seconds
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{socket.gethostname()}-{self._pid}-{time.time_ns()}"
+        self._path = os.path.join(self.directory, name + SPOOL_OPEN_SUFFIX)
+        self._file = open(self._path, 'ab')
+        self._opened_at = time.monotonic()
+        self._size = 0
+        self.segments += 1
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        try:
+            os.fsync(self._file.fileno())
+        finally:
+            self._file.close()
+        try:
+            os.replace(self._path, self._path[:-len(SPOOL_OPEN_SUFFIX)] + SPOOL_READY_SUFFIX)
+        except FileNotFoundError:
+            # Already claimed by the loader as a stale segment.
+            pass
+        self._file = None
+        self._path = None
+
+
+_spool_writer = None
+_spool_writer_lock = threading.Lock()
+
+
+def get_spool_writer():
+    """Returns the process-wide SpoolWriter configured from settings."""
+    global _spool_writer
+    if _spool_writer is None:
+        with _spool_writer_lock:
+            if _spool_writer is None:
+                _spool_writer = SpoolWriter(
+                    settings.ANALYTICS_SPOOL_DIR,
+                    segment_bytes=getattr(settings, 'ANALYTICS_SPOOL_SEGMENT_BYTES', 16 * 1024 * 1024),
+                    segment_seconds=getattr(settings, 'ANALYTICS_SPOOL_SEGMENT_SECONDS', 60),
+                )
+                atexit.register(_spool_writer.close)
+    return _spool_writer
+
+
+def spool_record(validated_data):
+    """Returns the spool line payload for one validated event, stamped with the receive time."""
+    record = {field: validated_data.get(field) for field in SPOOL_EVENT_FIELDS if field in validated_data}
+    record['created_at'] = timezone.now()
+    return record
+
+
+def claim_stale_segments(directory, max_age):
+    """
+    Closes open segments whose writer has been idle for `max_age` seconds (e.g. the
+    worker died). Writers always rotate an expired segment before writing to it, so
+    a segment untouched for longer than the rotation age receives no further lines.
+    """
+    claimed = 0
+    cutoff = time.time() - max_age
+    for entry in _segment_entries(directory, SPOOL_OPEN_SUFFIX):
+        try:
+            if entry.stat().st_mtime > cutoff:
+                continue
+            os.replace(entry.path, entry.path[:-len(SPOOL_OPEN_SUFFIX)] + SPOOL_READY_SUFFIX)
+        except FileNotFoundError:
+            continue
+        claimed += 1
+    return claimed
+
+
+def ready_segments(directory):
+    """Returns the paths of closed segments, oldest first."""
+    return [entry.path for entry in _segment_entries(directory, SPOOL_READY_SUFFIX)]
+
+
+def _segment_entries(directory, suffix):
+    try:
+        entries = [entry for entry in os.scandir(directory) if entry.is_file() and entry.name.endswith(suffix)]
+    except FileNotFoundError:
+        return []
+    return sorted(entries, key=lambda entry: entry.name.rsplit('-', 1)[-1])
+
+
+def _parse_spool_lines(lines):
+    """Turns spool lines into unsaved events. Returns (events, skipped_line_count)."""
+    records = []
+    skipped = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+            created_at = parse_datetime(record['created_at'])
+            if not record.get('event_type') or created_at is None:
+                raise ValueError("missing event_type or created_at")
+        except (ValueError, KeyError, TypeError):
+            skipped += 1
+            continue
+        item = {field: record[field] for field in SPOOL_EVENT_FIELDS if record.get(field) is not None}
+        item['created_at'] = created_at
+        records.append(item)
+
+    resolve_event_products(records)
+    return [AnalyticsEvent(**item) for item in records], skipped
+
+
+def load_spool_segment(path, chunk_size=5000, batch_size=500):
+    """
+    Loads a closed segment into AnalyticsEvent in chunks. Each chunk's inserts and
+    the segment's new byte offset commit in one transaction, so a crash or a
+    concurrent loader never loads a line twice. The file is removed once fully
+    loaded. Returns (loaded_events, skipped_lines) for this call.
+    """
+    segment, _ = AnalyticsSpoolSegment.objects.get_or_create(name=os.path.basename(path))
+    loaded = skipped = 0
+
+    with open(path, 'rb') as fh:
+        while True:
+            with transaction.atomic():
+                segment = AnalyticsSpoolSegment.objects.select_for_update().get(pk=segment.pk)
+                if segment.completed_at is not None:
+                    break
+
+                fh.seek(segment.offset)
+                lines = []
+                for _ in range(chunk_size):
+                    line = fh.readline()
+                    if not line:
+                        break
+                    lines.append(line)
+                if not lines:
+                    segment.completed_at = timezone.now()
+                    segment.save(update_fields=['completed_at', 'updated_at'])
+                    break
+
+                events, bad_lines = _parse_spool_lines(lines)
+                AnalyticsEvent.objects.bulk_create(events, batch_size=batch_size)
+                segment.offset = fh.tell()
+                segment.loaded_events += len(events)
+                segment.skipped_lines += bad_lines
+                segment.save(update_fields=['offset', 'loaded_events', 'skipped_lines', 'updated_at'])
+            loaded += len(events)
+            skipped += bad_lines
+
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return loaded, skipped
@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from SHOP.models import Category, ProductImage
+from SHOP.serializers import clear_media_url_cache, get_complete_url
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark for get_complete_url on a page of product cards (one primary '
+        'image per card plus its category image, categories shared between cards). '
+        'Reports the per-URL cost with the cache cleared before every call, which is '
+        'what every call cost before memoization, and with the process cache warm.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=100, help='Cards per page (default 100).')
+        parser.add_argument('--categories', type=int, default=4, help='Distinct categories on the page.')
+        parser.add_argument('--repeat', type=int, default=20, help='Pages per measurement; the median is reported.')
+
+    def handle(self, *args, **options):
+        cards, repeat = options['cards'], options['repeat']
+        if cards < 1 or repeat < 1 or options['categories'] < 1:
+            raise CommandError('--cards, --categories and --repeat must be positive.')
+
+        image_field = ProductImage._meta.get_field('image')
+        category_field = Category._meta.get_field('image')
+        category_images = [
+            category_field.attr_class(None, category_field, f"categories/benchmark-{i}.jpg")
+            for i in range(options['categories'])
+        ]
+        files = []
+        for i in range(cards):
+            files.append(image_field.attr_class(None, image_field, f"products/benchmark-{i}.jpg"))
+            files.append(category_images[i % len(category_images)])
+
+        def page(clear_each):
+            request = RequestFactory().get('/api/v1/products/')
+            start = time.perf_counter()
+            for field_file in files:
+                if clear_each:
+                    clear_media_url_cache()
+                get_complete_url(field_file, request)
+            return (time.perf_counter() - start) * 1e6
+
+        uncached = statistics.median(page(clear_each=True) for _ in range(repeat))
+        clear_media_url_cache()
+        page(clear_each=False)
+        memoized = statistics.median(page(clear_each=False) for _ in range(repeat))
+
+        self.stdout.write(f"{len(files)} URLs per page ({cards} cards)")
+        self.stdout.write(f"{'mode':<12}{'us/page':>12}{'us/url':>10}")
+        for mode, elapsed in (('uncached', uncached), ('memoized', memoized)):
+            self.stdout.write(f"{mode:<12}{elapsed:>12.0f}{elapsed / len(files):>10.2f}")
+        self.stdout.write(self.style.SUCCESS(f"{uncached / memoized:.1f}x faster with a warm cache"))
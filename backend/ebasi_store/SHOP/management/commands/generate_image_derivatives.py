@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from SHOP.images import refresh_derivatives, registry
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates the responsive WebP/AVIF derivatives (see SHOP.images) for stored '
+        'product, category and page images that do not have current ones yet. New '
+        'uploads are processed automatically; run this once to backfill, or with '
+        '--force after changing IMAGE_DERIVATIVE_WIDTHS / IMAGE_DERIVATIVE_FORMATS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that are already current (replacing their files).')
+
+    def handle(self, *args, **options):
+        for model, field_name in registry:
+            derivatives_field = f"{field_name}_derivatives"
+            processed = skipped = 0
+            queryset = model._default_manager.exclude(**{field_name: ''}).exclude(**{f"{field_name}__isnull": True})
+            for instance in queryset.only('pk', field_name, derivatives_field).iterator():
+                field_file = getattr(instance, field_name)
+                if not options['force'] and getattr(instance, derivatives_field).get('source') == field_file.name:
+                    continue
+                if refresh_derivatives(instance, field_name):
+                    processed += 1
+                else:
+                    skipped += 1
+            label = f"{model._meta.label}.{field_name}"
+            self.stdout.write(self.style.SUCCESS(f'{label}: generated derivatives for {processed} image(s).'))
+            if skipped:
+                self.stdout.write(self.style.WARNING(f'{label}: {skipped} file(s) missing or not a readable image.'))
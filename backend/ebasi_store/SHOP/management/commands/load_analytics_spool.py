@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from SHOP.ingest import claim_stale_segments, ready_segments, load_spool_segment
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-loads closed analytics spool segments (ANALYTICS_INGEST_MODE=spool) into '
+        'AnalyticsEvent. Progress is committed per chunk, so the command is safe to '
+        're-run after a crash; run it from cron every minute or so.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', type=str, default=None, help='Spool directory (defaults to ANALYTICS_SPOOL_DIR).')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Lines loaded per transaction.')
+        parser.add_argument(
+            '--stale-after', type=int, default=None,
+            help='Also load open segments idle for this many seconds (default: rotation age + 5 minutes).'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.ANALYTICS_SPOOL_DIR
+        stale_after = options['stale_after']
+        if stale_after is None:
+            stale_after = getattr(settings, 'ANALYTICS_SPOOL_SEGMENT_SECONDS', 60) + 300
+
+        claimed = claim_stale_segments(directory, stale_after)
+        if claimed:
+            self.stdout.write(f'Closed {claimed} stale open segments.')
+
+        segments = ready_segments(directory)
+        total_loaded = total_skipped = 0
+        for path in segments:
+            loaded, skipped = load_spool_segment(path, chunk_size=options['chunk_size'])
+            total_loaded += loaded
+            total_skipped += skipped
+
+        if total_skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {total_skipped} malformed spool lines.'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {total_loaded} events from {len(segments)} spool segments.'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from SHOP.fuzzy import get_fuzzy_backend, install_fuzzy_index, rebuild_fuzzy_index
+from SHOP.search import get_search_backend, install_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates or repairs the product full-text search index (PostgreSQL tsvector column, '
+        'or SQLite FTS5 table and triggers) and the fuzzy search trigram index, and reindexes '
+        'every product. Safe to re-run.'
+    )
+
+    def handle(self, *args, **options):
+        installed = install_search_index(connection)
+        backend = get_search_backend()
+        if installed:
+            self.stdout.write(self.style.SUCCESS(f'Search index ready ({backend.name}).'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'No full-text index available for {connection.vendor}; using {backend.name} matching.'
+            ))
+
+        install_fuzzy_index(connection)
+        stale = rebuild_fuzzy_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Fuzzy index ready ({get_fuzzy_backend().name}); refreshed {stale} stale product name(s).'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from SHOP.ratings import recompute_rating_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the denormalized review summary on every product (review_count, '
+        'rating_sum and the star histogram) from the reviews table. Use --check to only '
+        'report products whose summary has drifted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Report drift without writing.')
+        parser.add_argument('--product', type=int, action='append', dest='product_ids', help='Limit to a product id (repeatable).')
+
+    def handle(self, *args, **options):
+        drifted = recompute_rating_summaries(product_ids=options['product_ids'], dry_run=options['check'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Product rating summaries match the reviews table.'))
+            return
+        preview = ', '.join(str(product_id) for product_id in drifted[:20])
+        if options['check']:
+            raise CommandError(f'{len(drifted)} products have drifted rating summaries ({preview}). Run without --check to repair.')
+        self.stdout.write(self.style.SUCCESS(f'Repaired rating summaries for {len(drifted)} products ({preview}).'))
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from SHOP.rollups import fold_new_events, rebuild_rollups, check_rollup_consistency
+
+
+class Command(BaseCommand):
+    help = (
+        'Maintains the AnalyticsDailyRollup table. By default folds all events above the '
+        'watermark (run it from cron every few minutes). Use --rebuild to backfill or '
+        'repair, and --check to verify the rollups against the raw events.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute rollups from raw events.')
+        parser.add_argument('--check', action='store_true', help='Compare rollups against raw events and report drift.')
+        parser.add_argument('--since', type=str, default=None, help='Limit --rebuild/--check to days on or after YYYY-MM-DD.')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format.')
+
+        if options['rebuild']:
+            counted = rebuild_rollups(since=since)
+            scope = f"from {since}" if since else 'for all days'
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups {scope} from {counted} events.'))
+        elif not options['check']:
+            folded = fold_new_events()
+            self.stdout.write(self.style.SUCCESS(f'Folded {folded} new events into rollups.'))
+
+        if options['check']:
+            mismatches = check_rollup_consistency(since=since)
+            if not mismatches:
+                self.stdout.write(self.style.SUCCESS('Rollups are consistent with raw events.'))
+                return
+            for key, rolled, raw in mismatches[:50]:
+                day, event_type, product_id, source = key
+                self.stdout.write(
+                    f"{day} {event_type} product={product_id or '-'} source={source or '-'}: rollup={rolled} raw={raw}"
+                )
+            raise CommandError(f'{len(mismatches)} rollup keys disagree with raw events. Run with --rebuild to repair.')
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SHOP', '0005_alter_category_image_alter_productimage_image_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Analytics Rollup State',
+                'verbose_name_plural': 'Analytics Rollup State',
+            },
+        ),
+        migrations.CreateModel(
+            name='AnalyticsDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Day in the store timezone (settings.STORE_TIME_ZONE).')),
+                ('event_type', models.CharField(choices=[('page_view', 'Page View'), ('product_view', 'Product View'), ('search', 'Search Query'), ('wishlist_add', 'Wishlist Addition'), ('whatsapp_click', 'WhatsApp Conversion Click'), ('contact_submit', 'Contact Inquiry Submitted')], max_length=50)),
+                ('source', models.CharField(blank=True, default='', max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analytics_rollups', to='SHOP.product')),
+            ],
+            options={
+                'verbose_name': 'Analytics Daily Rollup',
+                'verbose_name_plural': 'Analytics Daily Rollups',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day', 'event_type'], name='SHOP_analyt_day_a6ed23_idx'), models.Index(fields=['event_type', 'day'], name='SHOP_analyt_event_t_ad9223_idx'), models.Index(fields=['product', 'event_type', 'day'], name='SHOP_analyt_product_5ab9d3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SHOP', '0006_analyticsdailyrollup_analyticsrollupstate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analyticsevent',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SHOP', '0007_alter_analyticsevent_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsSpoolSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('offset', models.BigIntegerField(default=0, help_text='Bytes of the segment already loaded.')),
+                ('loaded_events', models.PositiveIntegerField(default=0)),
+                ('skipped_lines', models.PositiveIntegerField(default=0)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Analytics Spool Segment',
+                'verbose_name_plural': 'Analytics Spool Segments',
+                'ordering': ['name'],
+            },
+        ),
+    ]
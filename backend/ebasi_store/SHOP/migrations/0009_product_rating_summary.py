@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:14
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_summaries(apps, schema_editor):
+    Product = apps.get_model('SHOP', 'Product')
+    Review = apps.get_model('SHOP', 'Review')
+    rows = Review.objects.order_by().values('product_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{f'rating_{stars}_count': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)}
+    )
+    for row in rows:
+        Product.objects.filter(pk=row.pop('product_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SHOP', '0008_analyticsspoolsegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+from django.db import migrations
+
+# Frozen copy of the DDL in SHOP.search as of this migration: migrations must not
+# import app code, which keeps changing after they are written.
+FTS_COLUMNS = 'name, sku, short_description, description'
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS SHOP_product_fts USING fts5(
+        {FTS_COLUMNS}, content='SHOP_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS SHOP_product_fts_insert AFTER INSERT ON SHOP_product BEGIN
+        INSERT INTO SHOP_product_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.name, new.sku, new.short_description, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS SHOP_product_fts_delete AFTER DELETE ON SHOP_product BEGIN
+        INSERT INTO SHOP_product_fts(SHOP_product_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.name, old.sku, old.short_description, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS SHOP_product_fts_update
+        AFTER UPDATE OF name, sku, short_description, description ON SHOP_product BEGIN
+        INSERT INTO SHOP_product_fts(SHOP_product_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.name, old.sku, old.short_description, old.description);
+        INSERT INTO SHOP_product_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.name, new.sku, new.short_description, new.description);
+    END""",
+    "INSERT INTO SHOP_product_fts(SHOP_product_fts) VALUES('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS SHOP_product_fts_insert",
+    "DROP TRIGGER IF EXISTS SHOP_product_fts_delete",
+    "DROP TRIGGER IF EXISTS SHOP_product_fts_update",
+    "DROP TABLE IF EXISTS SHOP_product_fts",
+]
+
+POSTGRES_FORWARD = [
+    """ALTER TABLE "SHOP_product" ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple'::regconfig, coalesce(sku, '')), 'A') ||
+            setweight(to_tsvector('simple'::regconfig, coalesce(short_description, '')), 'B') ||
+            setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'C')
+        ) STORED""",
+    'CREATE INDEX IF NOT EXISTS "SHOP_product_search_vector_gin" ON "SHOP_product" USING GIN (search_vector)',
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS "SHOP_product_search_vector_gin"',
+    'ALTER TABLE "SHOP_product" DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def sqlite_has_fts5(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(apps, schema_editor):
+    # PostgreSQL: generated tsvector column + GIN index. SQLite: FTS5 table + triggers.
+    # Other databases use the icontains fallback in SHOP.search.
+    conn = schema_editor.connection
+    if conn.vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    elif conn.vendor == 'sqlite' and sqlite_has_fts5(conn):
+        statements = SQLITE_FORWARD
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SHOP', '0009_product_rating_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
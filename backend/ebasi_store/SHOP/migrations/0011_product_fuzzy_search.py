@@ -0,0 +1,147 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:41
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Frozen copies of what this migration needs from SHOP.search, SHOP.fuzzy and
+# SHOP.text: migrations must not import app code, which keeps changing after they
+# are written.
+FTS_COLUMNS = 'name, sku, short_description, description'
+
+SQLITE_FTS_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS SHOP_product_fts_insert AFTER INSERT ON SHOP_product BEGIN
+        INSERT INTO SHOP_product_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.name, new.sku, new.short_description, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS SHOP_product_fts_delete AFTER DELETE ON SHOP_product BEGIN
+        INSERT INTO SHOP_product_fts(SHOP_product_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.name, old.sku, old.short_description, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS SHOP_product_fts_update
+        AFTER UPDATE OF name, sku, short_description, description ON SHOP_product BEGIN
+        INSERT INTO SHOP_product_fts(SHOP_product_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.name, old.sku, old.short_description, old.description);
+        INSERT INTO SHOP_product_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.name, new.sku, new.short_description, new.description);
+    END""",
+    "INSERT INTO SHOP_product_fts(SHOP_product_fts) VALUES('rebuild')",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    'CREATE INDEX IF NOT EXISTS "SHOP_product_search_text_trgm" ON "SHOP_product" USING GIN (search_text gin_trgm_ops)',
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS "SHOP_product_search_text_trgm"',
+]
+
+_FOLDS = (
+    ('chh', 's'), ('ch', 's'), ('sh', 's'), ('x', 's'), ('z', 'j'),
+    ('kh', 'k'), ('gh', 'g'), ('jh', 'j'), ('th', 't'), ('dh', 'd'),
+    ('ph', 'f'), ('bh', 'b'), ('ck', 'k'), ('q', 'k'), ('c', 'k'),
+    ('w', 'v'), ('y', 'i'), ('ee', 'i'), ('oo', 'u'), ('ou', 'u'),
+)
+_NON_WORD_RE = re.compile(r'[\W_]+', re.UNICODE)
+_DOUBLED_RE = re.compile(r'(.)\1+')
+
+
+def fold_text(text):
+    decomposed = unicodedata.normalize('NFKD', (text or '').lower())
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    words = []
+    for word in _NON_WORD_RE.sub(' ', stripped).split():
+        for spelling, folded in _FOLDS:
+            word = word.replace(spelling, folded)
+        words.append(_DOUBLED_RE.sub(r'\1', word))
+    return ' '.join(words)
+
+
+def trigrams(folded):
+    grams = set()
+    for word in folded.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def fts_table_exists(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'SHOP_product_fts'")
+        return cursor.fetchone() is not None
+
+
+def backfill_fuzzy_search(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor == 'sqlite' and fts_table_exists(conn):
+        # Adding search_text remakes SHOP_product on SQLite, which drops the FTS triggers.
+        for statement in SQLITE_FTS_TRIGGERS:
+            schema_editor.execute(statement, params=None)
+    elif conn.vendor == 'postgresql':
+        for statement in POSTGRES_FORWARD:
+            schema_editor.execute(statement, params=None)
+
+    Product = apps.get_model('SHOP', 'Product')
+    SearchWordTrigram = apps.get_model('SHOP', 'SearchWordTrigram')
+    words = set()
+    for product_id, name in Product.objects.values_list('id', 'name').iterator():
+        folded = fold_text(name)[:400]
+        Product.objects.filter(pk=product_id).update(search_text=folded)
+        words.update(folded.split())
+    if conn.vendor != 'postgresql':
+        SearchWordTrigram.objects.bulk_create([
+            SearchWordTrigram(word=word, trigram=gram)
+            for word in words if word.isalpha() and len(word) <= 64
+            for gram in trigrams(word)
+        ], batch_size=2000)
+
+
+def drop_fuzzy_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_BACKWARD:
+            schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SHOP', '0010_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchSynonym',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(help_text='What the catalog calls it, e.g. "Mekhela Chador".', max_length=100, unique=True)),
+                ('variants', models.TextField(help_text='Comma-separated spellings and names customers type.')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Search Synonym',
+                'verbose_name_plural': 'Search Synonyms',
+                'ordering': ['term'],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=400),
+        ),
+        migrations.CreateModel(
+            name='SearchWordTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(max_length=64)),
+                ('trigram', models.CharField(max_length=3)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('trigram', 'word'), name='shop_searchwordtrigram_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_fuzzy_search, drop_fuzzy_search),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SHOP', '0011_product_fuzzy_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/AVIF copies (see SHOP.images).'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/AVIF copies (see SHOP.images).'),
+        ),
+    ]
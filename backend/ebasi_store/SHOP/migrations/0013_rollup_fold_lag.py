@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SHOP', '0012_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyticsrollupstate',
+            name='observed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analyticsrollupstate',
+            name='observed_event_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
+from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator, FileExtensionValidator
+from .text import fold_text
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -13,6 +15,7 @@ class Category(models.Model):
         null=True,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'webp', 'avif'])]
     )
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized WebP/AVIF copies (see SHOP.images).")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -69,20 +72,73 @@ class Product(models.Model):
     )
     meta_title = models.CharField(max_length=200, blank=True)
     meta_description = models.TextField(max_length=300, blank=True)
+
+    # Review summary, maintained incrementally by SHOP.ratings (never edited directly)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Spelling-folded name for fuzzy search (see SHOP.text), derived on save
+    search_text = models.CharField(max_length=400, blank=True, default='', editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    RATING_SUMMARY_FIELDS = (
+        'review_count', 'rating_sum',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+    )
+
     class Meta:
         ordering = ['-created_at']
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Price-bound inputs as loaded, so saves can tell whether cached bounds changed.
+        instance._loaded_price_key = instance.price_key()
+        instance._loaded_search_text = instance.__dict__.get('search_text')
+        return instance
+
+    def price_key(self):
+        return (self.__dict__.get('price'), self.__dict__.get('is_active'), self.__dict__.get('category_id'))
+
+    def save(self, *args, **kwargs):
+        self.search_text = fold_text(self.name)[:400]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
+        # Rating counters are updated in place with F() expressions; saving a product
+        # loaded earlier must not write its stale copy of them back.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.RATING_SUMMARY_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         from django.conf import settings
         frontend_url = getattr(settings, 'FRONTEND_URL', 'http://localhost:3000').rstrip('/')
         return f"{frontend_url}/product/{self.slug}"
 
+    @property
+    def average_rating(self):
+        if not self.review_count:
+            return 0
+        return round(self.rating_sum / self.review_count, 1)
+
+    @property
+    def rating_histogram(self):
+        return {str(stars): getattr(self, f'rating_{stars}_count') for stars in range(1, 6)}
+
     @property
     def is_on_sale(self):
         return self.compare_price and self.compare_price > self.price
@@ -99,6 +155,7 @@ class ProductImage(models.Model):
         upload_to='products/',
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'webp', 'avif'])]
     )
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized WebP/AVIF copies (see SHOP.images).")
     alt_text = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
@@ -142,11 +199,60 @@ class Review(models.Model):
     class Meta:
         ordering = ['-created_at']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the product's rating summary currently counts for this review.
+        instance._counted = (instance.__dict__.get('product_id'), instance.__dict__.get('rating'))
+        return instance
+
     def __str__(self):
         name = self.user_name or 'Anonymous'
         return f"{name} - {self.product.name} ({self.rating}★)"
 
 
+class SearchWordTrigram(models.Model):
+    """
+    Trigram index over the vocabulary of (spelling-folded) product name words,
+    used by fuzzy search on databases without pg_trgm (see SHOP.fuzzy). Words
+    are added as products are saved and pruned by `rebuild_search_index`.
+    """
+    word = models.CharField(max_length=64)
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['trigram', 'word'], name='shop_searchwordtrigram_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.trigram!r} -> {self.word}"
+
+
+class SearchSynonym(models.Model):
+    """
+    Curated alternative spellings and local names for a search term, e.g.
+    "mekhela chador" <- "mekhela sador, riha mekhela". Searches that fuzzily match
+    a variant also search for the term.
+    """
+    term = models.CharField(max_length=100, unique=True, help_text="What the catalog calls it, e.g. \"Mekhela Chador\".")
+    variants = models.TextField(help_text="Comma-separated spellings and names customers type.")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['term']
+        verbose_name = 'Search Synonym'
+        verbose_name_plural = 'Search Synonyms'
+
+    def __str__(self):
+        return self.term
+
+    def variant_list(self):
+        return [variant.strip() for variant in self.variants.split(',') if variant.strip()]
+
+
 class AnalyticsEvent(models.Model):
     EVENT_CHOICES = (
         ('page_view', 'Page View'),
@@ -202,7 +308,9 @@ class AnalyticsEvent(models.Model):
         blank=True,
         help_text="Additional non-PII contextual details (e.g., selected size, quantity, filter categories)."
     )
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Defaulted rather than auto_now_add so buffered/batched ingestion keeps the
+    # time the event was received, not the time it was written.
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     class Meta:
         verbose_name = 'Analytics Event'
@@ -219,3 +327,84 @@ class AnalyticsEvent(models.Model):
         if self.search_query:
             target = f" - \"{self.search_query}\""
         return f"[{self.get_event_type_display()}] {self.path or self.source}{target} ({self.created_at.strftime('%Y-%m-%d %H:%M')})"
+
+
+class AnalyticsDailyRollup(models.Model):
+    """
+    Pre-aggregated event counts per store-local day, event type, product and source.
+    Maintained incrementally from AnalyticsEvent (see SHOP.rollups) so admin
+    dashboards never have to scan the raw events table.
+    """
+    day = models.DateField(help_text="Day in the store timezone (settings.STORE_TIME_ZONE).")
+    event_type = models.CharField(max_length=50, choices=AnalyticsEvent.EVENT_CHOICES)
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='analytics_rollups'
+    )
+    source = models.CharField(max_length=100, blank=True, default='')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Analytics Daily Rollup'
+        verbose_name_plural = 'Analytics Daily Rollups'
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['day', 'event_type']),
+            models.Index(fields=['event_type', 'day']),
+            models.Index(fields=['product', 'event_type', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.event_type} product={self.product_id or '-'} source={self.source or '-'}: {self.count}"
+
+
+class AnalyticsRollupState(models.Model):
+    """
+    Singleton watermark: every AnalyticsEvent with id <= last_event_id is
+    already folded into AnalyticsDailyRollup. observed_event_id/observed_at record
+    the highest id seen at an earlier fold, which becomes safe to fold once it has
+    been visible for ANALYTICS_ROLLUP_LAG_SECONDS (see SHOP.rollups).
+    """
+    last_event_id = models.BigIntegerField(default=0)
+    observed_event_id = models.BigIntegerField(null=True, blank=True)
+    observed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Analytics Rollup State'
+        verbose_name_plural = 'Analytics Rollup State'
+
+    def __str__(self):
+        return f"Rollup watermark: event #{self.last_event_id}"
+
+    @classmethod
+    def get_solo(cls):
+        obj, _ = cls.objects.get_or_create(id=1)
+        return obj
+
+
+class AnalyticsSpoolSegment(models.Model):
+    """
+    Load progress for one closed analytics spool file. The byte offset is
+    committed in the same transaction as the events it covers, which makes
+    `load_analytics_spool` idempotent and safe to re-run after a crash.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    offset = models.BigIntegerField(default=0, help_text="Bytes of the segment already loaded.")
+    loaded_events = models.PositiveIntegerField(default=0)
+    skipped_lines = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Analytics Spool Segment'
+        verbose_name_plural = 'Analytics Spool Segments'
+
+    def __str__(self):
+        state = 'loaded' if self.completed_at else f"at byte {self.offset}"
+        return f"{self.name} ({state})"
@@ -0,0 +1,139 @@
+"""
+Pagination with an opt-in keyset (cursor) mode.
+
+Without `?cursor=` responses are paginated by page number as before. With
+`?cursor=` (empty for the first page) rows are fetched with a WHERE clause on
+the current ordering plus an id tie-break instead of an OFFSET, and the
+total COUNT(*) is skipped unless `?count=true` is passed, so every page
+costs the same as the first one.
+"""
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorValueEncoder(DjangoJSONEncoder):
+    """Keeps full microsecond precision for datetimes (DjangoJSONEncoder truncates to milliseconds)."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(PageNumberPagination):
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        keys = self._ordering_keys(queryset)
+        self.count = queryset.count() if request.query_params.get(self.count_query_param) == 'true' else None
+
+        queryset = queryset.order_by(*[
+            F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+            for field, descending in keys
+        ])
+        position = self._decode_cursor(request.query_params[self.cursor_query_param], keys, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self._after(keys, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_cursor = self._encode_cursor(keys, rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        payload = OrderedDict()
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = None
+        payload['results'] = data
+        return Response(payload)
+
+    def get_next_link(self):
+        if not getattr(self, 'keyset', False):
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def _ordering_keys(self, queryset):
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        keys = []
+        for field in ordering:
+            if not isinstance(field, str):
+                raise NotFound('Cursor pagination is not available for this ordering.')
+            descending = field.startswith('-')
+            name = field.lstrip('-+')
+            keys.append(('id' if name == 'pk' else name, descending))
+        if not any(name == 'id' for name, _ in keys):
+            # Unique tie-break, in the direction of the primary ordering.
+            keys.append(('id', keys[0][1] if keys else False))
+        return keys
+
+    def _after(self, keys, position):
+        """Rows strictly after `position` in (nulls-last) keyset order."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(keys, position):
+            if value is not None:
+                lookup = f"{field}__lt" if descending else f"{field}__gt"
+                condition |= equal & (Q(**{lookup: value}) | Q(**{f"{field}__isnull": True}))
+                equal &= Q(**{field: value})
+            else:
+                equal &= Q(**{f"{field}__isnull": True})
+        return condition
+
+    def _encode_cursor(self, keys, obj):
+        values = []
+        for field, _ in keys:
+            value = obj
+            for part in field.split('__'):
+                value = getattr(value, part, None)
+            values.append(value)
+        raw = json.dumps(values, cls=CursorValueEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def _decode_cursor(self, cursor, keys, model):
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(keys):
+                raise ValueError
+            return [self._to_python(model, field, value) for (field, _), value in zip(keys, values)]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _to_python(self, model, field, value):
+        if value is None:
+            return None
+        try:
+            for part in field.split('__'):
+                model_field = model._meta.get_field(part)
+                model = model_field.related_model or model
+        except FieldDoesNotExist:
+            # Annotations (e.g. annotated_avg_rating) are compared as plain JSON values.
+            return value
+        return model_field.to_python(value)
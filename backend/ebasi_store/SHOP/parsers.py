@@ -0,0 +1,65 @@
+import codecs
+import json
+import zlib
+from io import BytesIO
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+
+class GzipBodyMixin:
+    """
+    Transparently inflates request bodies sent with `Content-Encoding: gzip`.
+    The inflated size is capped to guard against decompression bombs.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').lower() if request is not None else ''
+        if encoding not in ('', 'identity'):
+            # An empty body has nothing to decode, whatever the header says: leave it
+            # to the parser to report as usual.
+            data = stream.read() if stream is not None else b''
+            if data and encoding != 'gzip':
+                raise ParseError(f"Unsupported Content-Encoding: {encoding}")
+            stream = BytesIO(self._inflate(data) if data else data)
+        return super().parse(stream, media_type=media_type, parser_context=parser_context)
+
+    def _inflate(self, data):
+        limit = getattr(settings, 'ANALYTICS_MAX_INFLATED_BODY_SIZE', 5 * 1024 * 1024)
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = inflater.decompress(data, limit)
+        except zlib.error as exc:
+            raise ParseError(f"Invalid gzip body - {exc}")
+        if inflater.unconsumed_tail:
+            raise ParseError("Decompressed request body is too large.")
+        return body
+
+
+class NDJSONParser(BaseParser):
+    """Parses newline-delimited JSON (one object per line) into a list."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for line_number, line in enumerate(codecs.getreader(encoding)(stream), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error on line {line_number} - {exc}")
+        return items
+
+
+class GzipJSONParser(GzipBodyMixin, JSONParser):
+    pass
+
+
+class GzipNDJSONParser(GzipBodyMixin, NDJSONParser):
+    pass
@@ -0,0 +1,70 @@
+"""
+Cached price bounds for the storefront price slider.
+
+Catalog-wide and per-category min/max prices of active products are computed
+together in one grouped query and cached until a product's price, active flag
+or category changes, or a category is renamed (see SHOP.signals).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min
+
+from .models import Product
+
+PRICE_BOUNDS_CACHE_KEY = 'shop:price_bounds'
+
+# Slider range used when there are no active products.
+DEFAULT_PRICE_BOUNDS = (0, 100000)
+
+
+def _compute_price_bounds():
+    categories = {}
+    for row in Product.objects.filter(is_active=True).order_by().values('category__slug').annotate(
+        min_price=Min('price'),
+        max_price=Max('price')
+    ):
+        categories[row['category__slug']] = (float(row['min_price']), float(row['max_price']))
+
+    if categories:
+        overall = (
+            min(bounds[0] for bounds in categories.values()),
+            max(bounds[1] for bounds in categories.values())
+        )
+    else:
+        overall = DEFAULT_PRICE_BOUNDS
+    return {'all': overall, 'categories': categories}
+
+
+def get_price_bounds(category_slug=None):
+    """
+    Returns (min_price, max_price) across active products, or within one category
+    when `category_slug` is given (falling back to the catalog-wide bounds).
+    """
+    bounds = cache.get(PRICE_BOUNDS_CACHE_KEY)
+    if bounds is None:
+        bounds = _compute_price_bounds()
+        cache.set(PRICE_BOUNDS_CACHE_KEY, bounds, getattr(settings, 'PRICE_BOUNDS_CACHE_TTL', 3600))
+    if category_slug:
+        return bounds['categories'].get(category_slug, bounds['all'])
+    return bounds['all']
+
+
+def get_filtered_price_bounds(queryset):
+    """Returns (min_price, max_price) over an already filtered product queryset."""
+    stats = queryset.order_by().aggregate(min_price=Min('price'), max_price=Max('price'))
+    if stats['min_price'] is None:
+        return DEFAULT_PRICE_BOUNDS
+    return float(stats['min_price']), float(stats['max_price'])
+
+
+def invalidate_price_bounds():
+    cache.delete(PRICE_BOUNDS_CACHE_KEY)
+
+
+def invalidate_price_bounds_on_commit():
+    """
+    invalidate_price_bounds() once the current transaction commits. Invalidating
+    earlier would let a concurrent miss cache the pre-commit prices for the full TTL.
+    """
+    transaction.on_commit(invalidate_price_bounds)
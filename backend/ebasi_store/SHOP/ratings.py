@@ -0,0 +1,76 @@
+"""
+Denormalized review summaries on Product.
+
+Each product stores review_count, rating_sum and a 1-5 star histogram. They are
+adjusted in place with F() expressions whenever a review is created, deleted or
+re-rated, so catalog queries read plain columns instead of joining reviews.
+recompute_rating_summaries() rebuilds them from the reviews table.
+"""
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import Product, Review
+
+RATING_COUNT_FIELDS = {stars: f'rating_{stars}_count' for stars in range(1, 6)}
+
+
+def average_rating_expression():
+    """Average rating computed from the summary columns (NULL for unreviewed products), for ordering."""
+    return Case(
+        When(review_count=0, then=Value(None)),
+        default=Cast('rating_sum', FloatField()) / F('review_count'),
+        output_field=FloatField()
+    )
+
+
+def apply_review_delta(product_id, rating, sign):
+    """Adds (sign=1) or removes (sign=-1) one review with the given rating from a product's summary."""
+    if product_id is None or rating not in RATING_COUNT_FIELDS:
+        return
+    field = RATING_COUNT_FIELDS[rating]
+    Product.objects.filter(pk=product_id).update(
+        review_count=F('review_count') + sign,
+        rating_sum=F('rating_sum') + sign * rating,
+        **{field: F(field) + sign}
+    )
+
+
+def _review_summaries(product_ids=None):
+    reviews = Review.objects.all()
+    if product_ids is not None:
+        reviews = reviews.filter(product_id__in=product_ids)
+    aggregates = {
+        field: Count('id', filter=Q(rating=stars))
+        for stars, field in RATING_COUNT_FIELDS.items()
+    }
+    rows = reviews.order_by().values('product_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **aggregates
+    )
+    return {row.pop('product_id'): row for row in rows}
+
+
+def recompute_rating_summaries(product_ids=None, dry_run=False):
+    """
+    Recomputes summaries from the reviews table (for all products or the given ids)
+    and saves the ones that drifted. Returns the list of product ids that were wrong.
+    """
+    summaries = _review_summaries(product_ids)
+    empty = dict.fromkeys(Product.RATING_SUMMARY_FIELDS, 0)
+
+    products = Product.objects.only('id', *Product.RATING_SUMMARY_FIELDS)
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+
+    drifted = []
+    for product in products.order_by('id').iterator(chunk_size=2000):
+        expected = summaries.get(product.id, empty)
+        if any(getattr(product, field) != expected[field] for field in Product.RATING_SUMMARY_FIELDS):
+            for field in Product.RATING_SUMMARY_FIELDS:
+                setattr(product, field, expected[field])
+            drifted.append(product)
+
+    if drifted and not dry_run:
+        Product.objects.bulk_update(drifted, Product.RATING_SUMMARY_FIELDS, batch_size=500)
+    return [product.id for product in drifted]
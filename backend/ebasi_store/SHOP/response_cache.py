@@ -0,0 +1,133 @@
+"""
+Tag-invalidated response cache for the public catalog endpoints.
+
+Rendered response bodies are cached together with the versions of the tags
+they depend on ("catalog", "categories", "product:<id>", "category:<id>").
+Purging a tag bumps its version, which invalidates every entry carrying it
+without having to know their keys. A hit costs two cache reads and never
+touches the ORM or the serializers. Bodies are stored already encoded, and
+also gzipped when large enough to be worth it.
+"""
+import gzip
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+ENTRY_PREFIX = 'shop:response:'
+TAG_PREFIX = 'shop:tag:'
+GZIP_MIN_BYTES = 1024
+
+
+def _tag_key(tag):
+    return f"{TAG_PREFIX}{tag}"
+
+
+def purge_tags(*tags):
+    """Invalidates every cached response tagged with any of `tags`."""
+    version = time.time_ns()
+    cache.set_many({_tag_key(tag): version for tag in tags}, None)
+
+
+def purge_tags_on_commit(*tags):
+    """
+    purge_tags() once the current transaction commits. Purging earlier would let a
+    concurrent miss store pre-commit rows under the new versions.
+    """
+    transaction.on_commit(lambda: purge_tags(*tags))
+
+
+def _current_versions(tags):
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    for key, version in missing.items():
+        # add() so a concurrent purge is never overwritten.
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+        versions[key] = version
+    return versions
+
+
+class CachedResponseMixin:
+    """
+    Caches successful GET responses of a DRF view.
+
+    Views declare `response_cache_defaults` (query params whose default value
+    should not fragment the cache), may restrict the key to the params that
+    affect the response with `response_cache_params`, and may override
+    `get_response_cache_tags()` to tag an entry with the objects it renders.
+    Tag versions are read before the body is built, so a purge racing with a
+    miss leaves the stored entry already invalid.
+    """
+    response_cache_defaults = {}
+    response_cache_params = None
+    response_cache_tags = ('catalog',)
+
+    def get_response_cache_key(self, request):
+        params = []
+        for name in sorted(request.query_params):
+            if self.response_cache_params is not None and name not in self.response_cache_params:
+                continue
+            values = sorted(value for value in request.query_params.getlist(name) if value != '')
+            if not values or values == [self.response_cache_defaults.get(name)]:
+                continue
+            params.append(f"{name}={','.join(values)}")
+        fmt = getattr(request.accepted_renderer, 'format', '')
+        raw = '|'.join([request.scheme, request.get_host(), request.path, fmt, '&'.join(params)])
+        return ENTRY_PREFIX + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_response_cache_tags(self, request, *args, **kwargs):
+        return list(self.response_cache_tags)
+
+    def get(self, request, *args, **kwargs):
+        ttl = getattr(settings, 'CATALOG_CACHE_TTL', 300)
+        if not ttl:
+            return super().get(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None and cache.get_many(list(entry['versions'])) == entry['versions']:
+            return self._cached_response(request, entry)
+
+        self._response_cache_versions = _current_versions(self.get_response_cache_tags(request, *args, **kwargs))
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            self._response_cache_key = key
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, '_response_cache_key', None)
+        if key is not None and getattr(response, 'accepted_renderer', None) is not None:
+            self._response_cache_key = None
+            response.render()
+            self._store(key, response)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def _store(self, key, response):
+        body = response.content
+        entry = {
+            'body': body,
+            'gzip': gzip.compress(body, 6) if getattr(settings, 'CATALOG_CACHE_GZIP', True) and len(body) >= GZIP_MIN_BYTES else None,
+            'content_type': response['Content-Type'],
+            'versions': self._response_cache_versions,
+        }
+        cache.set(key, entry, getattr(settings, 'CATALOG_CACHE_TTL', 300))
+
+    def _cached_response(self, request, entry):
+        accepts_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if entry['gzip'] is not None and accepts_gzip:
+            response = HttpResponse(entry['gzip'], content_type=entry['content_type'])
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(entry['body'], content_type=entry['content_type'])
+        if entry['gzip'] is not None:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        response['X-Cache'] = 'HIT'
+        return response
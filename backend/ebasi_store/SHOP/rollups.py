@@ -0,0 +1,194 @@
+"""
+Incremental maintenance of AnalyticsDailyRollup.
+
+Raw AnalyticsEvent rows are folded into per-day counters using an id watermark
+(AnalyticsRollupState.last_event_id). Folding only ever reads events above the
+watermark, so catching up is cheap no matter how large the events table grows.
+Folding runs in the analytics worker (`manage.py run_analytics_jobs`, the
+Procfile `worker`) and after each deploy (build.sh); read paths such as the
+admin dashboard use the rollups as they are, so a read never takes the
+watermark's write lock.
+
+Ids are assigned at insert time but become visible at commit, so on databases
+with concurrent writers a bulk insert can commit lower ids after higher ones
+were already folded. The watermark therefore only advances to an id observed at
+least ANALYTICS_ROLLUP_LAG_SECONDS earlier: every lower id was assigned before
+that observation, and its transaction has had the lag to commit.
+"""
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+
+from .models import AnalyticsEvent, AnalyticsDailyRollup, AnalyticsRollupState
+
+ROLLUP_KEY_FIELDS = ('day', 'event_type', 'product_id', 'source')
+
+
+def get_store_timezone():
+    """Returns the store's local timezone (settings.STORE_TIME_ZONE, falling back to TIME_ZONE)."""
+    return ZoneInfo(getattr(settings, 'STORE_TIME_ZONE', None) or settings.TIME_ZONE)
+
+
+def day_start(day, tz=None):
+    """Returns the aware instant at which the given store-local day begins."""
+    return datetime.combine(day, time.min, tzinfo=tz or get_store_timezone())
+
+
+def _grouped_event_counts(events):
+    """Groups raw events by the rollup key, bucketing days in the store timezone."""
+    return events.annotate(
+        day=TruncDate('created_at', tzinfo=get_store_timezone())
+    ).order_by().values(*ROLLUP_KEY_FIELDS).annotate(event_count=Count('id'))
+
+
+def _apply_counts(rows):
+    """Adds grouped event counts onto the rollup table (update existing keys, create missing ones)."""
+    increments = {}
+    for row in rows:
+        key = tuple(row[field] for field in ROLLUP_KEY_FIELDS)
+        increments[key] = increments.get(key, 0) + row['event_count']
+    if not increments:
+        return
+
+    existing = {}
+    days = {key[0] for key in increments}
+    for rollup in AnalyticsDailyRollup.objects.filter(day__in=days):
+        key = (rollup.day, rollup.event_type, rollup.product_id, rollup.source)
+        if key in increments:
+            existing.setdefault(key, rollup)
+
+    to_update = []
+    to_create = []
+    for key, amount in increments.items():
+        rollup = existing.get(key)
+        if rollup is not None:
+            rollup.count += amount
+            to_update.append(rollup)
+        else:
+            to_create.append(AnalyticsDailyRollup(**dict(zip(ROLLUP_KEY_FIELDS, key)), count=amount))
+
+    if to_update:
+        AnalyticsDailyRollup.objects.bulk_update(to_update, ['count'], batch_size=500)
+    if to_create:
+        AnalyticsDailyRollup.objects.bulk_create(to_create, batch_size=500)
+
+
+def _locked_state():
+    AnalyticsRollupState.get_solo()
+    return AnalyticsRollupState.objects.select_for_update().get(id=1)
+
+
+def rollup_lag_seconds():
+    """The fold safety lag (0 on SQLite, which has a single writer)."""
+    if connection.vendor == 'sqlite':
+        return 0
+    return settings.ANALYTICS_ROLLUP_LAG_SECONDS
+
+
+def _safe_upper(state, now=None, lag=None):
+    """
+    Highest event id above the watermark that is safe to fold (None when there is
+    none yet). Records a new observation on `state`; the caller saves it.
+    """
+    latest = AnalyticsEvent.objects.filter(id__gt=state.last_event_id).aggregate(upper=Max('id'))['upper']
+    lag = rollup_lag_seconds() if lag is None else lag
+    if not lag:
+        # Everything visible is folded, including any pending observation.
+        state.observed_event_id = state.observed_at = None
+        return latest
+
+    now = now or timezone.now()
+    upper = None
+    if state.observed_event_id is not None and state.observed_at <= now - timedelta(seconds=lag):
+        upper = state.observed_event_id
+        state.observed_event_id = state.observed_at = None
+    if state.observed_event_id is None and latest is not None and latest > (upper or state.last_event_id):
+        state.observed_event_id, state.observed_at = latest, now
+    return upper
+
+
+def fold_new_events(lag=None):
+    """
+    Folds the events above the watermark that are safe to fold (see the module
+    docstring) into the rollup table and advances the watermark. Safe to call
+    concurrently: the state row is locked for the duration. `lag` overrides
+    ANALYTICS_ROLLUP_LAG_SECONDS; 0 folds every visible event, for callers that
+    know no other transaction is writing events.
+    Returns the number of events folded.
+    """
+    with transaction.atomic():
+        state = _locked_state()
+        upper = _safe_upper(state, lag=lag)
+        rows = []
+        if upper is not None and upper > state.last_event_id:
+            pending = AnalyticsEvent.objects.filter(id__gt=state.last_event_id, id__lte=upper)
+            rows = list(_grouped_event_counts(pending))
+            _apply_counts(rows)
+            state.last_event_id = upper
+        state.save(update_fields=['last_event_id', 'observed_event_id', 'observed_at', 'updated_at'])
+        return sum(row['event_count'] for row in rows)
+
+
+def rebuild_rollups(since=None):
+    """
+    Recomputes the rollup table from raw events, either entirely or for every
+    store-local day from `since` (a date) onwards. Returns the number of events counted.
+    """
+    with transaction.atomic():
+        state = _locked_state()
+        previous_watermark = state.last_event_id
+        upper = max(_safe_upper(state) or 0, previous_watermark)
+
+        rollups = AnalyticsDailyRollup.objects.all()
+        events = AnalyticsEvent.objects.filter(id__lte=upper)
+        if since is not None:
+            rollups = rollups.filter(day__gte=since)
+            events = events.filter(created_at__gte=day_start(since))
+        rollups.delete()
+
+        rows = list(_grouped_event_counts(events))
+        if since is not None:
+            # Late arrivals dated before the rebuilt range still need folding.
+            rows += list(_grouped_event_counts(AnalyticsEvent.objects.filter(
+                id__gt=previous_watermark,
+                id__lte=upper,
+                created_at__lt=day_start(since)
+            )))
+        _apply_counts(rows)
+
+        state.last_event_id = upper
+        state.save(update_fields=['last_event_id', 'observed_event_id', 'observed_at', 'updated_at'])
+        return sum(row['event_count'] for row in rows)
+
+
+def check_rollup_consistency(since=None):
+    """
+    Compares rollup counters against the raw events they were folded from
+    (events up to the current watermark). Returns a list of mismatches as
+    (key, rollup_count, raw_count) tuples; an empty list means consistent.
+    """
+    watermark = AnalyticsRollupState.get_solo().last_event_id
+    events = AnalyticsEvent.objects.filter(id__lte=watermark)
+    rollups = AnalyticsDailyRollup.objects.all()
+    if since is not None:
+        events = events.filter(created_at__gte=day_start(since))
+        rollups = rollups.filter(day__gte=since)
+
+    raw = {}
+    for row in _grouped_event_counts(events):
+        raw[tuple(row[field] for field in ROLLUP_KEY_FIELDS)] = row['event_count']
+
+    rolled = {}
+    for row in rollups.order_by().values(*ROLLUP_KEY_FIELDS).annotate(event_count=Sum('count')):
+        rolled[tuple(row[field] for field in ROLLUP_KEY_FIELDS)] = row['event_count']
+
+    return [
+        (key, rolled.get(key, 0), raw.get(key, 0))
+        for key in sorted(set(raw) | set(rolled), key=str)
+        if rolled.get(key, 0) != raw.get(key, 0)
+    ]
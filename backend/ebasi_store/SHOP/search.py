@@ -0,0 +1,250 @@
+"""
+Full-text product search for the storefront.
+
+The index lives in the database and is maintained by the database itself, so
+it stays correct for every write path (ORM saves, bulk updates, raw SQL):
+
+- PostgreSQL: a generated, weighted `search_vector` tsvector column on
+  SHOP_product with a GIN index.
+- SQLite: an external-content FTS5 table (SHOP_product_fts) kept in sync by
+  triggers.
+
+Both are created by migration 0010. SQLite drops the triggers whenever a
+migration remakes SHOP_product, so they are verified (and reinstalled) after
+every migrate. Other databases (or SQLite builds without
+FTS5) fall back to icontains matching. Queries use prefix matching on every
+term, so results update per keystroke, and are ranked (name and SKU weigh most).
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+from .fuzzy import fuzzy_search_products
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ('name', 'description', 'short_description', 'sku')
+FTS_TABLE = 'SHOP_product_fts'
+
+# DDL for the database-maintained index, used by `rebuild_search_index` and the post-migrate
+# check (migration 0010 has its own frozen copy).
+FTS_COLUMNS = 'name, sku, short_description, description'
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS SHOP_product_fts USING fts5(
+        {FTS_COLUMNS}, content='SHOP_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS SHOP_product_fts_insert AFTER INSERT ON SHOP_product BEGIN
+        INSERT INTO SHOP_product_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.name, new.sku, new.short_description, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS SHOP_product_fts_delete AFTER DELETE ON SHOP_product BEGIN
+        INSERT INTO SHOP_product_fts(SHOP_product_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.name, old.sku, old.short_description, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS SHOP_product_fts_update
+        AFTER UPDATE OF name, sku, short_description, description ON SHOP_product BEGIN
+        INSERT INTO SHOP_product_fts(SHOP_product_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.name, old.sku, old.short_description, old.description);
+        INSERT INTO SHOP_product_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.name, new.sku, new.short_description, new.description);
+    END""",
+    "INSERT INTO SHOP_product_fts(SHOP_product_fts) VALUES('rebuild')",
+]
+
+SQLITE_TRIGGERS = ('SHOP_product_fts_insert', 'SHOP_product_fts_delete', 'SHOP_product_fts_update')
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS SHOP_product_fts_insert",
+    "DROP TRIGGER IF EXISTS SHOP_product_fts_delete",
+    "DROP TRIGGER IF EXISTS SHOP_product_fts_update",
+    "DROP TABLE IF EXISTS SHOP_product_fts",
+]
+
+POSTGRES_FORWARD = [
+    """ALTER TABLE "SHOP_product" ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple'::regconfig, coalesce(sku, '')), 'A') ||
+            setweight(to_tsvector('simple'::regconfig, coalesce(short_description, '')), 'B') ||
+            setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'C')
+        ) STORED""",
+    'CREATE INDEX IF NOT EXISTS "SHOP_product_search_vector_gin" ON "SHOP_product" USING GIN (search_vector)',
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS "SHOP_product_search_vector_gin"',
+    'ALTER TABLE "SHOP_product" DROP COLUMN IF EXISTS search_vector',
+]
+
+_TERM_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def search_terms(query):
+    """Splits user input into plain word terms (no query syntax survives)."""
+    return _TERM_RE.findall((query or '').lower())[:10]
+
+
+class IContainsSearchBackend:
+    """Unindexed fallback: every term must appear in one of the search fields."""
+    name = 'icontains'
+
+    def search(self, queryset, terms):
+        for term in terms:
+            condition = Q()
+            for field in SEARCH_FIELDS:
+                condition |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(condition)
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresSearchBackend:
+    name = 'postgres'
+
+    def search(self, queryset, terms):
+        table = queryset.model._meta.db_table
+        tsquery = ' & '.join(f"{term}:*" for term in terms)
+        vector = f'"{table}"."search_vector"'
+        return queryset.filter(
+            RawSQL(f"{vector} @@ to_tsquery('simple', %s)", (tsquery,), output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f"ts_rank({vector}, to_tsquery('simple', %s))", (tsquery,), output_field=FloatField())
+        )
+
+
+class SQLiteFTSBackend:
+    name = 'sqlite-fts5'
+    # bm25 weights, in FTS column order (name, sku, short_description, description)
+    weights = (10.0, 10.0, 4.0, 1.0)
+
+    def search(self, queryset, terms):
+        table = queryset.model._meta.db_table
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        bm25 = f"bm25({FTS_TABLE}, {', '.join(str(weight) for weight in self.weights)})"
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+        ).annotate(
+            # bm25 is lower-is-better; negate so higher ranks sort first like ts_rank.
+            search_rank=RawSQL(
+                f'SELECT -{bm25} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+                (match,),
+                output_field=FloatField()
+            )
+        )
+
+
+def sqlite_has_fts5(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def install_search_index(conn):
+    """Creates (idempotently) the index structures on `conn` and reindexes every product."""
+    vendor = conn.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    elif vendor == 'sqlite' and sqlite_has_fts5(conn):
+        statements = SQLITE_FORWARD
+    else:
+        return False
+    with conn.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    _backends.pop(vendor, None)
+    return True
+
+
+def uninstall_search_index(conn):
+    statements = {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(conn.vendor, [])
+    with conn.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    _backends.pop(conn.vendor, None)
+
+
+def verify_search_triggers(conn):
+    """
+    Reinstalls the SQLite FTS triggers on `conn` if any is missing (a migration
+    remaking SHOP_product drops them) and reindexes every product. Returns the
+    names that were missing.
+    """
+    if conn.vendor != 'sqlite':
+        return []
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", [FTS_TABLE, *SQLITE_TRIGGERS]
+        )
+        present = {row[0] for row in cursor.fetchall()}
+    if FTS_TABLE not in present:
+        return []
+    missing = [name for name in SQLITE_TRIGGERS if name not in present]
+    if missing:
+        logger.warning(f"Full-text search triggers missing ({', '.join(missing)}); reinstalling and reindexing.")
+        install_search_index(conn)
+    return missing
+
+
+def _sqlite_fts_available():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+_backends = {}
+
+
+def get_search_backend():
+    """Returns the search backend for the default database connection."""
+    vendor = connection.vendor
+    if vendor not in _backends:
+        if vendor == 'postgresql':
+            _backends[vendor] = PostgresSearchBackend()
+        elif vendor == 'sqlite' and _sqlite_fts_available():
+            _backends[vendor] = SQLiteFTSBackend()
+        else:
+            _backends[vendor] = IContainsSearchBackend()
+    return _backends[vendor]
+
+
+def search_products(queryset, query):
+    """Filters a product queryset to matches for `query`, annotated with `search_rank`."""
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+    return get_search_backend().search(queryset, terms)
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Drop-in replacement for SearchFilter on `?search=` backed by the full-text index.
+    Results are ordered by relevance unless the request asks for an explicit ordering
+    (this backend must come after OrderingFilter for that).
+
+    `?search_mode=` picks the matcher: 'fulltext', 'fuzzy' (typo and spelling
+    tolerant, see SHOP.fuzzy) or 'auto' (default: full-text, then fuzzy when
+    full-text finds nothing and FUZZY_SEARCH_FALLBACK is on).
+    """
+    search_param = 'search'
+    search_mode_param = 'search_mode'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not search_terms(query):
+            return queryset
+        mode = request.query_params.get(self.search_mode_param, 'auto')
+        if mode == 'fuzzy':
+            results = fuzzy_search_products(queryset, query)
+        else:
+            results = search_products(queryset, query)
+            if mode == 'auto' and settings.FUZZY_SEARCH_FALLBACK and not results.exists():
+                results = fuzzy_search_products(queryset, query)
+        if not request.query_params.get('ordering'):
+            results = results.order_by('-search_rank', '-id')
+        return results
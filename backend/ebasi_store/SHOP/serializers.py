@@ -1,52 +1,107 @@
+from functools import lru_cache
+from urllib.parse import urljoin
+
+from django.utils.encoding import iri_to_uri
 from rest_framework import serializers
 from .models import Category, Product, ProductImage, ProductVideo, Review, AnalyticsEvent
-from django.db.models import Avg
+from .fieldsets import SparseFieldsetSerializerMixin
 from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Settings that change the resolved URL; a setting_changed receiver in
+# SHOP.signals clears the memoized URLs when one of them is overridden.
+MEDIA_URL_SETTINGS = frozenset({'CLOUDINARY_CLOUD_NAME', 'DEBUG', 'MEDIA_URL', 'STORAGES', 'DEFAULT_FILE_STORAGE'})
+MEDIA_URL_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=1)
+def _media_url_settings():
+    return getattr(settings, 'CLOUDINARY_CLOUD_NAME', None), settings.DEBUG
+
+
+@lru_cache(maxsize=MEDIA_URL_CACHE_SIZE)
+def _resolve_media_url(storage, name, base):
+    """URL of `name` in `storage`, made absolute against `base` ("scheme://host") when given."""
+    url = storage.url(name)
+    if url.startswith('http'):
+        return url
+
+    # If the URL is relative, but we have Cloudinary configured, construct the Cloudinary delivery URL
+    cloud_name, debug = _media_url_settings()
+    if cloud_name and not debug:
+        return f"https://res.cloudinary.com/{cloud_name}/image/upload/{name.lstrip('/')}"
+
+    if base:
+        if url.startswith('/') and not url.startswith('//'):
+            return iri_to_uri(base + url)
+        return iri_to_uri(urljoin(base + '/', url))
+    return url
+
+
+def clear_media_url_cache():
+    _media_url_settings.cache_clear()
+    _resolve_media_url.cache_clear()
+
+
+def _request_base(request):
+    # Computed (and its host validated) once per request rather than once per file.
+    base = getattr(request, '_media_url_base', None)
+    if base is None:
+        base = request._media_url_base = f"{request.scheme}://{request.get_host()}"
+    return base
+
+
 def get_complete_url(field_file, request=None):
+    """
+    Absolute URL of a stored file, memoized per process by (storage, name, host):
+    pages repeat the same images, and storage.url() is slow for remote backends.
+    """
     if not field_file:
         return None
 
     try:
-        url = field_file.url
+        return _resolve_media_url(field_file.storage, field_file.name, _request_base(request) if request else None)
     except Exception as e:
         logger.error(f"ERROR: Failed to resolve URL for {field_file}: {e}")
         return None
 
-    if url.startswith('http'):
-        return url
 
-    # If the URL is relative, but we have Cloudinary configured, construct the Cloudinary delivery URL
-    cloud_name = getattr(settings, 'CLOUDINARY_CLOUD_NAME', None)
-    if cloud_name and not settings.DEBUG:
-        path = field_file.name
-        if path.startswith('/'):
-            path = path[1:]
-        cloudinary_url = f"https://res.cloudinary.com/{cloud_name}/image/upload/{path}"
-        logger.debug(f"Constructed Cloudinary fallback URL = {cloudinary_url}")
-        return cloudinary_url
-
-    if request:
-        absolute_url = request.build_absolute_uri(url)
-        return absolute_url
-
-    return url
+def image_sources(field_file, derivatives, request=None):
+    """
+    {'width', 'height', 'srcset': {format: "url 320w, url 640w, ..."}} for an image
+    with generated derivatives (see SHOP.images), otherwise None.
+    """
+    if not field_file or not derivatives or derivatives.get('source') != field_file.name:
+        return None
+    srcset = {}
+    for variant in derivatives['variants']:
+        url = get_complete_url(field_file.field.attr_class(None, field_file.field, variant['name']), request)
+        if url:
+            srcset.setdefault(variant['format'], []).append(f"{url} {variant['width']}w")
+    return {
+        'width': derivatives['width'],
+        'height': derivatives['height'],
+        'srcset': {fmt: ', '.join(candidates) for fmt, candidates in srcset.items()},
+    }
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    sources = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'alt_text', 'is_primary', 'order']
+        fields = ['id', 'image', 'sources', 'alt_text', 'is_primary', 'order']
 
     def get_image(self, obj):
         return get_complete_url(obj.image, self.context.get('request'))
 
+    def get_sources(self, obj):
+        return image_sources(obj.image, obj.image_derivatives, self.context.get('request'))
+
 
 class ProductVideoSerializer(serializers.ModelSerializer):
     video = serializers.SerializerMethodField()
@@ -65,14 +120,18 @@ class ProductVideoSerializer(serializers.ModelSerializer):
 
 class CategorySerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_sources = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'description', 'image', 'is_active']
+        fields = ['id', 'name', 'slug', 'description', 'image', 'image_sources', 'is_active']
 
     def get_image(self, obj):
         return get_complete_url(obj.image, self.context.get('request'))
 
+    def get_image_sources(self, obj):
+        return image_sources(obj.image, obj.image_derivatives, self.context.get('request'))
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
@@ -81,11 +140,35 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'product', 'created_at']
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class CategorySideloadSerializerMixin:
+    """
+    With `context['sideloaded_categories']` (a dict, see SHOP.sideload), renders
+    `category_id` instead of the nested category and collects the category into
+    that dict, so the view can return each category once.
+    """
+
+    @property
+    def _readable_fields(self):
+        fields = super()._readable_fields
+        if self.context.get('sideloaded_categories') is None:
+            return fields
+        return (field for field in fields if field.field_name != 'category')
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        sideloaded = self.context.get('sideloaded_categories')
+        if sideloaded is not None and 'category' in self.fields:
+            data['category_id'] = instance.category_id
+            sideloaded.setdefault(instance.category_id, instance.category)
+        return data
+
+
+class ProductListSerializer(CategorySideloadSerializerMixin, SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     primary_image = serializers.SerializerMethodField()
+    primary_image_sources = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
+    review_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Product
@@ -93,7 +176,7 @@ class ProductListSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'short_description', 'category',
             'price', 'compare_price', 'is_on_sale', 'discount_percentage',
             'stock_status', 'is_featured', 'badge', 'primary_image',
-            'average_rating', 'review_count'
+            'primary_image_sources', 'average_rating', 'review_count'
         ]
 
     def get_primary_image(self, obj):
@@ -107,28 +190,24 @@ class ProductListSerializer(serializers.ModelSerializer):
             logger.error(f"Failed to resolve primary image: {e}")
         return None
 
-    def get_average_rating(self, obj):
-        # Use annotated rating if available
-        avg = getattr(obj, 'annotated_avg_rating', None)
-        if avg is None:
-            avg = obj.reviews.aggregate(Avg('rating'))['rating__avg']
-        return round(avg, 1) if avg else 0
+    def get_primary_image_sources(self, obj):
+        images = list(obj.images.all())
+        if images:
+            return image_sources(images[0].image, images[0].image_derivatives, self.context.get('request'))
+        return None
 
-    def get_review_count(self, obj):
-        # Use annotated count if available
-        count = getattr(obj, 'annotated_review_count', None)
-        if count is None:
-            count = obj.reviews.count()
-        return count
+    def get_average_rating(self, obj):
+        return obj.average_rating
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
     videos = ProductVideoSerializer(many=True, read_only=True)
     reviews = ReviewSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
+    review_count = serializers.IntegerField(read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
 
     class Meta:
         model = Product
@@ -138,25 +217,75 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'discount_percentage', 'sku', 'stock_quantity', 'stock_status',
             'weight', 'dimensions', 'is_featured', 'badge', 'meta_title',
             'meta_description', 'images', 'videos', 'reviews', 'average_rating',
-            'review_count', 'created_at', 'updated_at'
+            'review_count', 'rating_histogram', 'created_at', 'updated_at'
         ]
 
     def get_average_rating(self, obj):
-        avg = getattr(obj, 'annotated_avg_rating', None)
-        if avg is None:
-            avg = obj.reviews.aggregate(Avg('rating'))['rating__avg']
-        return round(avg, 1) if avg else 0
+        return obj.average_rating
 
-    def get_review_count(self, obj):
-        count = getattr(obj, 'annotated_review_count', None)
-        if count is None:
-            count = obj.reviews.count()
-        return count
+
+class ProductCardSerializer(serializers.ModelSerializer):
+    """
+    Compact product card for wishlist snapshots and comparisons. Expects the
+    queryset to annotate `primary_image_name` (see ProductBatchView).
+    """
+    category = serializers.SerializerMethodField()
+    primary_image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'slug', 'price', 'compare_price', 'is_on_sale', 'discount_percentage',
+            'stock_status', 'primary_image', 'category', 'updated_at'
+        ]
+
+    def get_category(self, obj):
+        return {'name': obj.category.name, 'slug': obj.category.slug}
+
+    def get_primary_image(self, obj):
+        if not obj.primary_image_name:
+            return None
+        field = ProductImage._meta.get_field('image')
+        return get_complete_url(field.attr_class(None, field, obj.primary_image_name), self.context.get('request'))
+
+
+def resolve_event_products(items):
+    """
+    Resolves every referenced product id in a single query and snapshots product names.
+    Ids that no longer exist are cleared, mirroring what SET_NULL does for deleted products.
+    """
+    product_ids = {item['product_id'] for item in items if item.get('product_id')}
+    names = dict(Product.objects.filter(id__in=product_ids).values_list('id', 'name')) if product_ids else {}
+    for item in items:
+        product_id = item.get('product_id')
+        if not product_id:
+            continue
+        if product_id not in names:
+            item['product_id'] = None
+        elif not item.get('product_name'):
+            item['product_name'] = names[product_id]
+    return items
+
+
+class AnalyticsEventListSerializer(serializers.ListSerializer):
+    """Validates a batch of events with one product lookup and saves it with one bulk_create."""
+
+    def validate(self, attrs):
+        if not self.context.get('resolve_products', True):
+            return attrs
+        return resolve_event_products(attrs)
+
+    def create(self, validated_data):
+        events = [self.child.build_event(item) for item in validated_data]
+        return AnalyticsEvent.objects.bulk_create(events)
 
 
 class AnalyticsEventSerializer(serializers.ModelSerializer):
+    product = serializers.IntegerField(source='product_id', required=False, allow_null=True, min_value=1)
+
     class Meta:
         model = AnalyticsEvent
+        list_serializer_class = AnalyticsEventListSerializer
         fields = [
             'id',
             'event_type',
@@ -171,9 +300,18 @@ class AnalyticsEventSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at']
 
+    def validate(self, attrs):
+        # Batches resolve products once in AnalyticsEventListSerializer.validate;
+        # spooled events are resolved later by load_analytics_spool.
+        if not isinstance(self.parent, serializers.ListSerializer) and self.context.get('resolve_products', True):
+            resolve_event_products([attrs])
+        return attrs
+
+    def build_event(self, validated_data):
+        """Returns an unsaved AnalyticsEvent for a validated (product-resolved) payload."""
+        return AnalyticsEvent(**validated_data)
+
     def create(self, validated_data):
-        # Auto-fill product_name from product instance if not provided
-        product = validated_data.get('product')
-        if product and not validated_data.get('product_name'):
-            validated_data['product_name'] = product.name
-        return super().create(validated_data)
+        event = self.build_event(validated_data)
+        event.save()
+        return event
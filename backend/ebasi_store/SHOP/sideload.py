@@ -0,0 +1,44 @@
+"""
+Compound ("sideloaded") list responses.
+
+With `?include=categories`, product cards carry `category_id` instead of a
+nested category, and the response gets one `categories` map (id -> category)
+with each category serialized once, however many cards share it.
+"""
+from rest_framework.permissions import SAFE_METHODS
+
+from .serializers import CategorySerializer
+
+
+class CategorySideloadViewMixin:
+    """
+    For list views whose product serializer uses CategorySideloadSerializerMixin
+    (directly or nested). Must come before CachedResponseMixin, which renders the
+    response in its own finalize_response.
+    """
+    include_query_param = 'include'
+
+    def sideloads_categories(self):
+        if self.request.method not in SAFE_METHODS:
+            return False
+        include = self.request.query_params.get(self.include_query_param, '')
+        return 'categories' in [name.strip() for name in include.split(',')]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.sideloads_categories():
+            self._sideloaded_categories = context['sideloaded_categories'] = {}
+        return context
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        sideloaded = getattr(self, '_sideloaded_categories', None)
+        data = getattr(response, 'data', None)
+        if sideloaded is not None and response.status_code == 200 and data is not None:
+            self._sideloaded_categories = None
+            categories = CategorySerializer(
+                sorted(sideloaded.values(), key=lambda category: category.pk), many=True, context={'request': request}
+            ).data
+            if isinstance(data, list):
+                data = response.data = {'results': data}
+            data['categories'] = {str(category['id']): category for category in categories}
+        return super().finalize_response(request, response, *args, **kwargs)
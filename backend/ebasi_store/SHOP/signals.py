@@ -0,0 +1,149 @@
+"""
+Signal receivers for the SHOP models:
+
+- keep Product review summaries in step with Review writes (SHOP.ratings);
+- drop cached price bounds once a product price change commits (SHOP.price_bounds);
+- purge cached catalog responses tagged with changed objects, once the write
+  commits (SHOP.response_cache);
+- keep the fuzzy search index and vocabulary current (SHOP.fuzzy);
+- update the autocomplete index once writes commit (SHOP.suggest);
+- forget memoized media URLs when a setting they depend on changes (SHOP.serializers);
+- generate responsive derivatives of uploaded images (SHOP.images), and purge
+  again once they are written;
+- after every migrate, reinstall SQLite full-text triggers that a table remake
+  dropped (SHOP.search).
+"""
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .fuzzy import index_words, invalidate_fuzzy_vocabulary, uses_word_index
+from .images import derivatives_updated, register_derivatives
+from .models import Category, Product, ProductImage, ProductVideo, Review, SearchSynonym
+from .price_bounds import invalidate_price_bounds_on_commit
+from .ratings import apply_review_delta
+from .response_cache import purge_tags_on_commit
+from .search import verify_search_triggers
+from .serializers import MEDIA_URL_SETTINGS, clear_media_url_cache
+from .suggest import apply_catalog_change
+
+
+@receiver(post_save, sender=Review)
+def count_saved_review(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.product_id, instance.rating)
+    if created:
+        counted = None
+    elif hasattr(instance, '_counted'):
+        counted = instance._counted
+    else:
+        # Saved without being loaded first: what was counted is unknown, leave it
+        # to `manage.py repair_rating_summaries`.
+        return
+    if counted != current:
+        if counted is not None:
+            apply_review_delta(*counted, sign=-1)
+        apply_review_delta(*current, sign=1)
+    instance._counted = current
+
+
+@receiver(post_delete, sender=Review)
+def uncount_deleted_review(sender, instance, **kwargs):
+    counted = getattr(instance, '_counted', None) or (instance.product_id, instance.rating)
+    apply_review_delta(*counted, sign=-1)
+    instance._counted = None
+
+
+@receiver(post_save, sender=Product)
+def refresh_price_bounds_on_save(sender, instance, created, **kwargs):
+    current = instance.price_key()
+    if created or getattr(instance, '_loaded_price_key', None) != current:
+        invalidate_price_bounds_on_commit()
+    instance._loaded_price_key = current
+
+
+@receiver(post_delete, sender=Product)
+def refresh_price_bounds_on_delete(sender, instance, **kwargs):
+    invalidate_price_bounds_on_commit()
+
+
+@receiver(post_save, sender=Category)
+def refresh_price_bounds_on_category_save(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_price_bounds_on_commit()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def purge_product_responses(sender, instance, **kwargs):
+    purge_tags_on_commit(f"product:{instance.pk}", 'catalog')
+
+
+@receiver([post_save, post_delete, derivatives_updated], sender=ProductImage)
+@receiver([post_save, post_delete], sender=ProductVideo)
+@receiver([post_save, post_delete], sender=Review)
+def touch_product_on_related_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Bump updated_at (the detail endpoint's validator) without re-saving the product.
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+    purge_tags_on_commit(f"product:{instance.product_id}", 'catalog')
+
+
+@receiver([post_save, post_delete, derivatives_updated], sender=Category)
+def purge_category_responses(sender, instance, **kwargs):
+    purge_tags_on_commit(f"category:{instance.pk}", 'categories', 'catalog')
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_fuzzy_search(sender, instance, created, **kwargs):
+    if uses_word_index() and (created or getattr(instance, '_loaded_search_text', None) != instance.search_text):
+        index_words(instance.search_text)
+    instance._loaded_search_text = instance.search_text
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=SearchSynonym)
+def refresh_fuzzy_vocabulary(sender, instance, **kwargs):
+    invalidate_fuzzy_vocabulary()
+
+
+@receiver(post_save, sender=Product)
+def suggest_saved_product(sender, instance, **kwargs):
+    transaction.on_commit(lambda: apply_catalog_change(lambda index: index.update_product(instance)))
+
+
+@receiver(post_delete, sender=Product)
+def unsuggest_deleted_product(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: apply_catalog_change(lambda index: index.products.remove(product_id)))
+
+
+@receiver(post_save, sender=Category)
+def suggest_saved_category(sender, instance, **kwargs):
+    transaction.on_commit(lambda: apply_catalog_change(lambda index: index.update_category(instance)))
+
+
+@receiver(post_delete, sender=Category)
+def unsuggest_deleted_category(sender, instance, **kwargs):
+    category_id = instance.pk
+    transaction.on_commit(lambda: apply_catalog_change(lambda index: index.categories.remove(category_id)))
+
+
+@receiver(setting_changed)
+def reset_media_urls(sender, setting, **kwargs):
+    if setting in MEDIA_URL_SETTINGS:
+        clear_media_url_cache()
+
+
+
+@receiver(post_migrate)
+def verify_search_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    if sender.name == 'SHOP':
+        verify_search_triggers(connections[using])
+
+
+register_derivatives(Category, 'image')
+register_derivatives(ProductImage, 'image')
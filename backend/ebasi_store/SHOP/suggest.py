@@ -0,0 +1,312 @@
+"""
+In-process prefix index for search-box autocomplete (`products/suggest/`).
+
+Product names (from every word, so "silk" finds "Muga Silk Mekhela"), SKUs,
+category names and popular search queries mined from AnalyticsEvent are kept in
+sorted arrays searched with bisect, so a lookup touches neither the database
+nor the serializers.
+
+Each worker process holds its own index. Product and category saves update it
+in place (after commit) and bump a shared generation counter in the cache;
+other workers notice the bump within SUGGEST_INDEX_CHECK_SECONDS and rebuild.
+Every index is also rebuilt after SUGGEST_INDEX_MAX_AGE seconds. Only the first
+build blocks a request: replacements are built on a background thread while the
+old index keeps being served. Popular queries are cached on their own for
+SUGGEST_INDEX_MAX_AGE seconds, so a catalog-driven rebuild reloads only the
+products and categories.
+
+Popular queries are public, so a query only qualifies once enough distinct
+sessions searched it, and queries that look like contact details or identifiers
+(emails, URLs, phone or order numbers) never do.
+"""
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import AnalyticsEvent, Category, Product
+from .text import simplify_text
+
+logger = logging.getLogger(__name__)
+
+GENERATION_CACHE_KEY = 'shop:suggest_generation'
+POPULAR_QUERIES_CACHE_KEY = 'shop:suggest_popular_queries'
+
+# Separates a key from its item id inside one sorted string; sorts before any text.
+_SEP = '\x00'
+KEY_LENGTH = 48
+# Word positions of a name that are indexed as key starts.
+MAX_WORD_KEYS = 4
+FEATURED_WEIGHT = 10 ** 9
+
+
+class PrefixIndex:
+    """
+    A sorted array of "<key>\\x00<item id>" strings. `search` bisects to the first
+    key with the prefix and returns the highest-weighted items among the next
+    MAX_SCAN keys.
+    """
+    MAX_SCAN = 300
+
+    def __init__(self):
+        self._keys = []
+        self._items = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    @staticmethod
+    def _entries(item_id, keys):
+        return sorted({f"{key[:KEY_LENGTH]}{_SEP}{item_id}" for key in keys if key})
+
+    def load(self, items):
+        """Bulk-loads (item_id, keys, weight, payload) tuples, replacing the contents."""
+        entries = []
+        self._items = {}
+        for item_id, keys, weight, payload in items:
+            item_entries = self._entries(item_id, keys)
+            self._items[str(item_id)] = (weight, payload, item_entries)
+            entries.extend(item_entries)
+        entries.sort()
+        self._keys = entries
+
+    def add(self, item_id, keys, weight, payload):
+        self.remove(item_id)
+        entries = self._entries(item_id, keys)
+        for entry in entries:
+            insort(self._keys, entry)
+        self._items[str(item_id)] = (weight, payload, entries)
+
+    def remove(self, item_id):
+        item = self._items.pop(str(item_id), None)
+        if item is None:
+            return
+        for entry in item[2]:
+            position = bisect_left(self._keys, entry)
+            if position < len(self._keys) and self._keys[position] == entry:
+                del self._keys[position]
+
+    def search(self, prefix, limit):
+        start = bisect_left(self._keys, prefix)
+        end = min(start + self.MAX_SCAN, len(self._keys))
+        # item id -> rank of its first (alphabetically closest) match, the tie-breaker
+        matched = {}
+        for position in range(start, end):
+            entry = self._keys[position]
+            if not entry.startswith(prefix):
+                break
+            matched.setdefault(entry[entry.index(_SEP) + 1:], len(matched))
+        items = self._items
+        best = heapq.nsmallest(
+            limit,
+            (item_id for item_id in matched if item_id in items),
+            key=lambda item_id: (-items[item_id][0], matched[item_id])
+        )
+        return [items[item_id][1] for item_id in best]
+
+
+def product_keys(name, sku):
+    words = simplify_text(name).split()
+    keys = [' '.join(words[position:]) for position in range(min(len(words), MAX_WORD_KEYS))]
+    keys.append(simplify_text(sku))
+    return keys
+
+
+def product_item(product_id, name, sku, slug, is_featured, review_count):
+    # Featured products first, then the most reviewed.
+    weight = review_count + (FEATURED_WEIGHT if is_featured else 0)
+    return product_id, product_keys(name, sku), weight, {'name': name, 'slug': slug, 'sku': sku}
+
+
+def category_item(category_id, name, slug):
+    return category_id, [simplify_text(name)], 0, {'name': name, 'slug': slug}
+
+
+MAX_QUERY_LENGTH = 60
+MAX_QUERY_WORDS = 6
+# Emails, URLs and runs of digits long enough to be phone, order or card numbers.
+_PRIVATE_QUERY_RE = re.compile(r'@|://|www\.|\d[\d\s-]{3,}\d')
+
+
+def is_suggestible_query(query):
+    """Whether a search query may be shown to other visitors as a suggestion."""
+    return (
+        len(query) <= MAX_QUERY_LENGTH
+        and len(query.split()) <= MAX_QUERY_WORDS
+        and not _PRIVATE_QUERY_RE.search(query)
+    )
+
+
+def popular_queries():
+    """
+    (query, sessions) for search queries made recently by at least
+    SUGGEST_POPULAR_QUERY_MIN_SESSIONS distinct sessions, most widely searched first.
+    """
+    since = timezone.now() - timedelta(days=settings.SUGGEST_POPULAR_QUERY_DAYS)
+    rows = AnalyticsEvent.objects.filter(
+        event_type='search',
+        created_at__gte=since
+    ).exclude(search_query='').exclude(session_id='').annotate(query=Lower('search_query')).values('query').annotate(
+        sessions=Count('session_id', distinct=True)
+    ).filter(
+        sessions__gte=settings.SUGGEST_POPULAR_QUERY_MIN_SESSIONS
+    ).order_by('-sessions', 'query').values_list('query', 'sessions')
+    return [row for row in rows[:settings.SUGGEST_POPULAR_QUERY_LIMIT] if is_suggestible_query(row[0])]
+
+
+def cached_popular_queries():
+    """popular_queries(), computed at most once per SUGGEST_INDEX_MAX_AGE seconds per cache."""
+    queries = cache.get(POPULAR_QUERIES_CACHE_KEY)
+    if queries is None:
+        queries = popular_queries()
+        cache.set(POPULAR_QUERIES_CACHE_KEY, queries, settings.SUGGEST_INDEX_MAX_AGE)
+    return queries
+
+
+class SuggestionIndex:
+    def __init__(self, generation=None):
+        self.products = PrefixIndex()
+        self.categories = PrefixIndex()
+        self.queries = PrefixIndex()
+        self.generation = generation
+        self.built_at = time.monotonic()
+        self.checked_at = self.built_at
+
+    @classmethod
+    def build(cls):
+        index = cls(generation=current_generation())
+        index.products.load(
+            product_item(*row) for row in Product.objects.filter(is_active=True).values_list(
+                'id', 'name', 'sku', 'slug', 'is_featured', 'review_count'
+            ).iterator()
+        )
+        index.categories.load(
+            category_item(*row) for row in Category.objects.filter(is_active=True).values_list('id', 'name', 'slug')
+        )
+        queries = [(simplify_text(query), count) for query, count in cached_popular_queries()]
+        index.queries.load((query, [query], count, query) for query, count in queries if query)
+        return index
+
+    def is_stale(self, now):
+        if now - self.built_at > settings.SUGGEST_INDEX_MAX_AGE:
+            return True
+        if now - self.checked_at > settings.SUGGEST_INDEX_CHECK_SECONDS:
+            self.checked_at = now
+            return current_generation() != self.generation
+        return False
+
+    def suggest(self, query, limit):
+        prefix = simplify_text(query)[:KEY_LENGTH]
+        if not prefix:
+            return {'queries': [], 'categories': [], 'products': []}
+        return {
+            'queries': self.queries.search(prefix, limit),
+            'categories': self.categories.search(prefix, limit),
+            'products': self.products.search(prefix, limit),
+        }
+
+    def update_product(self, product):
+        if product.is_active:
+            self.products.add(*product_item(
+                product.pk, product.name, product.sku, product.slug, product.is_featured, product.review_count
+            ))
+        else:
+            self.products.remove(product.pk)
+
+    def update_category(self, category):
+        if category.is_active:
+            self.categories.add(*category_item(category.pk, category.name, category.slug))
+        else:
+            self.categories.remove(category.pk)
+
+
+_index = None
+# Guards in-place updates of _index.
+_lock = threading.Lock()
+# Held while a replacement index is being built.
+_build_lock = threading.Lock()
+
+
+def current_generation():
+    return cache.get(GENERATION_CACHE_KEY, 0)
+
+
+def _rebuild():
+    """Builds a replacement index and releases _build_lock (which the caller acquired)."""
+    global _index
+    try:
+        fresh = SuggestionIndex.build()
+        with _lock:
+            _index = fresh
+    except Exception:
+        logger.exception("Failed to rebuild the suggestion index")
+    finally:
+        _build_lock.release()
+
+
+def _rebuild_in_background():
+    try:
+        _rebuild()
+    finally:
+        connections.close_all()
+
+
+def _start_rebuild():
+    threading.Thread(target=_rebuild_in_background, name='suggest-index-builder', daemon=True).start()
+
+
+def get_suggestion_index():
+    """
+    Returns this process's index. Only the first build blocks; a stale index is
+    served as is while its replacement is built on a background thread.
+    """
+    global _index
+    index = _index
+    if index is None:
+        with _build_lock:
+            if _index is None:
+                fresh = SuggestionIndex.build()
+                with _lock:
+                    _index = fresh
+            return _index
+    if index.is_stale(time.monotonic()) and _build_lock.acquire(blocking=False):
+        try:
+            _start_rebuild()
+        except Exception:
+            _build_lock.release()
+            raise
+    return index
+
+
+def apply_catalog_change(update):
+    """
+    Applies `update(index)` to this process's index and bumps the shared generation,
+    so other processes rebuild theirs.
+    """
+    cache.add(GENERATION_CACHE_KEY, 0, None)
+    try:
+        generation = cache.incr(GENERATION_CACHE_KEY)
+    except ValueError:
+        generation = None
+    with _lock:
+        if _index is None:
+            return
+        update(_index)
+        if generation is not None and _index.generation == generation - 1:
+            _index.generation = generation
+
+
+def reset_suggestion_index():
+    global _index
+    with _lock:
+        _index = None
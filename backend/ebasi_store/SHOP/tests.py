@@ -1,3 +1,1233 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import posixpath
+import tempfile
+from datetime import date, datetime, timezone as dt_timezone
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APITestCase
+
+from .models import Category, Product, ProductImage, Review, AnalyticsEvent, AnalyticsDailyRollup, AnalyticsRollupState, AnalyticsSpoolSegment, SearchSynonym
+from .rollups import fold_new_events, rebuild_rollups, check_rollup_consistency
+from .price_bounds import PRICE_BOUNDS_CACHE_KEY
+from .ratings import average_rating_expression
+from .search import get_search_backend, verify_search_triggers
+from .fuzzy import fuzzy_search_products
+from .text import fold_text
+from . import images as images_module, suggest as suggest_module
+from .suggest import get_suggestion_index, reset_suggestion_index
+from .serializers import clear_media_url_cache, get_complete_url
+from .response_cache import purge_tags
+from .views import ProductDetailView
+from .parsers import GzipJSONParser
+from .ingest import EventBuffer, SpoolWriter, load_spool_segment, ready_segments
+
+
+@override_settings(STORE_TIME_ZONE='Asia/Kolkata')
+class AnalyticsRollupTestCase(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Gamusa", slug="gamusa")
+        self.product = Product.objects.create(
+            name="Handwoven Gamusa",
+            slug="handwoven-gamusa",
+            category=category,
+            price=350,
+            sku="EBA-GMS01"
+        )
+
+    def _event(self, event_type, created_at, product=None, source=''):
+        event = AnalyticsEvent.objects.create(event_type=event_type, product=product, source=source)
+        AnalyticsEvent.objects.filter(pk=event.pk).update(created_at=created_at)
+        return event
+
+    def _rollup_total(self, **filters):
+        return sum(AnalyticsDailyRollup.objects.filter(**filters).values_list('count', flat=True))
+
+    def test_fold_is_incremental_and_idempotent(self):
+        self._event('product_view', datetime(2026, 3, 1, 10, 0, tzinfo=dt_timezone.utc), self.product)
+        self._event('product_view', datetime(2026, 3, 1, 11, 0, tzinfo=dt_timezone.utc), self.product)
+        self.assertEqual(fold_new_events(), 2)
+        self.assertEqual(fold_new_events(), 0)
+
+        last = self._event('product_view', datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc), self.product)
+        self.assertEqual(fold_new_events(), 1)
+
+        self.assertEqual(AnalyticsDailyRollup.objects.count(), 1)
+        self.assertEqual(self._rollup_total(product=self.product, event_type='product_view'), 3)
+        self.assertEqual(AnalyticsRollupState.get_solo().last_event_id, last.id)
+
+    def test_fold_waits_out_the_lag_for_late_commits(self):
+        def insert(event_id):
+            AnalyticsEvent.objects.create(id=event_id, event_type='product_view', product=self.product)
+
+        start = datetime(2026, 3, 1, 10, 0, tzinfo=dt_timezone.utc)
+        with mock.patch('SHOP.rollups.rollup_lag_seconds', return_value=60), \
+                mock.patch('SHOP.rollups.timezone.now', return_value=start) as now:
+            insert(10)
+            insert(30)
+            self.assertEqual(fold_new_events(), 0)
+            self.assertEqual(AnalyticsRollupState.get_solo().observed_event_id, 30)
+
+            # A transaction that was assigned id 20 before the observation commits late.
+            insert(20)
+            insert(40)
+            now.return_value = start.replace(second=30)
+            self.assertEqual(fold_new_events(), 0)
+
+            now.return_value = start.replace(minute=1)
+            self.assertEqual(fold_new_events(), 3)
+            state = AnalyticsRollupState.get_solo()
+            self.assertEqual((state.last_event_id, state.observed_event_id), (30, 40))
+
+            now.return_value = start.replace(minute=2)
+            self.assertEqual(fold_new_events(), 1)
+        self.assertEqual(self._rollup_total(event_type='product_view'), 4)
+
+    def test_lag_override_folds_everything_visible(self):
+        start = datetime(2026, 3, 1, 10, 0, tzinfo=dt_timezone.utc)
+        with mock.patch('SHOP.rollups.rollup_lag_seconds', return_value=60), \
+                mock.patch('SHOP.rollups.timezone.now', return_value=start) as now:
+            AnalyticsEvent.objects.create(id=10, event_type='search')
+            self.assertEqual(fold_new_events(), 0)
+            AnalyticsEvent.objects.create(id=20, event_type='search')
+            self.assertEqual(fold_new_events(lag=0), 2)
+
+            # The observation of id 10 was dropped, so the watermark never moves back.
+            now.return_value = start.replace(minute=5)
+            self.assertEqual(fold_new_events(), 0)
+        self.assertEqual(AnalyticsRollupState.get_solo().last_event_id, 20)
+
+    def test_days_are_bucketed_in_store_timezone(self):
+        # 19:00 UTC on Mar 1 is 00:30 IST on Mar 2.
+        self._event('page_view', datetime(2026, 3, 1, 19, 0, tzinfo=dt_timezone.utc), source='navbar')
+        fold_new_events()
+        rollup = AnalyticsDailyRollup.objects.get()
+        self.assertEqual(rollup.day, date(2026, 3, 2))
+        self.assertEqual(rollup.source, 'navbar')
+
+    def test_rebuild_and_consistency_check(self):
+        self._event('whatsapp_click', datetime(2026, 3, 1, 10, 0, tzinfo=dt_timezone.utc), self.product)
+        self._event('whatsapp_click', datetime(2026, 3, 5, 10, 0, tzinfo=dt_timezone.utc), self.product)
+        fold_new_events()
+        self.assertEqual(check_rollup_consistency(), [])
+
+        # Simulate drift, then detect and repair it.
+        AnalyticsDailyRollup.objects.filter(day=date(2026, 3, 5)).update(count=7)
+        mismatches = check_rollup_consistency()
+        self.assertEqual(len(mismatches), 1)
+        self.assertEqual(mismatches[0][1:], (7, 1))
+
+        rebuild_rollups(since=date(2026, 3, 4))
+        self.assertEqual(check_rollup_consistency(), [])
+        self.assertEqual(self._rollup_total(event_type='whatsapp_click'), 2)
+
+    def test_management_command_reports_drift(self):
+        self._event('search', datetime(2026, 3, 1, 10, 0, tzinfo=dt_timezone.utc))
+        out = StringIO()
+        call_command('rollup_analytics', stdout=out)
+        self.assertIn('Folded 1 new events', out.getvalue())
+
+        AnalyticsDailyRollup.objects.update(count=5)
+        with self.assertRaises(CommandError):
+            call_command('rollup_analytics', '--check', stdout=StringIO())
+
+        call_command('rollup_analytics', '--rebuild', '--check', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+
+@override_settings(ANALYTICS_INGEST_MODE='buffered')
+class BufferedAnalyticsIngestTestCase(APITestCase):
+    def setUp(self):
+        # No flush interval: the test drives flushing explicitly instead of a background thread.
+        self.buffer = EventBuffer(max_events=3, flush_size=100, flush_interval=0)
+        patcher = mock.patch('SHOP.views.get_event_buffer', return_value=self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_events_are_queued_and_flushed_in_bulk(self):
+        res = self.client.post('/api/v1/analytics/track/', {'event_type': 'page_view', 'path': '/shop'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        res = self.client.post('/api/v1/analytics/track/', [
+            {'event_type': 'search', 'search_query': 'mekhela'},
+            {'event_type': 'page_view', 'path': '/'},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['count'], 2)
+        self.assertEqual(AnalyticsEvent.objects.count(), 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(AnalyticsEvent.objects.count(), 3)
+        self.assertEqual(self.buffer.stats()['pending'], 0)
+
+    def test_overflow_is_dropped_and_counted(self):
+        events = [{'event_type': 'page_view', 'path': f'/p/{i}'} for i in range(5)]
+        with self.assertLogs('SHOP.ingest', level='WARNING'):
+            res = self.client.post('/api/v1/analytics/track/', events, format='json')
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['dropped'], 2)
+        self.assertEqual(self.buffer.stats()['dropped'], 2)
+
+    def test_invalid_payload_is_rejected_before_queueing(self):
+        res = self.client.post('/api/v1/analytics/track/', {'event_type': 'not_an_event'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.buffer.stats()['accepted'], 0)
+
+
+class BatchAnalyticsIngestTestCase(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Sarees", slug="sarees")
+        self.products = [
+            Product.objects.create(name=f"Paat Silk Saree {i}", slug=f"paat-silk-saree-{i}", category=category, price=2500, sku=f"EBA-PAT0{i}")
+            for i in range(3)
+        ]
+        self.events = [
+            {'event_type': 'product_view', 'product': product.id}
+            for product in self.products for _ in range(2)
+        ] + [{'event_type': 'page_view', 'path': '/shop'}]
+
+    def test_list_payload_uses_one_lookup_and_one_insert(self):
+        with self.assertNumQueries(2):
+            res = self.client.post('/api/v1/analytics/track/', self.events, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['count'], 7)
+        self.assertEqual(
+            AnalyticsEvent.objects.filter(product=self.products[0]).first().product_name,
+            "Paat Silk Saree 0"
+        )
+
+    def test_unknown_product_ids_are_cleared(self):
+        res = self.client.post('/api/v1/analytics/track/', [
+            {'event_type': 'product_view', 'product': 999999, 'product_name': 'Retired Saree'},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        event = AnalyticsEvent.objects.get()
+        self.assertIsNone(event.product_id)
+        self.assertEqual(event.product_name, 'Retired Saree')
+
+    def test_ndjson_and_gzip_bodies(self):
+        body = "\n".join(json.dumps(event) for event in self.events).encode()
+        res = self.client.generic(
+            'POST', '/api/v1/analytics/track/', gzip.compress(body),
+            content_type='application/x-ndjson', HTTP_CONTENT_ENCODING='gzip'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(AnalyticsEvent.objects.count(), 7)
+
+        res = self.client.generic(
+            'POST', '/api/v1/analytics/track/', gzip.compress(json.dumps(self.events[0]).encode()),
+            content_type='application/json', HTTP_CONTENT_ENCODING='gzip'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['product'], self.products[0].id)
+
+    def test_empty_gzip_body_is_a_parse_error_not_an_encoding_error(self):
+        res = self.client.generic(
+            'POST', '/api/v1/analytics/track/', b'',
+            content_type='application/json', HTTP_CONTENT_ENCODING='gzip'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('Content-Encoding', str(res.data))
+
+        for encoding in ('gzip', 'br'):
+            request = RequestFactory().post('/', content_type='application/json', HTTP_CONTENT_ENCODING=encoding)
+            for stream in (None, BytesIO(b'')):
+                with self.assertRaisesMessage(ParseError, 'JSON parse error'):
+                    GzipJSONParser().parse(stream, parser_context={'request': request})
+
+    @override_settings(ANALYTICS_MAX_BATCH_EVENTS=5)
+    def test_oversized_batches_are_rejected(self):
+        res = self.client.post('/api/v1/analytics/track/', self.events, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(AnalyticsEvent.objects.count(), 0)
+
+
+@override_settings(ANALYTICS_INGEST_MODE='spool')
+class SpoolAnalyticsIngestTestCase(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Mekhela", slug="mekhela")
+        self.product = Product.objects.create(
+            name="Muga Mekhela", slug="muga-mekhela", category=category, price=9000, sku="EBA-MKL01"
+        )
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spool_dir = tmp.name
+        self.writer = SpoolWriter(self.spool_dir, segment_bytes=1024 * 1024, segment_seconds=3600)
+        patcher = mock.patch('SHOP.views.get_spool_writer', return_value=self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _track(self, payload):
+        return self.client.post('/api/v1/analytics/track/', payload, format='json')
+
+    def test_events_are_spooled_without_database_queries(self):
+        with self.assertNumQueries(0):
+            res = self._track([
+                {'event_type': 'product_view', 'product': self.product.id},
+                {'event_type': 'product_view', 'product': 999999, 'product_name': 'Retired Saree'},
+                {'event_type': 'search', 'search_query': 'muga'},
+            ])
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(ready_segments(self.spool_dir), [])
+
+        self.writer.close()
+        out = StringIO()
+        call_command('load_analytics_spool', '--dir', self.spool_dir, stdout=out)
+        self.assertIn('Loaded 3 events from 1 spool segments', out.getvalue())
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+        viewed = AnalyticsEvent.objects.get(product=self.product)
+        self.assertEqual(viewed.product_name, 'Muga Mekhela')
+        retired = AnalyticsEvent.objects.get(product_name='Retired Saree')
+        self.assertIsNone(retired.product_id)
+
+    def test_loading_resumes_from_committed_offset(self):
+        self._track([{'event_type': 'page_view', 'path': f'/p/{i}'} for i in range(5)])
+        self.writer.close()
+        [path] = ready_segments(self.spool_dir)
+        with open(path, 'ab') as fh:
+            fh.write(b'{"event_type": "page_view", "created_at": \n')
+
+        # Simulate a loader that crashed after committing the first two lines.
+        with open(path, 'rb') as fh:
+            offset = len(fh.readline()) + len(fh.readline())
+        AnalyticsSpoolSegment.objects.create(name=os.path.basename(path), offset=offset, loaded_events=2)
+
+        loaded, skipped = load_spool_segment(path, chunk_size=2)
+        self.assertEqual((loaded, skipped), (3, 1))
+        self.assertEqual(AnalyticsEvent.objects.count(), 3)
+        segment = AnalyticsSpoolSegment.objects.get()
+        self.assertIsNotNone(segment.completed_at)
+        self.assertEqual(segment.loaded_events, 5)
+        self.assertFalse(os.path.exists(path))
+
+    def test_segments_rotate_by_size_and_stale_segments_are_claimed(self):
+        self.writer.segment_bytes = 1
+        self._track({'event_type': 'page_view', 'path': '/'})
+        self._track({'event_type': 'page_view', 'path': '/shop'})
+        self.assertEqual(len(ready_segments(self.spool_dir)), 2)
+
+        self.writer.segment_bytes = 1024 * 1024
+        self._track({'event_type': 'page_view', 'path': '/about'})
+        call_command('load_analytics_spool', '--dir', self.spool_dir, '--stale-after', '0', stdout=StringIO())
+        self.assertEqual(AnalyticsEvent.objects.count(), 3)
+        created = AnalyticsEvent.objects.values_list('created_at', flat=True)
+        self.assertTrue(all(value is not None for value in created))
+
+
+class ProductRatingSummaryTestCase(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Sarees", slug="sarees")
+        self.product = Product.objects.create(
+            name="Paat Saree", slug="paat-saree", category=self.category, price=7000, sku="EBA-PAT01"
+        )
+        self.other = Product.objects.create(
+            name="Eri Saree", slug="eri-saree", category=self.category, price=5000, sku="EBA-ERI01"
+        )
+
+    def _summary(self, product):
+        product.refresh_from_db()
+        return product.review_count, product.rating_sum, product.rating_histogram
+
+    def test_summary_follows_review_writes(self):
+        Review.objects.create(product=self.product, user_name="Anu", rating=5, comment="Lovely")
+        review = Review.objects.create(product=self.product, user_name="Bina", rating=3, comment="Okay")
+        self.assertEqual(self._summary(self.product), (2, 8, {'1': 0, '2': 0, '3': 1, '4': 0, '5': 1}))
+
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 4
+        review.save()
+        self.assertEqual(self._summary(self.product)[:2], (2, 9))
+
+        review.product = self.other
+        review.save()
+        self.assertEqual(self._summary(self.product)[:2], (1, 5))
+        self.assertEqual(self._summary(self.other)[:2], (1, 4))
+
+        Review.objects.filter(product=self.product).delete()
+        self.assertEqual(self._summary(self.product), (0, 0, {str(i): 0 for i in range(1, 6)}))
+        self.assertEqual(self.product.average_rating, 0)
+
+    def test_saving_a_stale_product_keeps_counters(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        Review.objects.create(product=self.product, user_name="Anu", rating=4, comment="Nice")
+        stale.price = 7200
+        stale.save()
+        self.assertEqual(self._summary(self.product)[:2], (1, 4))
+        self.assertEqual(self.product.price, 7200)
+
+    def test_repair_command(self):
+        Review.objects.create(product=self.product, user_name="Anu", rating=2, comment="Meh")
+        Product.objects.filter(pk=self.product.pk).update(review_count=7, rating_sum=1)
+
+        with self.assertRaises(CommandError):
+            call_command('repair_rating_summaries', '--check', stdout=StringIO())
+        call_command('repair_rating_summaries', stdout=StringIO())
+        self.assertEqual(self._summary(self.product)[:2], (1, 2))
+        call_command('repair_rating_summaries', '--check', stdout=StringIO())
+
+    def test_catalog_reads_summary_columns(self):
+        Review.objects.create(product=self.product, user_name="Anu", rating=3, comment="Fine")
+        Review.objects.create(product=self.other, user_name="Bina", rating=5, comment="Great")
+
+        res = self.client.get('/api/v1/products/?ordering=-annotated_avg_rating')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual([row['slug'] for row in results], ['eri-saree', 'paat-saree'])
+        self.assertEqual((results[0]['average_rating'], results[0]['review_count']), (5.0, 1))
+
+        res = self.client.get('/api/v1/products/paat-saree/')
+        self.assertEqual(res.data['rating_histogram']['3'], 1)
+        self.assertEqual(res.data['average_rating'], 3.0)
+
+
+@override_settings(CATALOG_CACHE_TTL=0)
+class CatalogPriceBoundsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.sarees = Category.objects.create(name="Sarees", slug="sarees")
+        self.gamusa = Category.objects.create(name="Gamusa", slug="gamusa")
+        self.paat = Product.objects.create(
+            name="Paat Saree", slug="paat-saree", category=self.sarees, price=7000, sku="EBA-PAT01"
+        )
+        Product.objects.create(
+            name="Muga Saree", slug="muga-saree", category=self.sarees, price=15000,
+            sku="EBA-MUG01", badge='best_seller'
+        )
+        Product.objects.create(
+            name="Cotton Gamusa", slug="cotton-gamusa", category=self.gamusa, price=300, sku="EBA-GMS01"
+        )
+
+    def _bounds(self, query=''):
+        res = self.client.get(f'/api/v1/products/{query}')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data['min_price'], res.data['max_price']
+
+    def test_bounds_are_cached_until_prices_change(self):
+        self.assertEqual(self._bounds(), (300.0, 15000.0))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._bounds(), (300.0, 15000.0))
+        self.assertFalse(any('MAX(' in query['sql'].upper() for query in ctx.captured_queries))
+
+        product = Product.objects.get(pk=self.paat.pk)
+        product.stock_quantity = 4
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertIsNotNone(cache.get(PRICE_BOUNDS_CACHE_KEY))
+
+        product.price = 20000
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+            # Not before commit: a concurrent miss would cache the old prices again.
+            self.assertIsNotNone(cache.get(PRICE_BOUNDS_CACHE_KEY))
+        self.assertEqual(self._bounds(), (300.0, 20000.0))
+
+        product.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+            Product.objects.get(slug='muga-saree').delete()
+        self.assertEqual(self._bounds(), (300.0, 300.0))
+
+    def test_category_and_filtered_bounds(self):
+        self.assertEqual(self._bounds('?category=sarees&price_bounds=category'), (7000.0, 15000.0))
+        self.assertEqual(self._bounds('?category=unknown&price_bounds=category'), (300.0, 15000.0))
+        self.assertEqual(
+            self._bounds('?badge=best_seller&min_price=100&max_price=200&price_bounds=filtered'),
+            (15000.0, 15000.0)
+        )
+
+
+@override_settings(CATALOG_CACHE_TTL=300)
+class CatalogResponseCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Sarees", slug="sarees")
+        self.products = [
+            Product.objects.create(
+                name=f"Paat Saree {i}", slug=f"paat-saree-{i}", category=self.category,
+                description="Handwoven paat silk " * 40, price=7000 + i, sku=f"EBA-PAT{i:02d}"
+            )
+            for i in range(3)
+        ]
+
+    def _get(self, url, **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, **extra)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, len(ctx.captured_queries)
+
+    def test_hits_skip_the_orm_and_share_normalized_keys(self):
+        res, queries = self._get('/api/v1/products/?ordering=-created_at&page=1')
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertGreater(queries, 0)
+
+        res, queries = self._get('/api/v1/products/?page=1&category=')
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(queries, 0)
+        self.assertEqual(len(res.json()['results']), 3)
+
+        res, _ = self._get('/api/v1/products/?ordering=price')
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    def test_gzipped_bodies_are_served_when_accepted(self):
+        self._get('/api/v1/products/paat-saree-0/')
+        res, _ = self._get('/api/v1/products/paat-saree-0/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(res.content))['slug'], 'paat-saree-0')
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_changes_purge_only_affected_tags(self):
+        for url in ['/api/v1/products/', '/api/v1/products/paat-saree-0/', '/api/v1/products/paat-saree-1/']:
+            self._get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.products[0], user_name="Anu", rating=5, comment="Lovely")
+        self.assertEqual(self._get('/api/v1/products/')[0]['X-Cache'], 'MISS')
+        res, _ = self._get('/api/v1/products/paat-saree-0/')
+        self.assertEqual((res['X-Cache'], res.json()['review_count']), ('MISS', 1))
+        self.assertEqual(self._get('/api/v1/products/paat-saree-1/')[0]['X-Cache'], 'HIT')
+
+        self.category.name = "Silk Sarees"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        res, _ = self._get('/api/v1/products/paat-saree-1/')
+        self.assertEqual((res['X-Cache'], res.json()['category']['name']), ('MISS', 'Silk Sarees'))
+
+    def test_purges_wait_for_commit(self):
+        self._get('/api/v1/products/paat-saree-0/')
+        with self.captureOnCommitCallbacks() as callbacks:
+            Product.objects.filter(pk=self.products[0].pk).first().save()
+            self.assertEqual(self._get('/api/v1/products/paat-saree-0/')[0]['X-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._get('/api/v1/products/paat-saree-0/')[0]['X-Cache'], 'MISS')
+
+    def test_purge_during_build_invalidates_the_stored_entry(self):
+        serialize = ProductDetailView.get_serializer
+
+        def purge_midway(view, *args, **kwargs):
+            purge_tags(f"product:{self.products[0].pk}")
+            return serialize(view, *args, **kwargs)
+
+        with mock.patch.object(ProductDetailView, 'get_serializer', purge_midway):
+            self.assertEqual(self._get('/api/v1/products/paat-saree-0/')[0]['X-Cache'], 'MISS')
+        self.assertEqual(self._get('/api/v1/products/paat-saree-0/')[0]['X-Cache'], 'MISS')
+        self.assertEqual(self._get('/api/v1/products/paat-saree-0/')[0]['X-Cache'], 'HIT')
+
+
+class ProductConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Sarees", slug="sarees")
+        self.product = Product.objects.create(
+            name="Paat Saree", slug="paat-saree", category=category, price=7000, sku="EBA-PAT01"
+        )
+        self.url = '/api/v1/products/paat-saree/'
+
+    def _revalidate(self, etag):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_product_revalidates_with_one_query(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        etag = res['ETag']
+        with self.assertNumQueries(1):
+            res = self._revalidate(etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+        res = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=self.client.get(self.url)['Last-Modified'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_related_changes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        ProductImage.objects.create(product=self.product, image='products/paat.jpg', is_primary=True)
+        res = self._revalidate(etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        etag = res['ETag']
+        Review.objects.create(product=self.product, user_name="Anu", rating=5, comment="Lovely")
+        res = self._revalidate(etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['review_count'], 1)
+
+    def test_missing_product_is_still_404(self):
+        res = self.client.get('/api/v1/products/unknown/', HTTP_IF_NONE_MATCH='W/"x"')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(CATALOG_CACHE_TTL=0)
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Sarees", slug="sarees")
+        self.products = [
+            Product.objects.create(
+                name=f"Saree {i:02d}", slug=f"saree-{i:02d}", category=category,
+                price=1000 + (i % 4) * 500, sku=f"EBA-SAR{i:02d}"
+            )
+            for i in range(25)
+        ]
+        # Ties on every ordering key exercise the id tie-break.
+        Product.objects.filter(id__in=[p.id for p in self.products[5:15]]).update(
+            created_at=datetime(2026, 1, 1, 10, 30, 15, 123456, tzinfo=dt_timezone.utc)
+        )
+        for i, product in enumerate(self.products[:6]):
+            Review.objects.create(product=product, user_name="Anu", rating=1 + i % 3, comment="Nice")
+
+    def _walk(self, query):
+        seen = []
+        url = f'/api/v1/products/?cursor=&{query}'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', res.data)
+            seen.extend(row['slug'] for row in res.data['results'])
+            url = res.data['next']
+        return seen
+
+    def test_cursor_walk_covers_every_ordering_in_order(self):
+        products = Product.objects.annotate(annotated_avg_rating=average_rating_expression())
+        for ordering in ['-created_at', 'created_at', 'price', '-price', 'name', '-annotated_avg_rating']:
+            field = ordering.lstrip('-')
+            descending = ordering.startswith('-')
+            key = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+            expected = list(products.order_by(key, '-id' if descending else 'id').values_list('slug', flat=True))
+            self.assertEqual(self._walk(f'ordering={ordering}'), expected, ordering)
+
+    def test_count_is_opt_in_and_deep_pages_skip_offsets(self):
+        res = self.client.get('/api/v1/products/?cursor=&count=true')
+        self.assertEqual(res.data['count'], 25)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(res.data['next'].replace('&count=true', '').replace('count=true&', ''))
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries).upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_invalid_cursor_is_rejected(self):
+        res = self.client.get('/api/v1/products/?cursor=not-a-cursor')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_mode_is_unchanged(self):
+        res = self.client.get('/api/v1/products/?page=2')
+        self.assertEqual(res.data['count'], 25)
+        self.assertEqual(len(res.data['results']), 5)
+
+
+@override_settings(CATALOG_CACHE_TTL=0)
+class ProductFullTextSearchTestCase(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Sarees", slug="sarees")
+        self.muga = Product.objects.create(
+            name="Muga Silk Mekhela", slug="muga-silk-mekhela", category=category, price=9000,
+            sku="EBA-MUG01", description="Golden muga silk woven in Sualkuchi."
+        )
+        self.paat = Product.objects.create(
+            name="Paat Saree", slug="paat-saree", category=category, price=7000,
+            sku="EBA-PAT01", description="Soft paat with muga motifs."
+        )
+        Product.objects.create(
+            name="Cotton Gamusa", slug="cotton-gamusa", category=category, price=300,
+            sku="EBA-GMS01", description="Everyday handloom gamusa."
+        )
+
+    def _search(self, query, extra=''):
+        res = self.client.get(f'/api/v1/products/?search_mode=fulltext&search={query}{extra}')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['slug'] for row in res.data['results']]
+
+    def test_uses_the_fts_index_on_sqlite(self):
+        self.assertEqual(get_search_backend().name, 'sqlite-fts5')
+
+    def test_prefix_matching_and_ranking(self):
+        # Name matches outrank description matches.
+        self.assertEqual(self._search('muga'), ['muga-silk-mekhela', 'paat-saree'])
+        self.assertEqual(self._search('mek'), ['muga-silk-mekhela'])
+        self.assertEqual(self._search('eba-gms'), ['cotton-gamusa'])
+        self.assertEqual(self._search('muga&ordering=price'), ['paat-saree', 'muga-silk-mekhela'])
+        # FTS query syntax in user input is treated as plain words.
+        self.assertEqual(self._search('"muga*'), ['muga-silk-mekhela', 'paat-saree'])
+
+    def test_index_follows_writes(self):
+        product = Product.objects.get(pk=self.paat.pk)
+        product.name = "Eri Saree"
+        product.save()
+        self.assertEqual(self._search('eri'), ['paat-saree'])
+        self.assertEqual(self._search('paat'), ['paat-saree'])  # still in the description
+
+        Product.objects.filter(pk=self.muga.pk).update(description="Plain weave")
+        Product.objects.filter(pk=self.paat.pk).delete()
+        self.assertEqual(self._search('muga'), ['muga-silk-mekhela'])
+        self.assertEqual(self._search('golden'), [])
+
+    def test_rebuild_command_repairs_the_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER SHOP_product_fts_insert")
+        Product.objects.create(
+            name="Eri Shawl", slug="eri-shawl", category=self.muga.category, price=2500, sku="EBA-ERI01"
+        )
+        self.assertEqual(self._search('shawl'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self._search('shawl'), ['eri-shawl'])
+
+    def test_post_migrate_reinstalls_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER SHOP_product_fts_update")
+        Product.objects.filter(pk=self.muga.pk).update(name="Eri Shawl")
+        self.assertEqual(self._search('shawl'), [])
+
+        with self.assertLogs('SHOP.search', 'WARNING'):
+            emit_post_migrate_signal(verbosity=0, interactive=False, db='default')
+        self.assertEqual(self._search('shawl'), ['muga-silk-mekhela'])
+        self.assertEqual(verify_search_triggers(connection), [])
+
+    def test_search_with_cursor_pagination(self):
+        self.assertEqual(self._search('muga', '&cursor='), ['muga-silk-mekhela', 'paat-saree'])
+
+
+@override_settings(CATALOG_CACHE_TTL=0)
+class ProductFuzzySearchTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.mekhela = Category.objects.create(name="Mekhela Chador", slug="mekhela-chador")
+        self.accessories = Category.objects.create(name="Accessories", slug="accessories")
+        self.pat = Product.objects.create(
+            name="Pat Silk Mekhela Chador", slug="pat-silk-mekhela-chador", category=self.mekhela, price=9000,
+            sku="EBA-MKC01"
+        )
+        self.riha = Product.objects.create(
+            name="Riha Set", slug="riha-set", category=self.mekhela, price=6000, sku="EBA-RHA01"
+        )
+        self.jaapi = Product.objects.create(
+            name="Jokaxiba Jaapi", slug="jokaxiba-jaapi", category=self.accessories, price=1200,
+            sku="EBA-JPI01"
+        )
+
+    def _search(self, query, mode='fuzzy'):
+        res = self.client.get('/api/v1/products/', {'search': query, 'search_mode': mode})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['slug'] for row in res.data['results']]
+
+    def test_spelling_folding(self):
+        self.assertEqual(fold_text("Mekhela Chador"), fold_text("mekela sador"))
+        self.assertEqual(fold_text("Jokaxiba"), fold_text("jokasiba"))
+        self.assertEqual(Product.objects.get(pk=self.pat.pk).search_text, "pat silk mekela sador")
+
+    def test_typos_and_transliterations(self):
+        self.assertEqual(self._search('mekhla')[0], 'pat-silk-mekhela-chador')
+        self.assertEqual(self._search('mekela sador')[0], 'pat-silk-mekhela-chador')
+        self.assertEqual(self._search('jokasiba'), ['jokaxiba-jaapi'])
+        # Category-name matches rank below the direct name match.
+        self.assertEqual(self._search('mekhla'), ['pat-silk-mekhela-chador', 'riha-set'])
+
+    def test_synonyms(self):
+        self.assertEqual(self._search('hat pakha'), [])
+        SearchSynonym.objects.create(term="Jaapi", variants="hat pakha, japi")
+        self.assertEqual(self._search('hat pakha'), ['jokaxiba-jaapi'])
+
+    def test_auto_mode_falls_back_to_fuzzy(self):
+        self.assertEqual(self._search('mekhla', mode='fulltext'), [])
+        self.assertEqual(self._search('mekhla', mode='auto')[0], 'pat-silk-mekhela-chador')
+        with self.settings(FUZZY_SEARCH_FALLBACK=False):
+            self.assertEqual(self._search('mekhla', mode='auto'), [])
+
+    def test_index_follows_renames_and_rebuild(self):
+        product = Product.objects.get(pk=self.riha.pk)
+        product.name = "Gamosa"
+        product.save()
+        self.assertEqual(self._search('gamusa'), ['riha-set'])
+
+        Product.objects.filter(pk=self.riha.pk).update(name="Xorai")
+        self.assertEqual(self._search('sorai'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self._search('sorai'), ['riha-set'])
+
+    def test_time_budget_returns_partial_results(self):
+        with self.settings(FUZZY_SEARCH_BUDGET_MS=0), self.assertLogs('SHOP.fuzzy', 'WARNING'):
+            results = fuzzy_search_products(Product.objects.all(), 'mekhla')
+        self.assertEqual(list(results), [])
+
+
+class ProductSuggestTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reset_suggestion_index()
+        self.addCleanup(reset_suggestion_index)
+        self.category = Category.objects.create(name="Mekhela Chador", slug="mekhela-chador")
+        self.muga = Product.objects.create(
+            name="Muga Silk Mekhela", slug="muga-silk-mekhela", category=self.category, price=9000, sku="EBA-MUG01"
+        )
+        self.featured = Product.objects.create(
+            name="Muga Gamosa", slug="muga-gamosa", category=self.category, price=800, sku="EBA-GMS01",
+            is_featured=True
+        )
+        for session in range(5):
+            AnalyticsEvent.objects.create(event_type='search', search_query='Muga Saree', session_id=f"s{session}")
+        for _ in range(20):
+            # Popular with one visitor only.
+            AnalyticsEvent.objects.create(event_type='search', search_query='Mulberry', session_id='s0')
+
+    def _suggest(self, query, **params):
+        res = self.client.get('/api/v1/products/suggest/', {'q': query, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_prefix_matches(self):
+        data = self._suggest('Mu')
+        self.assertEqual([p['slug'] for p in data['products']], ['muga-gamosa', 'muga-silk-mekhela'])
+        self.assertEqual(data['queries'], ['muga saree'])  # searched by one session is not popular
+        self.assertEqual(self._suggest('mekh')['categories'], [{'name': "Mekhela Chador", 'slug': "mekhela-chador"}])
+        self.assertEqual([p['slug'] for p in self._suggest('mekh')['products']], ['muga-silk-mekhela'])
+        self.assertEqual([p['slug'] for p in self._suggest('eba-gms')['products']], ['muga-gamosa'])
+        self.assertEqual([p['slug'] for p in self._suggest('mu', limit=1)['products']], ['muga-gamosa'])
+        self.assertEqual(self._suggest('  ')['products'], [])
+
+    def test_warm_index_makes_no_queries(self):
+        self._suggest('mu')
+        with self.assertNumQueries(0):
+            self._suggest('muga s')
+
+    def test_private_looking_queries_are_never_suggested(self):
+        for session in range(5):
+            for query in ('mukul@example.com', 'muga 98640 12345', 'order MU-20261018', 'muga saree blue'):
+                AnalyticsEvent.objects.create(event_type='search', search_query=query, session_id=f"s{session}")
+        self.assertEqual(self._suggest('mu')['queries'], ['muga saree', 'muga saree blue'])
+
+    @override_settings(SUGGEST_INDEX_MAX_AGE=-1)
+    def test_stale_index_is_served_while_it_is_rebuilt_in_the_background(self):
+        index = get_suggestion_index()
+        with mock.patch('SHOP.suggest._start_rebuild') as start_rebuild, self.assertNumQueries(0):
+            self.assertIs(get_suggestion_index(), index)
+            self.assertIs(get_suggestion_index(), index)
+        # One rebuild at a time; it runs on a background thread, here inline.
+        start_rebuild.assert_called_once_with()
+        suggest_module._rebuild()
+        self.assertIsNot(suggest_module._index, index)
+        self.assertFalse(suggest_module._build_lock.locked())
+
+    def test_rebuilds_reuse_cached_popular_queries(self):
+        get_suggestion_index()
+        suggest_module._build_lock.acquire()
+        # Products and categories only: the analytics aggregate is not run again.
+        with self.assertNumQueries(2):
+            suggest_module._rebuild()
+        self.assertEqual(self._suggest('mu')['queries'], ['muga saree'])
+
+    def test_index_follows_catalog_changes(self):
+        self._suggest('mu')
+        generation = cache.get('shop:suggest_generation', 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.get(pk=self.muga.pk)
+            product.name = "Paat Silk Mekhela"
+            product.save()
+            Product.objects.get(pk=self.featured.pk).delete()
+            Category.objects.create(name="Accessories", slug="accessories")
+        self.assertEqual(self._suggest('mu')['products'], [])
+        self.assertEqual([p['slug'] for p in self._suggest('paat')['products']], ['muga-silk-mekhela'])
+        self.assertEqual(self._suggest('acc')['categories'][0]['slug'], 'accessories')
+        # Applied in place; the bumped generation tells other processes to rebuild.
+        self.assertEqual(get_suggestion_index().generation, generation + 3)
+
+
+class ProductFacetsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        sarees = Category.objects.create(name="Sarees", slug="sarees")
+        gamosa = Category.objects.create(name="Gamosa", slug="gamosa")
+        Product.objects.create(
+            name="Muga Saree", slug="muga-saree", category=sarees, price=9000, compare_price=12000,
+            sku="F-1", badge='bestseller'
+        )
+        Product.objects.create(
+            name="Paat Saree", slug="paat-saree", category=sarees, price=7000, sku="F-2", stock_status='out_of_stock'
+        )
+        Product.objects.create(
+            name="Cotton Gamosa", slug="cotton-gamosa", category=gamosa, price=300, compare_price=400, sku="F-3"
+        )
+        Product.objects.create(
+            name="Hidden Gamosa", slug="hidden-gamosa", category=gamosa, price=300, sku="F-4", is_active=False
+        )
+
+    def _facets(self, **params):
+        res = self.client.get('/api/v1/products/facets/', params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.json()
+
+    def test_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self._facets()
+        self.assertEqual(data['total'], 3)
+        facets = data['facets']
+        self.assertEqual(facets['category'], [
+            {'slug': 'sarees', 'name': 'Sarees', 'count': 2},
+            {'slug': 'gamosa', 'name': 'Gamosa', 'count': 1},
+        ])
+        self.assertEqual(facets['badge'], [{'value': 'bestseller', 'count': 1}])
+        self.assertEqual(facets['stock_status'], [
+            {'value': 'in_stock', 'count': 2}, {'value': 'out_of_stock', 'count': 1}
+        ])
+        self.assertEqual(facets['on_sale'], {'true': 2, 'false': 1})
+        self.assertEqual({bucket['key']: bucket['count'] for bucket in facets['price'] if bucket['count']}, {
+            '0-500': 1, '5000-10000': 2
+        })
+
+    def test_each_facet_ignores_its_own_filter(self):
+        data = self._facets(category='sarees', on_sale='true')
+        self.assertEqual(data['total'], 1)
+        facets = data['facets']
+        # Categories are counted with on_sale applied but not the category filter.
+        self.assertEqual([(c['slug'], c['count']) for c in facets['category']], [('gamosa', 1), ('sarees', 1)])
+        self.assertEqual(facets['on_sale'], {'true': 1, 'false': 1})
+        self.assertEqual(self._facets(max_price='1000')['facets']['category'][0]['slug'], 'gamosa')
+        self.assertEqual(self._facets(max_price='1000')['total'], 1)
+        self.assertEqual(self._facets(search='saree', search_mode='fulltext')['total'], 2)
+
+    @override_settings(CATALOG_CACHE_TTL=300)
+    def test_cached_per_filter_key(self):
+        self._facets(category='sarees')
+        res = self.client.get('/api/v1/products/facets/', {'category': 'sarees', 'page': '3', 'ordering': 'price'})
+        self.assertEqual(res['X-Cache'], 'HIT')
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(slug='paat-saree').first().save()
+        res = self.client.get('/api/v1/products/facets/', {'category': 'sarees'})
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+
+class ProductBatchTestCase(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Sarees", slug="sarees")
+        self.muga = Product.objects.create(name="Muga Saree", slug="muga-saree", category=category, price=9000, sku="B-1")
+        self.paat = Product.objects.create(name="Paat Saree", slug="paat-saree", category=category, price=7000, sku="B-2")
+        ProductImage.objects.create(product=self.paat, image='products/paat-2.jpg', order=2)
+        ProductImage.objects.create(product=self.paat, image='products/paat-1.jpg', is_primary=True, order=5)
+        self.hidden = Product.objects.create(
+            name="Old Saree", slug="old-saree", category=category, price=100, sku="B-3", is_active=False
+        )
+
+    def test_cards_in_request_order_in_one_query(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(f'/api/v1/products/batch/?ids={self.paat.id},{self.muga.id},{self.hidden.id},999')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([card['slug'] for card in res.data['results']], ['paat-saree', 'muga-saree'])
+        self.assertEqual(res.data['missing'], [self.hidden.id, 999])
+        card = res.data['results'][0]
+        self.assertTrue(card['primary_image'].endswith('products/paat-1.jpg'))
+        self.assertEqual(card['category'], {'name': 'Sarees', 'slug': 'sarees'})
+        self.assertIsNone(res.data['results'][1]['primary_image'])
+
+        res = self.client.get('/api/v1/products/batch/?slugs=muga-saree,nope')
+        self.assertEqual([card['id'] for card in res.data['results']], [self.muga.id])
+        self.assertEqual(res.data['missing'], ['nope'])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get('/api/v1/products/batch/').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/v1/products/batch/?ids=1,x').status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(PRODUCT_BATCH_MAX_ITEMS=2):
+            res = self.client.get('/api/v1/products/batch/?ids=1,2,3')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unchanged_batch_revalidates_with_304(self):
+        url = f'/api/v1/products/batch/?ids={self.muga.id},{self.paat.id}'
+        etag = self.client.get(url)['ETag']
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        product = Product.objects.get(pk=self.muga.pk)
+        product.price = 8500
+        product.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['results'][0]['price'], '8500.00')
+
+
+@override_settings(CATALOG_CACHE_TTL=0)
+class ProductSparseFieldsetTestCase(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Sarees", slug="sarees")
+        self.product = Product.objects.create(
+            name="Muga Saree", slug="muga-saree", category=category, price=9000, sku="F-1",
+            description="Long description"
+        )
+        ProductImage.objects.create(product=self.product, image='products/muga.jpg', is_primary=True)
+        Review.objects.create(product=self.product, user_name="Rupa", rating=5, comment="Lovely")
+
+    def test_fields_param_limits_the_payload(self):
+        res = self.client.get('/api/v1/products/?fields=name,price')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{'id': self.product.id, 'name': 'Muga Saree', 'price': '9000.00'}])
+
+    def test_grid_view_skips_unrendered_relations(self):
+        self.client.get('/api/v1/products/')  # caches the price bounds
+        with CaptureQueriesContext(connection) as full:
+            self.client.get('/api/v1/products/')
+        with CaptureQueriesContext(connection) as grid:
+            res = self.client.get('/api/v1/products/?view=grid')
+        [card] = res.data['results']
+        self.assertNotIn('category', card)
+        self.assertTrue(card['primary_image'].endswith('products/muga.jpg'))
+        self.assertEqual(len(grid), len(full))
+
+        with CaptureQueriesContext(connection) as bare:
+            self.client.get('/api/v1/products/?fields=name')
+        self.assertEqual(len(bare), len(full) - 1)  # no image prefetch
+        self.assertNotIn('JOIN', bare.captured_queries[-1]['sql'])
+
+    def test_detail_fields_and_etag(self):
+        url = '/api/v1/products/muga-saree/'
+        full = self.client.get(url)
+        with self.assertNumQueries(2):  # validators + product, nothing prefetched
+            res = self.client.get(f'{url}?fields=name,price')
+        self.assertEqual(set(res.data), {'id', 'name', 'price'})
+        self.assertNotEqual(res['ETag'], full['ETag'])
+
+    def test_unknown_fields_are_rejected(self):
+        self.assertEqual(self.client.get('/api/v1/products/?fields=name,secret').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/v1/products/?view=table').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CATALOG_CACHE_TTL=0)
+class CategorySideloadTestCase(APITestCase):
+    def setUp(self):
+        self.sarees = Category.objects.create(name="Sarees", slug="sarees", image='categories/sarees.jpg')
+        self.shawls = Category.objects.create(name="Shawls", slug="shawls")
+        for i in range(4):
+            Product.objects.create(
+                name=f"Saree {i}", slug=f"saree-{i}", category=self.sarees, price=1000 + i, sku=f"SL-S{i}", is_featured=True
+            )
+        Product.objects.create(name="Eri Shawl", slug="eri-shawl", category=self.shawls, price=800, sku="SL-E1")
+
+    def test_product_list_returns_each_category_once(self):
+        res = self.client.get('/api/v1/products/?include=categories')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(res.data['categories']), sorted([str(self.sarees.id), str(self.shawls.id)]))
+        self.assertEqual(res.data['categories'][str(self.sarees.id)]['slug'], 'sarees')
+        self.assertTrue(res.data['categories'][str(self.sarees.id)]['image'].endswith('categories/sarees.jpg'))
+        for card in res.data['results']:
+            self.assertNotIn('category', card)
+            self.assertIn(str(card['category_id']), res.data['categories'])
+        self.assertIn('min_price', res.data)
+
+        nested = self.client.get('/api/v1/products/')
+        self.assertNotIn('categories', nested.data)
+        self.assertIn('slug', nested.data['results'][0]['category'])
+        self.assertLess(len(res.content), len(nested.content))
+
+    def test_featured_and_category_lists(self):
+        res = self.client.get('/api/v1/products/featured/?include=categories')
+        self.assertEqual(list(res.data['categories']), [str(self.sarees.id)])
+        res = self.client.get('/api/v1/categories/shawls/products/?include=categories')
+        self.assertEqual(list(res.data['categories']), [str(self.shawls.id)])
+        self.assertEqual(res.data['results'][0]['category_id'], self.shawls.id)
+
+    def test_sparse_fields_without_category(self):
+        res = self.client.get('/api/v1/products/?include=categories&fields=name')
+        self.assertEqual(res.data['categories'], {})
+        self.assertNotIn('category_id', res.data['results'][0])
+
+
+class MediaUrlCacheTestCase(TestCase):
+    def setUp(self):
+        clear_media_url_cache()
+        field = ProductImage._meta.get_field('image')
+        self.image = field.attr_class(None, field, 'products/muga.jpg')
+
+    def test_urls_are_memoized_per_host(self):
+        request = RequestFactory().get('/', HTTP_HOST='testserver')
+        with mock.patch.object(self.image.storage, 'url', wraps=self.image.storage.url) as storage_url:
+            first = get_complete_url(self.image, request)
+            self.assertEqual(get_complete_url(self.image, RequestFactory().get('/', HTTP_HOST='testserver')), first)
+            self.assertEqual(storage_url.call_count, 1)
+            self.assertEqual(first, 'http://testserver/media/products/muga.jpg')
+
+            other = RequestFactory().get('/', HTTP_HOST='shop.example.com')
+            with self.settings(ALLOWED_HOSTS=['shop.example.com']):
+                self.assertEqual(get_complete_url(self.image, other), 'http://shop.example.com/media/products/muga.jpg')
+            self.assertEqual(get_complete_url(self.image), '/media/products/muga.jpg')
+
+    def test_settings_changes_clear_the_cache(self):
+        self.assertEqual(get_complete_url(self.image), '/media/products/muga.jpg')
+        with self.settings(CLOUDINARY_CLOUD_NAME='ebasi', DEBUG=False):
+            self.assertEqual(
+                get_complete_url(self.image), 'https://res.cloudinary.com/ebasi/image/upload/products/muga.jpg'
+            )
+        self.assertEqual(get_complete_url(self.image), '/media/products/muga.jpg')
+
+
+def _photo_upload(name='photo.jpg', size=(1200, 900)):
+    """A JPEG with an EXIF orientation (rotate 90°) and camera tag, like a phone upload."""
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = 'PhoneMaker'
+    buffer = BytesIO()
+    Image.new('RGB', size, (180, 40, 40)).save(buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(
+    CATALOG_CACHE_TTL=0, IMAGE_DERIVATIVE_WIDTHS=[320, 640, 1440], IMAGE_DERIVATIVE_FORMATS=['avif', 'webp'],
+    IMAGE_DERIVATIVE_BACKGROUND=False
+)
+class ImageDerivativeTestCase(APITestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+        self.category = Category.objects.create(name="Sarees", slug="sarees")
+        self.product = Product.objects.create(name="Muga Saree", slug="muga-saree", category=self.category, price=9000, sku="D-1")
+
+    def test_upload_generates_oriented_stripped_derivatives(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=_photo_upload(), is_primary=True)
+        record = ProductImage.objects.get(pk=image.pk).image_derivatives
+
+        # EXIF orientation applied: the 1200x900 photo is portrait.
+        self.assertEqual((record['source'], record['width'], record['height']), (image.image.name, 900, 1200))
+        widths = sorted({variant['width'] for variant in record['variants']})
+        self.assertEqual(widths, [320, 640, 900])  # never upscaled
+        self.assertEqual({variant['format'] for variant in record['variants']}, {'avif', 'webp'})
+        for variant in record['variants']:
+            with image.image.storage.open(variant['name']) as handle:
+                derivative = Image.open(handle)
+                self.assertEqual(derivative.size, (variant['width'], variant['height']))
+                self.assertEqual(dict(derivative.getexif()), {})
+
+    def test_serializers_expose_srcset_and_dimensions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=self.product, image=_photo_upload(), is_primary=True)
+            self.category.image = _photo_upload('category.jpg', size=(600, 400))
+            self.category.save()
+
+        detail = self.client.get('/api/v1/products/muga-saree/').data
+        sources = detail['images'][0]['sources']
+        self.assertEqual((sources['width'], sources['height']), (900, 1200))
+        self.assertRegex(sources['srcset']['webp'], r'^http://testserver/media/products/derivatives/\S+-320w\.webp 320w, ')
+        self.assertEqual(detail['category']['image_sources']['srcset']['avif'].count('w,'), 1)  # 320w, 400w
+
+        card = self.client.get('/api/v1/products/?view=grid').data['results'][0]
+        self.assertEqual(card['primary_image_sources'], sources)
+
+    def test_uploads_are_encoded_after_commit_in_the_background(self):
+        derivatives_dir = os.path.join(settings.MEDIA_ROOT, 'products', 'derivatives')
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            ProductImage.objects.create(product=self.product, image=_photo_upload(), is_primary=True)
+            raise RuntimeError('rolled back')
+        self.assertFalse(os.path.exists(derivatives_dir))  # nothing was encoded before commit
+
+        with self.settings(IMAGE_DERIVATIVE_BACKGROUND=True), mock.patch('SHOP.images.threading.Thread') as thread:
+            with self.captureOnCommitCallbacks(execute=True):
+                image = ProductImage.objects.create(product=self.product, image=_photo_upload(), is_primary=True)
+        thread.assert_called_once_with(
+            target=images_module._refresh_in_background, args=(image, 'image'), name='image-derivatives', daemon=True
+        )
+        thread.return_value.start.assert_called_once_with()
+        self.assertEqual(ProductImage.objects.get(pk=image.pk).image_derivatives, {})
+
+    def test_variants_of_a_file_replaced_while_encoding_are_discarded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=_photo_upload(), is_primary=True)
+        stored = default_storage.save('products/replacement.jpg', _photo_upload())
+        ProductImage.objects.filter(pk=image.pk).update(image=stored)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(images_module.refresh_derivatives(image, 'image'), {})
+        self.assertEqual(ProductImage.objects.get(pk=image.pk).image_derivatives, image.image_derivatives)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(settings.MEDIA_ROOT, 'products', 'derivatives'))),
+            sorted(posixpath.basename(variant['name']) for variant in image.image_derivatives['variants'])
+        )
+
+    def test_unreadable_files_and_backfill(self):
+        legacy = ProductImage.objects.create(product=self.product, image='products/missing.jpg')
+        self.assertEqual(legacy.image_derivatives, {})
+        self.assertIsNone(self.client.get('/api/v1/products/muga-saree/').data['images'][0]['sources'])
+
+        stored = default_storage.save('products/legacy.jpg', _photo_upload())
+        ProductImage.objects.filter(pk=legacy.pk).update(image=stored)
+        out = StringIO()
+        call_command('generate_image_derivatives', stdout=out)
+        self.assertIn('SHOP.ProductImage.image: generated derivatives for 1 image(s)', out.getvalue())
+        self.assertEqual(ProductImage.objects.get(pk=legacy.pk).image_derivatives['source'], stored)
+
+    @override_settings(CATALOG_CACHE_TTL=300)
+    def test_responses_built_during_encoding_are_purged(self):
+        cache.clear()
+        url = '/api/v1/products/muga-saree/'
+        encode = images_module._encode_variant
+        during = []
+
+        def encode_after_a_read(*args, **kwargs):
+            if not during:
+                during.append(self.client.get(url))
+            return encode(*args, **kwargs)
+
+        # upload_image runs in autocommit: on_commit callbacks run as soon as they are registered.
+        with mock.patch('SHOP.images._encode_variant', encode_after_a_read), \
+                mock.patch('django.db.transaction.on_commit', lambda callback, *args, **kwargs: callback()):
+            ProductImage.objects.create(product=self.product, image=_photo_upload(), is_primary=True)
+        [stale] = during
+        self.assertIsNone(stale.data['images'][0]['sources'])
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=stale['ETag'])
+        self.assertEqual((res.status_code, res['X-Cache']), (status.HTTP_200_OK, 'MISS'))
+        self.assertIsNotNone(res.json()['images'][0]['sources'])
+
+    def test_failed_variants_are_skipped(self):
+        save = default_storage.save
+
+        def flaky_save(name, *args, **kwargs):
+            if name.endswith('.avif'):
+                raise ConnectionError('upload timed out')
+            return save(name, *args, **kwargs)
+
+        with mock.patch.object(default_storage, 'save', flaky_save), self.assertLogs('SHOP.images', 'ERROR') as logs, \
+                self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=_photo_upload(), is_primary=True)
+        self.assertEqual(len(logs.records), 3)
+        record = ProductImage.objects.get(pk=image.pk).image_derivatives
+        self.assertEqual({variant['format'] for variant in record['variants']}, {'webp'})
+
+    def test_replaced_regenerated_and_deleted_images_leave_no_variants(self):
+        def variant_names(instance):
+            return [variant['name'] for variant in instance.image_derivatives['variants']]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.image = _photo_upload('category.jpg', size=(600, 400))
+            self.category.save()
+        first = variant_names(self.category)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.image = _photo_upload('category-new.jpg', size=(600, 400))
+            self.category.save()
+        self.assertFalse(any(default_storage.exists(name) for name in first))
+        self.assertTrue(all(default_storage.exists(name) for name in variant_names(self.category)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=_photo_upload(), is_primary=True)
+        before = variant_names(image)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('generate_image_derivatives', '--force', stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual(len(variant_names(image)), len(before))
+        self.assertFalse(any(default_storage.exists(name) for name in before if name not in variant_names(image)))
+
+        after = variant_names(image)
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertFalse(any(default_storage.exists(name) for name in after))
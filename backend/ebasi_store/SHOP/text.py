@@ -0,0 +1,67 @@
+"""
+Text keys for product search: `simplify_text` for prefix lookups (SHOP.suggest)
+and spelling-insensitive keys for fuzzy search (SHOP.fuzzy).
+
+Romanized Assamese has no fixed spelling: "mekhela"/"mekhla"/"mekela",
+"chador"/"sador", "jokaxiba"/"jokasiba". `fold_text` maps such variants onto one
+key (diacritics dropped, aspirated and interchangeable letters folded, doubled
+letters collapsed); `trigrams` and `similarity` then compare keys the way
+pg_trgm does.
+"""
+import re
+import unicodedata
+
+# Applied in order, so longer spellings are folded before their prefixes.
+_FOLDS = (
+    ('chh', 's'), ('ch', 's'), ('sh', 's'), ('x', 's'), ('z', 'j'),
+    ('kh', 'k'), ('gh', 'g'), ('jh', 'j'), ('th', 't'), ('dh', 'd'),
+    ('ph', 'f'), ('bh', 'b'), ('ck', 'k'), ('q', 'k'), ('c', 'k'),
+    ('w', 'v'), ('y', 'i'), ('ee', 'i'), ('oo', 'u'), ('ou', 'u'),
+)
+_NON_WORD_RE = re.compile(r'[\W_]+', re.UNICODE)
+_DOUBLED_RE = re.compile(r'(.)\1+')
+
+
+def fold_word(word):
+    for spelling, folded in _FOLDS:
+        word = word.replace(spelling, folded)
+    return _DOUBLED_RE.sub(r'\1', word)
+
+
+def simplify_text(text):
+    """Lowercases `text`, drops diacritics and punctuation, and single-spaces its words."""
+    decomposed = unicodedata.normalize('NFKD', (text or '').lower())
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(_NON_WORD_RE.sub(' ', stripped).split())
+
+
+def fold_text(text):
+    """Returns the space-separated, spelling-folded words of `text`."""
+    return ' '.join(fold_word(word) for word in simplify_text(text).split())
+
+
+def trigrams(folded):
+    """Trigrams of already-folded text, each word padded like pg_trgm ("  w", " wo", ..., "rd ")."""
+    grams = set()
+    for word in folded.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(grams, other_grams):
+    """pg_trgm-style similarity of two trigram sets: shared / total distinct (0..1)."""
+    if not grams or not other_grams:
+        return 0.0
+    shared = len(grams & other_grams)
+    return shared / (len(grams) + len(other_grams) - shared)
+
+
+def phrase_similarity(query_words, words):
+    """
+    Average, over the query's words, of the best similarity to any of `words`.
+    Both arguments are lists of per-word trigram sets.
+    """
+    if not query_words or not words:
+        return 0.0
+    return sum(max(similarity(query, word) for word in words) for query in query_words) / len(query_words)
@@ -1,136 +1,282 @@
 from rest_framework import generics, filters, permissions, status
 from rest_framework.decorators import api_view
+from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.conf import settings
 from .models import Category, Product, Review, ProductImage, AnalyticsEvent
-from .serializers import CategorySerializer, ProductListSerializer, ProductDetailSerializer, ReviewSerializer, AnalyticsEventSerializer
-from django.db.models import Q, Count, Avg, Prefetch
+from .serializers import CategorySerializer, ProductListSerializer, ProductDetailSerializer, ProductCardSerializer, ReviewSerializer, AnalyticsEventSerializer
+from django.db.models import OuterRef, Q, Prefetch, Subquery
 from accounts.views import SensitiveAnonThrottle, SensitiveUserThrottle
-
-
-class CategoryListView(generics.ListAPIView):
+from .ingest import get_ingest_mode, get_event_buffer, get_spool_writer, spool_record
+from .parsers import GzipJSONParser, GzipNDJSONParser
+from .price_bounds import get_price_bounds, get_filtered_price_bounds
+from .ratings import average_rating_expression
+from .response_cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin, make_etag
+from .pagination import KeysetPagination
+from .search import ProductSearchFilter
+from .filters import CATALOG_FILTER_PARAMS, FACET_FILTERS, apply_catalog_filters
+from .facets import compute_facets
+from .suggest import get_suggestion_index
+from .fieldsets import SparseFieldsetViewMixin
+from .sideload import CategorySideloadViewMixin
+
+
+class CategoryListView(CachedResponseMixin, generics.ListAPIView):
+    response_cache_tags = ('categories',)
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
 
 
-class ProductListView(generics.ListAPIView):
-    serializer_class = ProductListSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description', 'short_description', 'sku']
-    ordering_fields = ['price', 'created_at', 'name', 'annotated_avg_rating']
-    ordering = ['-created_at']
+# ?view=grid for the storefront product lists: what a product card renders.
+PRODUCT_CARD_FIELDS = (
+    'id', 'name', 'slug', 'price', 'compare_price', 'is_on_sale', 'discount_percentage',
+    'stock_status', 'badge', 'primary_image', 'primary_image_sources', 'average_rating', 'review_count'
+)
 
-    def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True).select_related('category').annotate(
-            annotated_review_count=Count('reviews', distinct=True),
-            annotated_avg_rating=Avg('reviews__rating')
-        ).prefetch_related(
+
+def with_list_relations(view, queryset):
+    """Joins the category and prefetches the images (primary first) when the response renders them."""
+    if view.wants_field('category'):
+        queryset = queryset.select_related('category')
+    if view.wants_field('primary_image', 'primary_image_sources'):
+        queryset = queryset.prefetch_related(
             Prefetch('images', queryset=ProductImage.objects.order_by('-is_primary', 'order'))
         )
+    return queryset
 
-        # Custom filtering for category, price range, etc.
-        category_slug = self.request.query_params.get('category', None)
-        if category_slug:
-             queryset = queryset.filter(category__slug=category_slug)
-
-        min_price = self.request.query_params.get('min_price', None)
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-
-        max_price = self.request.query_params.get('max_price', None)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-
-        badge = self.request.query_params.get('badge', None)
-        if badge:
-            queryset = queryset.filter(badge=badge)
 
-        in_stock = self.request.query_params.get('in_stock', None)
-        if in_stock == 'true':
-            queryset = queryset.filter(stock_status='in_stock')
-
-        on_sale = self.request.query_params.get('on_sale', None)
-        if on_sale == 'true':
-            from django.db.models import F
-            queryset = queryset.filter(compare_price__gt=F('price'))
+class ProductListView(CategorySideloadViewMixin, SparseFieldsetViewMixin, CachedResponseMixin, generics.ListAPIView):
+    serializer_class = ProductListSerializer
+    pagination_class = KeysetPagination
+    field_presets = {'grid': PRODUCT_CARD_FIELDS}
+    response_cache_defaults = {'page': '1', 'ordering': '-created_at', 'price_bounds': 'catalog'}
+    # Search runs last so that, without an explicit ?ordering=, it can order by relevance.
+    filter_backends = [filters.OrderingFilter, ProductSearchFilter]
+    ordering_fields = ['price', 'created_at', 'name', 'annotated_avg_rating']
+    ordering = ['-created_at']
 
-        is_featured = self.request.query_params.get('is_featured', None)
-        if is_featured == 'true':
-            queryset = queryset.filter(is_featured=True)
+    def get_queryset(self, include_price_filters=True):
+        queryset = with_list_relations(self, Product.objects.filter(is_active=True).annotate(
+            annotated_avg_rating=average_rating_expression()
+        ))
 
-        return queryset
+        # Custom filtering for category, price range, etc.
+        skip = () if include_price_filters else ('price',)
+        return apply_catalog_filters(queryset, self.request.query_params, skip=skip)
+
+    def get_price_bounds(self):
+        """
+        Price slider bounds. `?price_bounds=` selects the scope:
+        - 'catalog' (default): all active products, served from cache.
+        - 'category': active products in `?category=`, served from cache.
+        - 'filtered': products matching every current filter except the price range itself.
+        """
+        scope = self.request.query_params.get('price_bounds', 'catalog')
+        if scope == 'filtered':
+            return get_filtered_price_bounds(self.filter_queryset(self.get_queryset(include_price_filters=False)))
+        if scope == 'category':
+            return get_price_bounds(category_slug=self.request.query_params.get('category'))
+        return get_price_bounds()
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-
-        # Calculate min and max price of all active products
-        from django.db.models import Max, Min
-        active_products = Product.objects.filter(is_active=True)
-        price_stats = active_products.aggregate(
-            min_price=Min('price'),
-            max_price=Max('price')
-        )
-        min_price = price_stats['min_price'] or 0
-        max_price = price_stats['max_price'] or 100000
+        min_price, max_price = self.get_price_bounds()
 
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             response = self.get_paginated_response(serializer.data)
-            response.data['min_price'] = float(min_price)
-            response.data['max_price'] = float(max_price)
+            response.data['min_price'] = min_price
+            response.data['max_price'] = max_price
             return response
 
         serializer = self.get_serializer(queryset, many=True)
         return Response({
             'results': serializer.data,
-            'min_price': float(min_price),
-            'max_price': float(max_price)
+            'min_price': min_price,
+            'max_price': max_price
         })
 
 
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductFacetsView(CachedResponseMixin, generics.ListAPIView):
+    """
+    Facet counts (category, badge, stock status, on-sale, price bucket) for the
+    current ProductListView filters, computed in one grouped query (see SHOP.facets).
+    """
+    pagination_class = None
+    filter_backends = [ProductSearchFilter]
+    # Only the filters vary the cache key (paging or ordering params do not).
+    response_cache_params = CATALOG_FILTER_PARAMS + ('search', 'search_mode')
+
+    def get_queryset(self):
+        # Facet filters are applied per facet while counting.
+        return apply_catalog_filters(
+            Product.objects.filter(is_active=True), self.request.query_params, skip=FACET_FILTERS
+        )
+
+    def list(self, request, *args, **kwargs):
+        return Response(compute_facets(self.filter_queryset(self.get_queryset()), request.query_params))
+
+
+class ProductBatchView(ConditionalGetMixin, generics.ListAPIView):
+    """
+    GET ?ids=1,2,3 or ?slugs=a,b: compact cards for up to PRODUCT_BATCH_MAX_ITEMS
+    products in request order, plus the requested ids/slugs that are gone or
+    inactive. The products are read in one query (primary image included), and
+    the ETag covers their updated_at, so an unchanged wishlist revalidates with a 304.
+    """
+    serializer_class = ProductCardSerializer
+    pagination_class = None
+
+    def get_lookup(self):
+        params = self.request.query_params
+        field = 'slug' if params.get('slugs') and not params.get('ids') else 'id'
+        values = [value.strip() for value in params.get(f"{field}s", '').split(',') if value.strip()]
+        if field == 'id':
+            try:
+                values = [int(value) for value in values]
+            except ValueError:
+                raise ValidationError({'ids': 'Expected a comma-separated list of product ids.'})
+        values = list(dict.fromkeys(values))
+        if not values:
+            raise ValidationError({'detail': 'Pass ?ids= or ?slugs=.'})
+        if len(values) > settings.PRODUCT_BATCH_MAX_ITEMS:
+            raise ValidationError({f"{field}s": f"At most {settings.PRODUCT_BATCH_MAX_ITEMS} products per request."})
+        return field, values
+
+    def get_queryset(self):
+        field, values = self.get_lookup()
+        primary_image = ProductImage.objects.filter(product=OuterRef('pk')).order_by('-is_primary', 'order').values('image')[:1]
+        return Product.objects.filter(is_active=True, **{f"{field}__in": values}).select_related('category').annotate(
+            primary_image_name=Subquery(primary_image)
+        )
+
+    def get_validators(self, request, *args, **kwargs):
+        # Validators come from the same single query that feeds the response.
+        self.products = list(self.get_queryset())
+        if not self.products:
+            return None
+        parts = sorted(
+            (product.id, product.updated_at.isoformat(), product.category.updated_at.isoformat())
+            for product in self.products
+        )
+        last_modified = max(max(product.updated_at, product.category.updated_at) for product in self.products)
+        return make_etag('batch', request.query_params.get('ids', ''), request.query_params.get('slugs', ''), *parts), last_modified
+
+    def list(self, request, *args, **kwargs):
+        field, values = self.get_lookup()
+        found = {getattr(product, field): product for product in self.products}
+        products = [found[value] for value in values if value in found]
+        response = Response({
+            'results': self.get_serializer(products, many=True).data,
+            'missing': [value for value in values if value not in found],
+        })
+        # Cacheable, but always revalidated (cheaply, via the ETag).
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class ProductSuggestView(APIView):
+    """
+    GET ?q=<prefix>[&limit=]: search-box autocomplete (popular queries, categories and
+    products), answered from the in-process prefix index in SHOP.suggest.
+    """
+    permission_classes = [permissions.AllowAny]
+    # No token/session lookup: a suggestion request makes no database query.
+    authentication_classes = []
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'suggest'
+    default_limit = 5
+    max_limit = 10
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        suggestions = get_suggestion_index().suggest(query, limit)
+        response = Response({'q': query, **suggestions})
+        response['Cache-Control'] = 'public, max-age=60'
+        return response
+
+
+class ProductDetailView(SparseFieldsetViewMixin, ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
     serializer_class = ProductDetailSerializer
     lookup_field = 'slug'
+    response_cache_tags = ()
+    field_presets = {'grid': PRODUCT_CARD_FIELDS + ('category',)}
+
+    def get_product_row(self, slug):
+        # Shared by the validators and the cache tags, which both run before the body is built.
+        if getattr(self, '_product_row_slug', None) != slug:
+            self._product_row = Product.objects.filter(slug=slug, is_active=True).values(
+                'id', 'updated_at', 'category_id', 'category__updated_at'
+            ).first()
+            self._product_row_slug = slug
+        return self._product_row
+
+    def get_validators(self, request, *args, **kwargs):
+        # Product.updated_at is also touched when its images, videos or reviews change.
+        row = self.get_product_row(kwargs['slug'])
+        if row is None:
+            return None
+        last_modified = max(row['updated_at'], row['category__updated_at'])
+        fields = ','.join(sorted(self.get_sparse_fields() or ()))
+        return make_etag(
+            'product', row['id'], row['updated_at'].isoformat(), row['category__updated_at'].isoformat(), fields
+        ), last_modified
+
+    def get_response_cache_tags(self, request, *args, **kwargs):
+        row = self.get_product_row(kwargs['slug'])
+        if row is None:
+            return []
+        tags = [f"product:{row['id']}"]
+        if self.wants_field('category'):
+            tags.append(f"category:{row['category_id']}")
+        return tags
 
     def get_queryset(self):
-        return Product.objects.filter(is_active=True).select_related('category').annotate(
-            annotated_review_count=Count('reviews', distinct=True),
-            annotated_avg_rating=Avg('reviews__rating')
-        ).prefetch_related(
-            Prefetch('images', queryset=ProductImage.objects.order_by('-is_primary', 'order')),
-            'videos',
-            'reviews'
-        )
+        queryset = Product.objects.filter(is_active=True)
+        if self.wants_field('category'):
+            queryset = queryset.select_related('category')
+        if self.wants_field('images'):
+            queryset = queryset.prefetch_related(
+                Prefetch('images', queryset=ProductImage.objects.order_by('-is_primary', 'order'))
+            )
+        for relation in ('videos', 'reviews'):
+            if self.wants_field(relation):
+                queryset = queryset.prefetch_related(relation)
+        return queryset
 
 
-class FeaturedProductsView(generics.ListAPIView):
+class FeaturedProductsView(CategorySideloadViewMixin, SparseFieldsetViewMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = ProductListSerializer
+    response_cache_defaults = {'page': '1'}
+    field_presets = {'grid': PRODUCT_CARD_FIELDS}
 
     def get_queryset(self):
-        return Product.objects.filter(is_active=True, is_featured=True).select_related('category').annotate(
-            annotated_review_count=Count('reviews', distinct=True),
-            annotated_avg_rating=Avg('reviews__rating')
-        ).prefetch_related(
-            Prefetch('images', queryset=ProductImage.objects.order_by('-is_primary', 'order'))
+        return with_list_relations(
+            self, Product.objects.filter(is_active=True, is_featured=True)
         ).order_by('-created_at')
 
 
-class CategoryProductsView(generics.ListAPIView):
+class CategoryProductsView(CategorySideloadViewMixin, SparseFieldsetViewMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = ProductListSerializer
+    response_cache_defaults = {'page': '1'}
+    field_presets = {'grid': PRODUCT_CARD_FIELDS}
 
     def get_queryset(self):
         category_slug = self.kwargs['category_slug']
-        return Product.objects.filter(
+        return with_list_relations(self, Product.objects.filter(
             is_active=True,
             category__slug=category_slug,
             category__is_active=True
-        ).select_related('category').annotate(
-            annotated_review_count=Count('reviews', distinct=True),
-            annotated_avg_rating=Avg('reviews__rating')
-        ).prefetch_related(
-            Prefetch('images', queryset=ProductImage.objects.order_by('-is_primary', 'order'))
-        ).order_by('-created_at')
+        )).order_by('-created_at')
 
 
 class ReviewListCreateView(generics.ListCreateAPIView):
@@ -160,15 +306,52 @@ class TrackAnalyticsEventView(generics.CreateAPIView):
     queryset = AnalyticsEvent.objects.all()
     serializer_class = AnalyticsEventSerializer
     permission_classes = [permissions.AllowAny]
+    parser_classes = [GzipJSONParser, GzipNDJSONParser]
+
+    def get_event_serializer(self, data, **kwargs):
+        if isinstance(data, list):
+            kwargs.update(many=True, max_length=settings.ANALYTICS_MAX_BATCH_EVENTS)
+        return self.get_serializer(data=data, **kwargs)
 
     def create(self, request, *args, **kwargs):
         data = request.data
+        mode = get_ingest_mode()
+        if mode == 'buffered':
+            return self.create_buffered(data)
+        if mode == 'spool':
+            return self.create_spooled(data)
         if isinstance(data, list):
-            serializer = self.get_serializer(data=data, many=True)
+            serializer = self.get_event_serializer(data)
             serializer.is_valid(raise_exception=True)
             self.perform_create(serializer)
             return Response(
-                {'status': 'recorded', 'count': len(serializer.data)},
+                {'status': 'recorded', 'count': len(serializer.instance)},
                 status=status.HTTP_201_CREATED
             )
         return super().create(request, *args, **kwargs)
+
+    def create_buffered(self, data):
+        """Validates the payload and queues it for a background bulk insert (202 Accepted)."""
+        serializer = self.get_event_serializer(data)
+        serializer.is_valid(raise_exception=True)
+
+        many = isinstance(data, list)
+        child = serializer.child if many else serializer
+        payloads = serializer.validated_data if many else [serializer.validated_data]
+        events = [child.build_event(dict(item)) for item in payloads]
+        accepted = get_event_buffer().submit(events)
+        return Response(
+            {'status': 'queued', 'count': accepted, 'dropped': len(events) - accepted},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def create_spooled(self, data):
+        """Validates the payload and appends it to the local spool file without a database query (202 Accepted)."""
+        context = self.get_serializer_context()
+        context['resolve_products'] = False
+        serializer = self.get_event_serializer(data, context=context)
+        serializer.is_valid(raise_exception=True)
+
+        payloads = serializer.validated_data if isinstance(data, list) else [serializer.validated_data]
+        written = get_spool_writer().append([spool_record(item) for item in payloads])
+        return Response({'status': 'spooled', 'count': written}, status=status.HTTP_202_ACCEPTED)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AuditLog
+from .models import AuditLog, InsightSnapshot
 
 
 @admin.register(AuditLog)
@@ -14,3 +14,15 @@ class AuditLogAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(InsightSnapshot)
+class InsightSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['generated_at', '__str__']
+    readonly_fields = ['insights', 'generated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
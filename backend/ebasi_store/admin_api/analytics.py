@@ -0,0 +1,138 @@
+"""
+Aggregation helpers backing the admin analytics endpoints.
+"""
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from SHOP.models import AnalyticsEvent, AnalyticsDailyRollup
+from SHOP.rollups import get_store_timezone
+
+SERIES_BUCKETS = ('hour', 'day', 'week')
+
+DASHBOARD_CACHE_KEY = 'admin_api:dashboard:snapshot'
+
+# Event type -> key used in each daily_series entry.
+SERIES_EVENT_TYPES = {
+    'page_view': 'page_views',
+    'product_view': 'product_views',
+    'whatsapp_click': 'whatsapp_clicks',
+    'wishlist_add': 'wishlist_adds',
+}
+
+
+def store_today(now=None):
+    """Returns the current date in the store timezone."""
+    return timezone.localtime(now or timezone.now(), get_store_timezone()).date()
+
+
+def _series_buckets(days, bucket, now, tz):
+    """
+    Returns the ordered list of bucket start instants (aware, in the store timezone)
+    covering the last `days` days up to and including the current bucket.
+    """
+    local_now = timezone.localtime(now, tz)
+
+    if bucket == 'hour':
+        current = local_now.replace(minute=0, second=0, microsecond=0)
+        count = days * 24
+        # Step in UTC so DST transitions never produce duplicate or missing hours.
+        current_utc = current.astimezone(ZoneInfo('UTC'))
+        return [
+            (current_utc - timedelta(hours=count - 1 - i)).astimezone(tz)
+            for i in range(count)
+        ]
+
+    first_day = local_now.date() - timedelta(days=days - 1)
+    if bucket == 'week':
+        first_day -= timedelta(days=first_day.weekday())
+        step = 7
+    else:
+        step = 1
+
+    starts = []
+    day = first_day
+    while day <= local_now.date():
+        starts.append(datetime.combine(day, time.min, tzinfo=tz))
+        day += timedelta(days=step)
+    return starts
+
+
+def _bucket_label(start, bucket):
+    if bucket == 'hour':
+        return start.strftime('%Y-%m-%dT%H:00'), start.strftime('%b %d %H:00')
+    if bucket == 'week':
+        return start.strftime('%Y-%m-%d'), f"Week of {start.strftime('%b %d')}"
+    return start.strftime('%Y-%m-%d'), start.strftime('%b %d')
+
+
+def build_event_series(days, bucket='day', now=None):
+    """
+    Builds the zero-filled activity time series for the last `days` days with a
+    single grouped query, bucketed by hour, day or week in the store timezone.
+    Day and week buckets read AnalyticsDailyRollup; hour buckets read raw events.
+    """
+    if bucket not in SERIES_BUCKETS:
+        bucket = 'day'
+    tz = get_store_timezone()
+    now = now or timezone.now()
+    starts = _series_buckets(days, bucket, now, tz)
+
+    counts = {}
+    if bucket == 'hour':
+        # Hourly resolution is only available from the raw events.
+        rows = AnalyticsEvent.objects.filter(
+            created_at__gte=starts[0],
+            created_at__lte=now,
+            event_type__in=list(SERIES_EVENT_TYPES)
+        ).annotate(
+            bucket_start=Trunc('created_at', 'hour', tzinfo=tz)
+        ).order_by().values('bucket_start', 'event_type').annotate(
+            event_count=Count('id')
+        )
+        for row in rows:
+            counts[(row['bucket_start'], row['event_type'])] = row['event_count']
+    else:
+        rows = AnalyticsDailyRollup.objects.filter(
+            day__gte=starts[0].date(),
+            event_type__in=list(SERIES_EVENT_TYPES)
+        ).order_by().values('day', 'event_type').annotate(event_count=Sum('count'))
+        for row in rows:
+            day = row['day']
+            if bucket == 'week':
+                day -= timedelta(days=day.weekday())
+            key = (datetime.combine(day, time.min, tzinfo=tz), row['event_type'])
+            counts[key] = counts.get(key, 0) + row['event_count']
+
+    series = []
+    for start in starts:
+        date_key, label = _bucket_label(start, bucket)
+        entry = {'date': date_key, 'label': label}
+        for event_type, key in SERIES_EVENT_TYPES.items():
+            entry[key] = counts.get((start, event_type), 0)
+        series.append(entry)
+    return series
+
+
+def get_dashboard_snapshot(build):
+    """
+    Returns the cached dashboard payload, calling `build()` to compute and cache it
+    when missing. Cached for settings.ADMIN_DASHBOARD_CACHE_TTL seconds.
+    """
+    ttl = getattr(settings, 'ADMIN_DASHBOARD_CACHE_TTL', 60)
+    if not ttl:
+        return build()
+    snapshot = cache.get(DASHBOARD_CACHE_KEY)
+    if snapshot is None:
+        snapshot = build()
+        cache.set(DASHBOARD_CACHE_KEY, snapshot, ttl)
+    return snapshot
+
+
+def invalidate_dashboard_snapshot():
+    cache.delete(DASHBOARD_CACHE_KEY)
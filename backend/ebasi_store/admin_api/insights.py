@@ -0,0 +1,125 @@
+"""
+Rule-based store insights shown on the admin dashboard.
+
+Insights are computed set-based (a handful of grouped queries regardless of
+catalog size) and stored as an InsightSnapshot, so the endpoint only reads
+the latest row. `manage.py refresh_insights` recomputes them on a schedule.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from SHOP.models import Product, AnalyticsDailyRollup
+from accounts.models import ContactMessage
+from orders.models import Wishlist
+from .models import InsightSnapshot
+
+BOTTLENECK_MIN_VIEWS = 5
+
+
+def compute_insights():
+    """Returns the current list of insights."""
+    insights = []
+
+    # 1. Top WhatsApp High Performers
+    top_wa = AnalyticsDailyRollup.objects.filter(
+        event_type='whatsapp_click',
+        product__isnull=False
+    ).values('product__id', 'product__name', 'product__slug').annotate(
+        clicks=Sum('count')
+    ).order_by('-clicks', 'product__id').first()
+
+    if top_wa and top_wa['clicks'] > 0:
+        insights.append({
+            'type': 'high_performer',
+            'severity': 'success',
+            'title': f"Top Purchase Intent: {top_wa['product__name']}",
+            'description': f"Generated {top_wa['clicks']} direct WhatsApp inquiries. Ensure adequate stock levels to satisfy active customer interest.",
+            'product_id': top_wa['product__id'],
+            'product_slug': top_wa['product__slug']
+        })
+
+    # 2. High Views but No WhatsApp Clicks (one grouped query, filtered with HAVING)
+    bottleneck = AnalyticsDailyRollup.objects.filter(
+        product__is_active=True,
+        event_type__in=['product_view', 'whatsapp_click']
+    ).values('product__id', 'product__name', 'product__slug').annotate(
+        views=Coalesce(Sum('count', filter=Q(event_type='product_view')), 0),
+        whatsapp_clicks=Coalesce(Sum('count', filter=Q(event_type='whatsapp_click')), 0)
+    ).filter(
+        views__gte=BOTTLENECK_MIN_VIEWS,
+        whatsapp_clicks=0
+    ).order_by('-views', 'product__id').first()
+
+    if bottleneck:
+        insights.append({
+            'type': 'conversion_opportunity',
+            'severity': 'warning',
+            'title': f"High Views, Low Inquiries: {bottleneck['product__name']}",
+            'description': f"Has received {bottleneck['views']} views but no WhatsApp clicks. Consider reviewing the price point, adding promotional badges, or enhancing product photos.",
+            'product_id': bottleneck['product__id'],
+            'product_slug': bottleneck['product__slug']
+        })
+
+    # 3. High Wishlist Momentum
+    top_wl = Wishlist.objects.values('product__id', 'product__name', 'product__slug').annotate(
+        wl_count=Count('id')
+    ).order_by('-wl_count', 'product__id').first()
+    if top_wl:
+        insights.append({
+            'type': 'wishlist_momentum',
+            'severity': 'info',
+            'title': f"Customer Favorite: {top_wl['product__name']}",
+            'description': f"Saved to wishlist by {top_wl['wl_count']} customers. Consider featuring this item or creating a special showcase.",
+            'product_id': top_wl['product__id'],
+            'product_slug': top_wl['product__slug']
+        })
+
+    # 4. Out of Stock Alert
+    out_of_stock = Product.objects.filter(stock_status='out_of_stock', is_active=True).count()
+    if out_of_stock > 0:
+        insights.append({
+            'type': 'inventory_alert',
+            'severity': 'alert',
+            'title': f"{out_of_stock} Active Products Out of Stock",
+            'description': "Some active products are currently marked out of stock. Update availability or restock to avoid missed customer inquiries.",
+            'product_id': None,
+            'product_slug': None
+        })
+
+    # 5. Unread Messages Alert
+    unread_count = ContactMessage.objects.filter(is_read=False).count()
+    if unread_count > 0:
+        insights.append({
+            'type': 'messages_alert',
+            'severity': 'alert',
+            'title': f"{unread_count} Unread Customer Messages",
+            'description': "You have new inquiries waiting in the Contact Inbox. Fast replies increase customer conversion.",
+            'product_id': None,
+            'product_slug': None
+        })
+
+    return insights
+
+
+def refresh_insight_snapshot(keep=24):
+    """Computes and stores a new snapshot, pruning all but the latest `keep` snapshots."""
+    snapshot = InsightSnapshot.objects.create(insights=compute_insights())
+    stale_ids = InsightSnapshot.objects.order_by('-generated_at', '-id').values_list('id', flat=True)[keep:]
+    InsightSnapshot.objects.filter(id__in=list(stale_ids)).delete()
+    return snapshot
+
+
+def get_insight_snapshot():
+    """
+    Returns the latest snapshot. Falls back to computing one when none exists or the
+    latest is older than settings.INSIGHTS_SNAPSHOT_MAX_AGE (e.g. the cron job stopped).
+    """
+    snapshot = InsightSnapshot.objects.order_by('-generated_at', '-id').first()
+    max_age = getattr(settings, 'INSIGHTS_SNAPSHOT_MAX_AGE', 900)
+    if snapshot is None or (max_age and snapshot.generated_at < timezone.now() - timedelta(seconds=max_age)):
+        snapshot = refresh_insight_snapshot()
+    return snapshot
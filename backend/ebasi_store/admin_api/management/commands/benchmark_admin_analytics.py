@@ -0,0 +1,137 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from SHOP.models import Category, Product, AnalyticsEvent, AnalyticsDailyRollup
+from SHOP.rollups import fold_new_events
+from admin_api.views import AdminAnalyticsView
+
+BENCH_PREFIX = 'BENCH'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks AdminAnalyticsView against a seeded catalog. '
+        'Seeded events are folded into the rollups the view reads. '
+        'Use --seed to create the benchmark dataset (5k products / 2M events by default) '
+        'and --cleanup to remove it afterwards. Never run against production data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='Create the benchmark products and events first.')
+        parser.add_argument('--cleanup', action='store_true', help='Delete benchmark products and events when done.')
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--events', type=int, default=2000000)
+        parser.add_argument('--days', type=int, default=30, choices=[7, 14, 30, 90, 365])
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['products'], options['events'], options['batch_size'])
+
+        user = User.objects.filter(is_superuser=True, is_active=True).first()
+        if not user:
+            self.stdout.write(self.style.ERROR('An active superuser is required to run the benchmark.'))
+            return
+
+        factory = APIRequestFactory()
+        view = AdminAnalyticsView.as_view()
+        timings = []
+        query_counts = []
+
+        for _ in range(options['runs']):
+            request = factory.get('/api/v1/admin/analytics/', {'days': options['days']})
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - started) * 1000)
+            query_counts.append(len(ctx.captured_queries))
+
+        self.stdout.write(
+            f"products={Product.objects.count()} events={AnalyticsEvent.objects.count()} days={options['days']}"
+        )
+        self.stdout.write(
+            f"queries/request={max(query_counts)} "
+            f"median={statistics.median(timings):.1f}ms min={min(timings):.1f}ms max={max(timings):.1f}ms"
+        )
+
+        if options['cleanup']:
+            self.cleanup()
+
+    def seed(self, product_count, event_count, batch_size):
+        self.stdout.write(f"Seeding {product_count} products and {event_count} events...")
+        category, _ = Category.objects.get_or_create(
+            slug='benchmark-catalog',
+            defaults={'name': 'Benchmark Catalog', 'is_active': False}
+        )
+
+        with transaction.atomic():
+            Product.objects.bulk_create([
+                Product(
+                    name=f"Benchmark Product {i}",
+                    slug=f"{BENCH_PREFIX.lower()}-product-{i}",
+                    description='Benchmark product',
+                    category=category,
+                    price=500 + (i % 5000),
+                    sku=f"{BENCH_PREFIX}-{i:06d}",
+                    is_active=False
+                )
+                for i in range(product_count)
+            ], batch_size=batch_size, ignore_conflicts=True)
+
+        product_ids = list(Product.objects.filter(sku__startswith=f"{BENCH_PREFIX}-").values_list('id', flat=True))
+        event_types = ['page_view', 'product_view', 'product_view', 'product_view', 'whatsapp_click', 'wishlist_add', 'search']
+        now = timezone.now()
+        rng = random.Random(42)
+
+        created = 0
+        while created < event_count:
+            size = min(batch_size, event_count - created)
+            batch = []
+            for _ in range(size):
+                event_type = rng.choice(event_types)
+                batch.append(AnalyticsEvent(
+                    event_type=event_type,
+                    product_id=rng.choice(product_ids) if event_type in ('product_view', 'whatsapp_click', 'wishlist_add') else None,
+                    search_query='mekhela sador' if event_type == 'search' else '',
+                    source=BENCH_PREFIX.lower(),
+                ))
+            with transaction.atomic():
+                AnalyticsEvent.objects.bulk_create(batch, batch_size=batch_size)
+            created += size
+
+        # Spread events over the last year so period filters are meaningful.
+        bench_events = AnalyticsEvent.objects.filter(source=BENCH_PREFIX.lower())
+        bounds = bench_events.aggregate(first_id=Min('id'), last_id=Max('id'))
+        if bounds['first_id'] is not None:
+            span = max(1, (bounds['last_id'] - bounds['first_id'] + 1) // 365)
+            for offset in range(365):
+                lower = bounds['first_id'] + offset * span
+                bench_events.filter(id__gte=lower, id__lt=lower + span).update(
+                    created_at=now - timedelta(days=offset, hours=rng.randint(0, 23))
+                )
+
+        # The analytics view reads the rollups: fold the seeded events so the benchmark
+        # measures populated rollups. Everything seeded above is already committed.
+        folded = fold_new_events(lag=0)
+        self.stdout.write(self.style.SUCCESS(f'Benchmark dataset ready ({folded} events folded into rollups).'))
+
+    def cleanup(self):
+        # Rollup rows keep the event source, so the counts folded from benchmark events go too.
+        AnalyticsDailyRollup.objects.filter(source=BENCH_PREFIX.lower()).delete()
+        AnalyticsEvent.objects.filter(source=BENCH_PREFIX.lower()).delete()
+        Product.objects.filter(sku__startswith=f"{BENCH_PREFIX}-").delete()
+        Category.objects.filter(slug='benchmark-catalog', products__isnull=True).delete()
+        self.stdout.write(self.style.SUCCESS('Benchmark dataset removed.'))
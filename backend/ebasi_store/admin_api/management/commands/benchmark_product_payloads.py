@@ -0,0 +1,95 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from SHOP.models import Category, Product, ProductImage, ProductVideo, Review
+from SHOP.views import ProductListView
+from admin_api.views import AdminProductViewSet
+
+MODES = (
+    ('full', {}),
+    ('view=grid', {'view': 'grid'}),
+)
+ENDPOINTS = (
+    ('storefront products/', ProductListView, None),
+    ('admin products/', AdminProductViewSet, 'list'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures one page of the storefront and admin product lists with the full '
+        'representation and with ?view=grid: queries, JSON bytes and milliseconds '
+        '(queryset, serialization and rendering; no HTTP or auth). With --seed, '
+        'missing rows are created inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page (default 100).')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the median is reported.')
+        parser.add_argument('--seed', action='store_true', help='Create missing products temporarily (rolled back).')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        if rows < 1 or repeat < 1:
+            raise CommandError('--rows and --repeat must be positive.')
+
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(rows)
+            available = Product.objects.filter(is_active=True).count()
+            if available < rows:
+                self.stdout.write(self.style.WARNING(
+                    f'Only {available} active products; pass --seed to benchmark full pages of {rows}.'
+                ))
+            self.stdout.write(f"{'endpoint':<24}{'mode':<12}{'rows':>6}{'queries':>9}{'bytes':>10}{'ms':>9}")
+            for label, view_class, action in ENDPOINTS:
+                for mode, params in MODES:
+                    count, queries, size, elapsed = self.measure(view_class, action, params, rows, repeat)
+                    self.stdout.write(f"{label:<24}{mode:<12}{count:>6}{queries:>9}{size:>10}{elapsed:>9.1f}")
+            transaction.set_rollback(True)
+
+    def measure(self, view_class, action, params, rows, repeat):
+        timings = []
+        for _ in range(repeat):
+            view = view_class()
+            if action:
+                view.action_map = {'get': action}
+            view.args, view.kwargs, view.format_kwarg = (), {}, None
+            view.request = view.initialize_request(APIRequestFactory().get('/', params))
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                page = list(view.filter_queryset(view.get_queryset())[:rows])
+                body = JSONRenderer().render(view.get_serializer(page, many=True).data)
+                timings.append((time.perf_counter() - start) * 1000)
+        return len(page), len(queries.captured_queries), len(body), statistics.median(timings)
+
+    def seed(self, rows):
+        missing = rows - Product.objects.filter(is_active=True).count()
+        if missing <= 0:
+            return
+        category, _ = Category.objects.get_or_create(slug='benchmark', defaults={'name': 'Benchmark'})
+        description = 'Handwoven Assam silk with a traditional motif border. ' * 20
+        for i in range(missing):
+            product = Product.objects.create(
+                name=f"Benchmark Mekhela Sador {i}",
+                slug=f"benchmark-mekhela-sador-{i}",
+                sku=f"EBA-BENCH{i:05d}",
+                category=category,
+                price=2500 + i,
+                compare_price=3000 + i,
+                short_description='Muga silk mekhela sador',
+                description=description
+            )
+            ProductImage.objects.bulk_create([
+                ProductImage(product=product, image=f"products/benchmark-{i}-{n}.jpg", is_primary=n == 0, order=n)
+                for n in range(4)
+            ])
+            ProductVideo.objects.create(product=product, video=f"products/videos/benchmark-{i}.mp4", title='Drape')
+            for n in range(3):
+                Review.objects.create(product=product, user_name=f"Buyer {n}", rating=4 + n % 2, comment='Lovely weave.')
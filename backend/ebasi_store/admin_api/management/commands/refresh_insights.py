@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from SHOP.rollups import fold_new_events
+from admin_api.insights import refresh_insight_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Folds new analytics events into the rollups, then recomputes the admin dashboard '
+        'insights and stores them as a new snapshot. run_analytics_jobs runs it every few '
+        'minutes; the insights endpoint serves the latest snapshot.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=24, help='Number of snapshots to retain.')
+
+    def handle(self, *args, **options):
+        fold_new_events()
+        snapshot = refresh_insight_snapshot(keep=max(1, options['keep']))
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {len(snapshot.insights)} insights generated at {snapshot.generated_at:%Y-%m-%d %H:%M:%S}.'
+        ))
@@ -0,0 +1,52 @@
+import logging
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the periodic analytics jobs the admin dashboard depends on: loads closed '
+        'spool segments (ANALYTICS_INGEST_MODE=spool), folds new events into the daily '
+        'rollups and refreshes the insights snapshot. Runs in a loop as the Procfile '
+        '`worker` process; with --once it runs every job a single time, for cron, e.g. '
+        '`* * * * * cd /app && python manage.py run_analytics_jobs --once`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run every job once and exit.')
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between rollup folds (default 60).')
+        parser.add_argument(
+            '--insights-interval', type=int, default=300, help='Seconds between insights refreshes (default 300).'
+        )
+
+    def handle(self, *args, **options):
+        interval, insights_interval = options['interval'], options['insights_interval']
+        if interval < 1 or insights_interval < 1:
+            raise CommandError('--interval and --insights-interval must be positive.')
+
+        insights_due = 0.0
+        while True:
+            self.run_job('load_analytics_spool', enabled=settings.ANALYTICS_INGEST_MODE == 'spool')
+            self.run_job('rollup_analytics')
+            if time.monotonic() >= insights_due:
+                self.run_job('refresh_insights')
+                insights_due = time.monotonic() + insights_interval
+            if options['once']:
+                return
+            close_old_connections()
+            time.sleep(interval)
+
+    def run_job(self, name, enabled=True):
+        if not enabled:
+            return
+        try:
+            call_command(name, stdout=self.stdout, stderr=self.stderr)
+        except Exception:
+            # One failing job (or a database hiccup) must not stop the worker.
+            logger.exception(f"Analytics job {name} failed")
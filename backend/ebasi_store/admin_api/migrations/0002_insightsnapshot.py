@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InsightSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('insights', models.JSONField(blank=True, default=list)),
+                ('generated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Insight Snapshot',
+                'verbose_name_plural': 'Insight Snapshots',
+                'ordering': ['-generated_at'],
+                'get_latest_by': 'generated_at',
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
@@ -32,6 +33,24 @@ class AuditLog(models.Model):
         return f"[{self.created_at.strftime('%Y-%m-%d %H:%M')}] {actor_name}: {self.action} ({self.target_repr})"
 
 
+class InsightSnapshot(models.Model):
+    """
+    Precomputed list of dashboard insights, refreshed by `manage.py refresh_insights`.
+    The insights endpoint serves the most recent snapshot.
+    """
+    insights = models.JSONField(default=list, blank=True)
+    generated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-generated_at']
+        get_latest_by = 'generated_at'
+        verbose_name = 'Insight Snapshot'
+        verbose_name_plural = 'Insight Snapshots'
+
+    def __str__(self):
+        return f"{len(self.insights)} insights at {self.generated_at.strftime('%Y-%m-%d %H:%M')}"
+
+
 def get_client_ip(request):
     """Extracts client IP address from request."""
     if not request:
@@ -1,11 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from django.db.models import Avg, Count
 from django.contrib.auth.password_validation import validate_password
 from django.db import transaction
 from SHOP.models import Category, Product, ProductImage, ProductVideo, Review, AnalyticsEvent
 from accounts.models import ContactMessage, StaffProfile
 from SHOP.serializers import get_complete_url
+from SHOP.fieldsets import SparseFieldsetSerializerMixin
 from .models import AuditLog
 from .permissions import Roles, get_user_role, get_user_permissions
 
@@ -74,7 +74,7 @@ class AdminCategorySerializer(serializers.ModelSerializer):
         return attrs
 
 
-class AdminProductSerializer(serializers.ModelSerializer):
+class AdminProductSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(),
         source='category',
@@ -85,7 +85,7 @@ class AdminProductSerializer(serializers.ModelSerializer):
     videos = AdminProductVideoSerializer(many=True, read_only=True)
     primary_image = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
+    review_count = serializers.IntegerField(read_only=True)
     is_on_sale = serializers.BooleanField(read_only=True)
     discount_percentage = serializers.IntegerField(read_only=True)
     views_count = serializers.SerializerMethodField()
@@ -126,25 +126,27 @@ class AdminProductSerializer(serializers.ModelSerializer):
         return None
 
     def get_average_rating(self, obj):
-        avg = getattr(obj, 'annotated_avg_rating', None)
-        if avg is None:
-            avg = obj.reviews.aggregate(Avg('rating'))['rating__avg']
-        return round(avg, 1) if avg else 0
+        return obj.average_rating
 
-    def get_review_count(self, obj):
-        count = getattr(obj, 'annotated_review_count', None)
+    # AdminProductViewSet annotates the counters; the fallbacks serve instances
+    # loaded without the annotations (e.g. right after create).
+    def get_views_count(self, obj):
+        count = getattr(obj, 'annotated_views_count', None)
         if count is None:
-            count = obj.reviews.count()
+            count = obj.analytics_events.filter(event_type='product_view').count()
         return count
 
-    def get_views_count(self, obj):
-        return getattr(obj, 'annotated_views_count', None) or obj.analytics_events.filter(event_type='product_view').count()
-
     def get_wishlist_count(self, obj):
-        return getattr(obj, 'annotated_wishlist_count', None) or obj.wishlisted_by.count()
+        count = getattr(obj, 'annotated_wishlist_count', None)
+        if count is None:
+            count = obj.wishlisted_by.count()
+        return count
 
     def get_whatsapp_clicks_count(self, obj):
-        return getattr(obj, 'annotated_whatsapp_count', None) or obj.analytics_events.filter(event_type='whatsapp_click').count()
+        count = getattr(obj, 'annotated_whatsapp_count', None)
+        if count is None:
+            count = obj.analytics_events.filter(event_type='whatsapp_click').count()
+        return count
 
     def validate(self, attrs):
         from django.utils.text import slugify
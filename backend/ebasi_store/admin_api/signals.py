@@ -0,0 +1,20 @@
+"""
+Drops the cached admin dashboard snapshot whenever the catalog, reviews,
+messages or wishlists it summarizes change.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from SHOP.models import Category, Product, Review
+from accounts.models import ContactMessage
+from orders.models import Wishlist
+from .analytics import invalidate_dashboard_snapshot
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=ContactMessage)
+@receiver([post_save, post_delete], sender=Wishlist)
+def invalidate_dashboard_on_change(sender, **kwargs):
+    invalidate_dashboard_snapshot()
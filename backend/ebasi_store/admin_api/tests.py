@@ -1,17 +1,30 @@
-from django.test import TestCase
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth.models import User
 from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
 from rest_framework import status
 
-from SHOP.models import Category, Product, Review
+from SHOP.models import Category, Product, Review, ProductImage, AnalyticsEvent, AnalyticsRollupState
+from SHOP.rollups import fold_new_events
 from accounts.models import ContactMessage, StaffProfile
-from admin_api.models import AuditLog
+from orders.models import Wishlist
+from admin_api.models import AuditLog, InsightSnapshot
+from admin_api.insights import compute_insights
+from admin_api.analytics import build_event_series
 from admin_api.permissions import Roles
 
 
 class RBACAndStaffManagementTestCase(APITestCase):
     def setUp(self):
+        cache.clear()
+
         # 1. Create Base Test Category and Product
         self.category = Category.objects.create(
             name="Silk Sarees",
@@ -373,3 +386,391 @@ class RBACAndStaffManagementTestCase(APITestCase):
         })
 
         self.assertTrue(AuditLog.objects.filter(action="product.create", actor=self.owner).exists())
+
+
+class AdminAnalyticsQueryBudgetTestCase(APITestCase):
+    """The analytics endpoint must issue a constant number of queries regardless of catalog size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Mekhela Sador", slug="mekhela-sador")
+        cls.owner = User.objects.create_superuser(
+            username="analytics_owner",
+            email="analytics_owner@ebasistore.com",
+            password="OwnerPassword123!"
+        )
+        cls.owner_token = Token.objects.create(user=cls.owner)
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.owner_token.key}")
+
+    def _add_products(self, count):
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                name=f"Analytics Saree {i}",
+                slug=f"analytics-saree-{i}",
+                category=self.category,
+                price=1000 + i,
+                sku=f"EBA-ANL{i:03d}"
+            )
+            ProductImage.objects.create(product=product, image=f"products/analytics-{i}.jpg", is_primary=True)
+            AnalyticsEvent.objects.create(event_type='product_view', product=product)
+            AnalyticsEvent.objects.create(event_type='product_view', product=product)
+            AnalyticsEvent.objects.create(event_type='whatsapp_click', product=product)
+            Wishlist.objects.create(user=self.owner, product=product)
+
+    def _count_queries(self):
+        fold_new_events()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/v1/admin/analytics/?days=30")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), res.data
+
+    def test_query_count_is_independent_of_catalog_size(self):
+        self._add_products(3)
+        small_count, _ = self._count_queries()
+
+        self._add_products(12)
+        large_count, data = self._count_queries()
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(data['product_performance']), 15)
+
+    def test_product_performance_counts(self):
+        self._add_products(2)
+        _, data = self._count_queries()
+
+        row = data['product_performance'][0]
+        self.assertEqual(row['period_views'], 2)
+        self.assertEqual(row['total_views'], 2)
+        self.assertEqual(row['period_whatsapp_clicks'], 1)
+        self.assertEqual(row['total_whatsapp_clicks'], 1)
+        self.assertEqual(row['wishlist_count'], 1)
+        self.assertEqual(row['conversion_intent_pct'], 50.0)
+        self.assertTrue(row['primary_image'].endswith('.jpg'))
+
+    def test_reads_use_rollups_and_the_worker_folds(self):
+        self._add_products(1)
+        self._count_queries()
+        AnalyticsEvent.objects.create(event_type='product_view', product=Product.objects.get())
+
+        res = self.client.get("/api/v1/admin/analytics/?days=30")
+        self.assertEqual(res.data['product_performance'][0]['total_views'], 2)
+
+        out = StringIO()
+        call_command('run_analytics_jobs', '--once', stdout=out)
+        self.assertIn('Folded 1 new events', out.getvalue())
+        res = self.client.get("/api/v1/admin/analytics/?days=30")
+        self.assertEqual(res.data['product_performance'][0]['total_views'], 3)
+        self.assertEqual(InsightSnapshot.objects.count(), 1)
+
+
+class AdminProductListQueryBudgetTestCase(APITestCase):
+    """The admin product list annotates its engagement counters and issues a fixed number of queries per page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Gamosa", slug="gamosa")
+        cls.owner = User.objects.create_superuser(
+            username="product_list_owner",
+            email="product_list_owner@ebasistore.com",
+            password="OwnerPassword123!"
+        )
+        cls.shopper = User.objects.create_user(username="product_list_shopper", password="ShopperPassword123!")
+
+    def setUp(self):
+        self.client.force_authenticate(self.owner)
+
+    def _add_products(self, count):
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                name=f"Gamosa {i}",
+                slug=f"gamosa-{i}",
+                category=self.category,
+                price=500 + i,
+                sku=f"EBA-GAM{i:03d}"
+            )
+            ProductImage.objects.create(product=product, image=f"products/gamosa-{i}.jpg", is_primary=True)
+            AnalyticsEvent.objects.bulk_create(
+                [AnalyticsEvent(event_type='product_view', product=product) for _ in range(3)] +
+                [AnalyticsEvent(event_type='whatsapp_click', product=product)]
+            )
+            Wishlist.objects.create(user=self.owner, product=product)
+            Wishlist.objects.create(user=self.shopper, product=product)
+            Review.objects.create(product=product, user_name="Rupa", rating=4, comment="Soft cotton")
+
+    def _count_queries(self):
+        fold_new_events()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/v1/admin/products/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), res.data['results']
+
+    def test_query_count_is_independent_of_page_size(self):
+        self._add_products(2)
+        small_count, _ = self._count_queries()
+
+        self._add_products(18)
+        large_count, rows = self._count_queries()
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(rows), 20)
+
+    def test_counters(self):
+        unseen = Product.objects.create(
+            name="Plain Gamosa", slug="plain-gamosa", category=self.category, price=300, sku="EBA-GAMPLN"
+        )
+        self._add_products(1)
+        _, rows = self._count_queries()
+
+        by_id = {row['id']: row for row in rows}
+        row = by_id[Product.objects.get(slug='gamosa-1').id]
+        self.assertEqual(row['views_count'], 3)
+        self.assertEqual(row['whatsapp_clicks_count'], 1)
+        self.assertEqual(row['wishlist_count'], 2)
+        self.assertEqual(row['review_count'], 1)
+        self.assertEqual(row['average_rating'], 4.0)
+        self.assertEqual(by_id[unseen.id]['views_count'], 0)
+        self.assertEqual(by_id[unseen.id]['wishlist_count'], 0)
+
+    def test_grid_view(self):
+        self._add_products(3)
+        fold_new_events()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/v1/admin/products/?view=grid")
+        row = res.data['results'][0]
+        self.assertNotIn('images', row)
+        self.assertNotIn('description', row)
+        self.assertEqual(row['views_count'], 3)
+        self.assertTrue(row['primary_image'].endswith('.jpg'))
+        self.assertFalse(any('SHOP_productvideo' in query['sql'] for query in ctx.captured_queries))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/v1/admin/products/?fields=name,sku")
+        self.assertEqual(set(res.data['results'][0]), {'id', 'name', 'sku'})
+        self.assertFalse(any('analytics' in query['sql'].lower() for query in ctx.captured_queries))
+
+    def test_reads_do_not_fold_new_events(self):
+        self._add_products(1)
+        fold_new_events()
+        [product] = Product.objects.all()
+        AnalyticsEvent.objects.create(event_type='product_view', product=product)
+
+        res = self.client.get(f"/api/v1/admin/products/{product.id}/")
+        self.assertEqual(res.data['views_count'], 3)
+        self.assertEqual(AnalyticsEvent.objects.filter(id__gt=AnalyticsRollupState.get_solo().last_event_id).count(), 1)
+
+        fold_new_events()
+        res = self.client.get(f"/api/v1/admin/products/{product.id}/")
+        self.assertEqual(res.data['views_count'], 4)
+
+
+class AdminDashboardSnapshotTestCase(APITestCase):
+    """The dashboard is computed with a fixed number of queries and served from a cached snapshot."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Gamusa", slug="gamusa")
+        cls.owner = User.objects.create_superuser(
+            username="dashboard_owner",
+            email="dashboard_owner@ebasistore.com",
+            password="OwnerPassword123!"
+        )
+        cls.owner_token = Token.objects.create(user=cls.owner)
+
+    def setUp(self):
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.owner_token.key}")
+
+    def _add_product(self, i, **kwargs):
+        return Product.objects.create(
+            name=f"Dashboard Gamusa {i}",
+            slug=f"dashboard-gamusa-{i}",
+            category=self.category,
+            price=500 + i,
+            sku=f"EBA-DSH{i:03d}",
+            **kwargs
+        )
+
+    def _get(self):
+        fold_new_events()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/v1/admin/dashboard/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), res.data
+
+    def test_query_count_is_independent_of_data_size(self):
+        self._add_product(1)
+        small_count, _ = self._get()
+
+        for i in range(2, 12):
+            product = self._add_product(i, stock_status='out_of_stock')
+            AnalyticsEvent.objects.create(event_type='page_view')
+            AnalyticsEvent.objects.create(event_type='whatsapp_click', product=product)
+        ContactMessage.objects.create(name="Ritu", email="ritu@example.com", message="Hello")
+        cache.clear()
+        large_count, data = self._get()
+
+        self.assertEqual(small_count, large_count)
+        summary = data['inventory_summary']
+        self.assertEqual(summary['total_products'], 11)
+        self.assertEqual(summary['active_products'], 11)
+        self.assertEqual(summary['out_of_stock_products'], 10)
+        self.assertEqual(summary['unread_messages'], 1)
+        self.assertEqual(data['kpis']['page_views']['total'], 10)
+
+    def test_snapshot_is_cached_and_invalidated_by_changes(self):
+        self._add_product(1)
+        first_count, first = self._get()
+        cached_count, cached = self._get()
+        self.assertLess(cached_count, first_count)
+        self.assertEqual(cached['generated_at'], first['generated_at'])
+
+        self._add_product(2)
+        _, data = self._get()
+        self.assertEqual(data['inventory_summary']['total_products'], 2)
+
+        ContactMessage.objects.create(name="Ritu", email="ritu@example.com", message="Hello")
+        _, data = self._get()
+        self.assertEqual(data['inventory_summary']['unread_messages'], 1)
+
+
+class AdminInsightsSnapshotTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Eri Shawls", slug="eri-shawls")
+        cls.owner = User.objects.create_superuser(
+            username="insights_owner",
+            email="insights_owner@ebasistore.com",
+            password="OwnerPassword123!"
+        )
+        cls.owner_token = Token.objects.create(user=cls.owner)
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.owner_token.key}")
+
+    def _add_products(self, count, views=0, clicks=0):
+        products = []
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                name=f"Eri Shawl {i}",
+                slug=f"eri-shawl-{i}",
+                category=self.category,
+                price=2000 + i,
+                sku=f"EBA-ERI{i:03d}"
+            )
+            AnalyticsEvent.objects.bulk_create(
+                [AnalyticsEvent(event_type='product_view', product=product) for _ in range(views)] +
+                [AnalyticsEvent(event_type='whatsapp_click', product=product) for _ in range(clicks)]
+            )
+            products.append(product)
+        return products
+
+    def _count_queries(self):
+        fold_new_events()
+        with CaptureQueriesContext(connection) as ctx:
+            insights = compute_insights()
+        return len(ctx.captured_queries), insights
+
+    def test_bottleneck_detection_is_set_based(self):
+        self._add_products(2, views=3, clicks=1)
+        small_count, _ = self._count_queries()
+
+        [quiet] = self._add_products(1, views=4)
+        [bottleneck] = self._add_products(1, views=9)
+        self._add_products(10, views=12, clicks=2)
+        large_count, insights = self._count_queries()
+
+        self.assertEqual(small_count, large_count)
+        [opportunity] = [i for i in insights if i['type'] == 'conversion_opportunity']
+        self.assertEqual(opportunity['product_id'], bottleneck.id)
+        self.assertIn('9 views', opportunity['description'])
+
+    def test_endpoint_serves_latest_snapshot(self):
+        [product] = self._add_products(1, clicks=2)
+        fold_new_events()
+        res = self.client.get("/api/v1/admin/insights/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['insights'][0]['product_id'], product.id)
+        self.assertEqual(InsightSnapshot.objects.count(), 1)
+
+        # A fresh snapshot is served as-is, without recomputing.
+        self._add_products(1, clicks=5)
+        with self.assertNumQueries(2):  # token auth + latest snapshot
+            res = self.client.get("/api/v1/admin/insights/")
+        self.assertEqual(res.data['insights'][0]['product_id'], product.id)
+
+        call_command('refresh_insights', stdout=StringIO())
+        res = self.client.get("/api/v1/admin/insights/")
+        self.assertNotEqual(res.data['insights'][0]['product_id'], product.id)
+        self.assertEqual(InsightSnapshot.objects.count(), 2)
+
+
+class AdminKeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_superuser(
+            username="cursor_owner",
+            email="cursor_owner@ebasistore.com",
+            password="OwnerPassword123!"
+        )
+        self.client.force_authenticate(self.owner)
+        AuditLog.objects.bulk_create([
+            AuditLog(actor=self.owner, actor_username=self.owner.username, action='product.update', target_repr=f"Saree {i}")
+            for i in range(45)
+        ])
+
+    def test_audit_log_cursor_walk(self):
+        seen = []
+        url = "/api/v1/admin/audit-logs/?cursor="
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(row['id'] for row in res.data['results'])
+            url = res.data['next']
+        self.assertEqual(seen, list(AuditLog.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+
+class AdminAnalyticsSeriesTestCase(TestCase):
+    """Time series buckets are computed in one query and aligned to the store timezone."""
+
+    def setUp(self):
+        self.now = datetime(2026, 1, 10, 12, 0, tzinfo=dt_timezone.utc)
+
+    def _event(self, event_type, created_at):
+        event = AnalyticsEvent.objects.create(event_type=event_type)
+        AnalyticsEvent.objects.filter(pk=event.pk).update(created_at=created_at)
+
+    def test_single_query_for_a_full_year(self):
+        with self.assertNumQueries(1):
+            series = build_event_series(365, 'day', now=self.now)
+        self.assertEqual(len(series), 365)
+        self.assertEqual(series[-1]['date'], '2026-01-10')
+
+    @override_settings(STORE_TIME_ZONE='Asia/Kolkata')
+    def test_day_buckets_follow_store_timezone(self):
+        # 20:00 UTC on Jan 8 is 01:30 IST on Jan 9.
+        self._event('page_view', datetime(2026, 1, 8, 20, 0, tzinfo=dt_timezone.utc))
+        self._event('whatsapp_click', datetime(2026, 1, 8, 10, 0, tzinfo=dt_timezone.utc))
+
+        fold_new_events()
+        series = {row['date']: row for row in build_event_series(7, 'day', now=self.now)}
+        self.assertEqual(series['2026-01-09']['page_views'], 1)
+        self.assertEqual(series['2026-01-08']['page_views'], 0)
+        self.assertEqual(series['2026-01-08']['whatsapp_clicks'], 1)
+
+    @override_settings(STORE_TIME_ZONE='Asia/Kolkata')
+    def test_hour_and_week_buckets_are_zero_filled(self):
+        self._event('product_view', datetime(2026, 1, 10, 6, 45, tzinfo=dt_timezone.utc))
+
+        hourly = build_event_series(7, 'hour', now=self.now)
+        self.assertEqual(len(hourly), 7 * 24)
+        self.assertEqual(sum(row['product_views'] for row in hourly), 1)
+        self.assertEqual(next(row for row in hourly if row['product_views'])['date'], '2026-01-10T12:00')
+
+        fold_new_events()
+        weekly = build_event_series(14, 'week', now=self.now)
+        self.assertEqual([row['date'] for row in weekly], ['2025-12-22', '2025-12-29', '2026-01-05'])
+        self.assertEqual(weekly[-1]['product_views'], 1)
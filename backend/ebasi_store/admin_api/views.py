@@ -6,15 +6,28 @@ from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.db.models import Count, Avg, Q, F, Max, Min, Prefetch
+from django.db.models import Count, Avg, Q, F, Max, Min, Sum, Prefetch, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
 from django.db import transaction
 from datetime import timedelta, datetime
 
-from SHOP.models import Product, Category, Review, ProductImage, ProductVideo, AnalyticsEvent
+from SHOP.models import Product, Category, Review, ProductImage, ProductVideo, AnalyticsEvent, AnalyticsDailyRollup
+from SHOP.rollups import day_start
+from SHOP.pagination import KeysetPagination
 from SHOP.serializers import get_complete_url
+from SHOP.fieldsets import SparseFieldsetViewMixin
 from accounts.models import ContactMessage, StaffProfile
 from orders.models import Wishlist
 from .models import AuditLog, log_audit
+from .insights import get_insight_snapshot, refresh_insight_snapshot
+from .analytics import (
+    SERIES_BUCKETS,
+    build_event_series,
+    get_dashboard_snapshot,
+    get_store_timezone,
+    invalidate_dashboard_snapshot,
+    store_today
+)
 from .permissions import (
     Roles,
     RequireStaffPermission,
@@ -78,61 +91,57 @@ class AdminDashboardView(APIView):
     required_permission = 'dashboard.view'
 
     def get(self, request):
+        if request.query_params.get('refresh') in ('1', 'true'):
+            invalidate_dashboard_snapshot()
+        return Response(get_dashboard_snapshot(self.build_snapshot))
+
+    def build_snapshot(self):
+        """Computes the dashboard payload with a fixed number of queries, independent of table sizes."""
         now = timezone.now()
-        seven_days_ago = now - timedelta(days=7)
-        fourteen_days_ago = now - timedelta(days=14)
-
-        # 1. Content Counts
-        total_products = Product.objects.count()
-        active_products = Product.objects.filter(is_active=True).count()
-        out_of_stock_products = Product.objects.filter(stock_status='out_of_stock').count()
-        limited_stock_products = Product.objects.filter(stock_status='limited_stock').count()
-        total_categories = Category.objects.count()
-        active_categories = Category.objects.filter(is_active=True).count()
+
+        # 1. Content Counts (one conditional aggregate per table)
+        product_counts = Product.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            out_of_stock=Count('id', filter=Q(stock_status='out_of_stock')),
+            limited_stock=Count('id', filter=Q(stock_status='limited_stock'))
+        )
+        category_counts = Category.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True))
+        )
+        message_counts = ContactMessage.objects.aggregate(
+            total=Count('id'),
+            unread=Count('id', filter=Q(is_read=False))
+        )
         total_reviews = Review.objects.count()
-        unread_messages = ContactMessage.objects.filter(is_read=False).count()
-        total_messages = ContactMessage.objects.count()
-
-        # 2. Activity Metrics (Last 7 days vs Previous 7 days for trend indicators)
-        current_page_views = AnalyticsEvent.objects.filter(
-            event_type='page_view',
-            created_at__gte=seven_days_ago
-        ).count()
-        prev_page_views = AnalyticsEvent.objects.filter(
-            event_type='page_view',
-            created_at__gte=fourteen_days_ago,
-            created_at__lt=seven_days_ago
-        ).count()
-
-        current_product_views = AnalyticsEvent.objects.filter(
-            event_type='product_view',
-            created_at__gte=seven_days_ago
-        ).count()
-        prev_product_views = AnalyticsEvent.objects.filter(
-            event_type='product_view',
-            created_at__gte=fourteen_days_ago,
-            created_at__lt=seven_days_ago
-        ).count()
-
-        current_whatsapp_clicks = AnalyticsEvent.objects.filter(
-            event_type='whatsapp_click',
-            created_at__gte=seven_days_ago
-        ).count()
-        prev_whatsapp_clicks = AnalyticsEvent.objects.filter(
-            event_type='whatsapp_click',
-            created_at__gte=fourteen_days_ago,
-            created_at__lt=seven_days_ago
-        ).count()
-
-        current_wishlist_adds = AnalyticsEvent.objects.filter(
-            event_type='wishlist_add',
-            created_at__gte=seven_days_ago
-        ).count()
-        prev_wishlist_adds = AnalyticsEvent.objects.filter(
-            event_type='wishlist_add',
-            created_at__gte=fourteen_days_ago,
-            created_at__lt=seven_days_ago
-        ).count()
+
+        # 2. Activity Metrics (last 7 store days vs the 7 days before, for trend indicators)
+        today = store_today(now)
+        current_start = today - timedelta(days=6)
+        prev_start = today - timedelta(days=13)
+        activity = {
+            row['event_type']: row
+            for row in AnalyticsDailyRollup.objects.filter(
+                event_type__in=['page_view', 'product_view', 'whatsapp_click', 'wishlist_add']
+            ).order_by().values('event_type').annotate(
+                total=Sum('count'),
+                current=Sum('count', filter=Q(day__gte=current_start)),
+                prev=Sum('count', filter=Q(day__gte=prev_start, day__lt=current_start))
+            )
+        }
+
+        def activity_count(event_type, key):
+            return (activity.get(event_type) or {}).get(key) or 0
+
+        current_page_views = activity_count('page_view', 'current')
+        prev_page_views = activity_count('page_view', 'prev')
+        current_product_views = activity_count('product_view', 'current')
+        prev_product_views = activity_count('product_view', 'prev')
+        current_whatsapp_clicks = activity_count('whatsapp_click', 'current')
+        prev_whatsapp_clicks = activity_count('whatsapp_click', 'prev')
+        current_wishlist_adds = activity_count('wishlist_add', 'current')
+        prev_wishlist_adds = activity_count('wishlist_add', 'prev')
 
         def calc_trend(current, prev):
             if prev > 0:
@@ -184,27 +193,28 @@ class AdminDashboardView(APIView):
         recent_activity.sort(key=lambda x: x['created_at'], reverse=True)
         recent_activity = recent_activity[:10]
 
-        top_whatsapp_products_raw = AnalyticsEvent.objects.filter(
+        top_whatsapp_products_raw = AnalyticsDailyRollup.objects.filter(
             event_type='whatsapp_click',
             product__isnull=False
         ).values('product__id', 'product__name', 'product__slug', 'product__price').annotate(
-            whatsapp_count=Count('id')
+            whatsapp_count=Sum('count')
         ).order_by('-whatsapp_count')[:5]
 
-        return Response({
+        return {
+            'generated_at': now,
             'kpis': {
                 'page_views': {
-                    'total': AnalyticsEvent.objects.filter(event_type='page_view').count(),
+                    'total': activity_count('page_view', 'total'),
                     'last_7_days': current_page_views,
                     'trend': calc_trend(current_page_views, prev_page_views)
                 },
                 'product_views': {
-                    'total': AnalyticsEvent.objects.filter(event_type='product_view').count(),
+                    'total': activity_count('product_view', 'total'),
                     'last_7_days': current_product_views,
                     'trend': calc_trend(current_product_views, prev_product_views)
                 },
                 'whatsapp_clicks': {
-                    'total': AnalyticsEvent.objects.filter(event_type='whatsapp_click').count(),
+                    'total': activity_count('whatsapp_click', 'total'),
                     'last_7_days': current_whatsapp_clicks,
                     'trend': calc_trend(current_whatsapp_clicks, prev_whatsapp_clicks)
                 },
@@ -215,19 +225,19 @@ class AdminDashboardView(APIView):
                 }
             },
             'inventory_summary': {
-                'total_products': total_products,
-                'active_products': active_products,
-                'out_of_stock_products': out_of_stock_products,
-                'limited_stock_products': limited_stock_products,
-                'total_categories': total_categories,
-                'active_categories': active_categories,
+                'total_products': product_counts['total'],
+                'active_products': product_counts['active'],
+                'out_of_stock_products': product_counts['out_of_stock'],
+                'limited_stock_products': product_counts['limited_stock'],
+                'total_categories': category_counts['total'],
+                'active_categories': category_counts['active'],
                 'total_reviews': total_reviews,
-                'unread_messages': unread_messages,
-                'total_messages': total_messages
+                'unread_messages': message_counts['unread'],
+                'total_messages': message_counts['total']
             },
             'recent_activity': recent_activity,
             'top_whatsapp_products': list(top_whatsapp_products_raw)
-        })
+        }
 
 
 class AdminAnalyticsView(APIView):
@@ -240,41 +250,45 @@ class AdminAnalyticsView(APIView):
             days = 7
 
         now = timezone.now()
-        start_date = now - timedelta(days=days)
-
-        # 1. Daily Aggregations (Time Series)
-        daily_series = []
-        for i in range(days):
-            day_start = (now - timedelta(days=(days - 1 - i))).replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            day_label = day_start.strftime('%b %d')
-
-            events_in_day = AnalyticsEvent.objects.filter(created_at__gte=day_start, created_at__lt=day_end)
-            
-            pviews = events_in_day.filter(event_type='page_view').count()
-            prod_views = events_in_day.filter(event_type='product_view').count()
-            wa_clicks = events_in_day.filter(event_type='whatsapp_click').count()
-            wl_adds = events_in_day.filter(event_type='wishlist_add').count()
-
-            daily_series.append({
-                'date': day_start.strftime('%Y-%m-%d'),
-                'label': day_label,
-                'page_views': pviews,
-                'product_views': prod_views,
-                'whatsapp_clicks': wa_clicks,
-                'wishlist_adds': wl_adds
-            })
+        period_start = store_today(now) - timedelta(days=days - 1)
+
+        # 1. Time Series (single grouped query, zero-filled per bucket)
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in SERIES_BUCKETS:
+            bucket = 'day'
+        daily_series = build_event_series(days, bucket, now=now)
 
         # 2. Product Performance Breakdown
-        all_products = Product.objects.all()
+        # Set-based: one grouped pass over the rollups, one grouped wishlist count and
+        # one product query with prefetched images, independent of catalog size.
+        event_counts = {
+            row['product_id']: row
+            for row in AnalyticsDailyRollup.objects.filter(
+                product__isnull=False,
+                event_type__in=['product_view', 'whatsapp_click']
+            ).order_by().values('product_id').annotate(
+                period_views=Sum('count', filter=Q(event_type='product_view', day__gte=period_start)),
+                total_views=Sum('count', filter=Q(event_type='product_view')),
+                period_whatsapp_clicks=Sum('count', filter=Q(event_type='whatsapp_click', day__gte=period_start)),
+                total_whatsapp_clicks=Sum('count', filter=Q(event_type='whatsapp_click'))
+            )
+        }
+        wishlist_counts = dict(
+            Wishlist.objects.order_by().values('product_id').annotate(
+                wl_count=Count('id')
+            ).values_list('product_id', 'wl_count')
+        )
+        all_products = Product.objects.select_related('category').prefetch_related('images')
         product_performance = []
+        empty_counts = {}
 
         for prod in all_products:
-            p_views = AnalyticsEvent.objects.filter(product=prod, event_type='product_view', created_at__gte=start_date).count()
-            total_p_views = AnalyticsEvent.objects.filter(product=prod, event_type='product_view').count()
-            p_wa = AnalyticsEvent.objects.filter(product=prod, event_type='whatsapp_click', created_at__gte=start_date).count()
-            total_p_wa = AnalyticsEvent.objects.filter(product=prod, event_type='whatsapp_click').count()
-            p_wl = prod.wishlisted_by.count()
+            counts = event_counts.get(prod.id, empty_counts)
+            p_views = counts.get('period_views') or 0
+            total_p_views = counts.get('total_views') or 0
+            p_wa = counts.get('period_whatsapp_clicks') or 0
+            total_p_wa = counts.get('total_whatsapp_clicks') or 0
+            p_wl = wishlist_counts.get(prod.id, 0)
 
             conv_pct = round((p_wa / p_views * 100), 1) if p_views > 0 else 0.0
 
@@ -306,10 +320,10 @@ class AdminAnalyticsView(APIView):
 
         product_performance.sort(key=lambda x: (x['period_whatsapp_clicks'], x['period_views']), reverse=True)
 
-        # 3. Search Behavior Analytics
+        # 3. Search Behavior Analytics (search terms are not rolled up; read raw events)
         search_events = AnalyticsEvent.objects.filter(
             event_type='search',
-            created_at__gte=start_date
+            created_at__gte=day_start(period_start)
         ).exclude(search_query='')
 
         top_searches_query = search_events.values('search_query').annotate(
@@ -322,9 +336,14 @@ class AdminAnalyticsView(APIView):
         ]
 
         # 4. Conversion Intent Funnel
-        total_period_views = AnalyticsEvent.objects.filter(event_type='product_view', created_at__gte=start_date).count()
-        total_period_wl = AnalyticsEvent.objects.filter(event_type='wishlist_add', created_at__gte=start_date).count()
-        total_period_wa = AnalyticsEvent.objects.filter(event_type='whatsapp_click', created_at__gte=start_date).count()
+        funnel_counts = AnalyticsDailyRollup.objects.filter(day__gte=period_start).aggregate(
+            views=Sum('count', filter=Q(event_type='product_view')),
+            wishlist=Sum('count', filter=Q(event_type='wishlist_add')),
+            whatsapp=Sum('count', filter=Q(event_type='whatsapp_click'))
+        )
+        total_period_views = funnel_counts['views'] or 0
+        total_period_wl = funnel_counts['wishlist'] or 0
+        total_period_wa = funnel_counts['whatsapp'] or 0
 
         funnel = {
             'product_views': total_period_views,
@@ -336,6 +355,8 @@ class AdminAnalyticsView(APIView):
 
         return Response({
             'timeframe_days': days,
+            'bucket': bucket,
+            'timezone': str(get_store_timezone()),
             'daily_series': daily_series,
             'product_performance': product_performance,
             'top_searches': top_searches,
@@ -348,95 +369,45 @@ class AdminInsightsView(APIView):
     required_permission = 'dashboard.view'
 
     def get(self, request):
-        insights = []
-
-        # 1. Top WhatsApp High Performers
-        top_wa_events = AnalyticsEvent.objects.filter(
-            event_type='whatsapp_click',
-            product__isnull=False
-        ).values('product__id', 'product__name', 'product__slug', 'product__stock_status').annotate(
-            clicks=Count('id')
-        ).order_by('-clicks')[:3]
-
-        if top_wa_events.exists() and top_wa_events[0]['clicks'] > 0:
-            top_prod = top_wa_events[0]
-            insights.append({
-                'type': 'high_performer',
-                'severity': 'success',
-                'title': f"Top Purchase Intent: {top_prod['product__name']}",
-                'description': f"Generated {top_prod['clicks']} direct WhatsApp inquiries. Ensure adequate stock levels to satisfy active customer interest.",
-                'product_id': top_prod['product__id'],
-                'product_slug': top_prod['product__slug']
-            })
-
-        # 2. High Views but Low WhatsApp Clicks
-        bottleneck_candidates = []
-        for prod in Product.objects.filter(is_active=True):
-            views = AnalyticsEvent.objects.filter(product=prod, event_type='product_view').count()
-            wa = AnalyticsEvent.objects.filter(product=prod, event_type='whatsapp_click').count()
-            if views >= 5 and wa == 0:
-                bottleneck_candidates.append((prod, views))
-
-        if bottleneck_candidates:
-            bottleneck_candidates.sort(key=lambda x: x[1], reverse=True)
-            top_bottleneck = bottleneck_candidates[0]
-            insights.append({
-                'type': 'conversion_opportunity',
-                'severity': 'warning',
-                'title': f"High Views, Low Inquiries: {top_bottleneck[0].name}",
-                'description': f"Has received {top_bottleneck[1]} views but no WhatsApp clicks. Consider reviewing the price point, adding promotional badges, or enhancing product photos.",
-                'product_id': top_bottleneck[0].id,
-                'product_slug': top_bottleneck[0].slug
-            })
+        if request.query_params.get('refresh') in ('1', 'true'):
+            snapshot = refresh_insight_snapshot()
+        else:
+            snapshot = get_insight_snapshot()
+        return Response({'insights': snapshot.insights, 'generated_at': snapshot.generated_at})
 
-        # 3. High Wishlist Momentum
-        top_wl = Product.objects.annotate(wl_count=Count('wishlisted_by')).filter(wl_count__gt=0).order_by('-wl_count')[:1]
-        if top_wl.exists():
-            w_prod = top_wl[0]
-            insights.append({
-                'type': 'wishlist_momentum',
-                'severity': 'info',
-                'title': f"Customer Favorite: {w_prod.name}",
-                'description': f"Saved to wishlist by {w_prod.wl_count} customers. Consider featuring this item or creating a special showcase.",
-                'product_id': w_prod.id,
-                'product_slug': w_prod.slug
-            })
 
-        # 4. Out of Stock Alert
-        out_of_stock = Product.objects.filter(stock_status='out_of_stock', is_active=True).count()
-        if out_of_stock > 0:
-            insights.append({
-                'type': 'inventory_alert',
-                'severity': 'alert',
-                'title': f"{out_of_stock} Active Products Out of Stock",
-                'description': "Some active products are currently marked out of stock. Update availability or restock to avoid missed customer inquiries.",
-                'product_id': None,
-                'product_slug': None
-            })
+def _subquery_count(queryset):
+    """Coalesced scalar subquery over a `queryset` grouped to one row with a `total` column."""
+    return Coalesce(Subquery(queryset.values('total')[:1], output_field=IntegerField()), 0)
 
-        # 5. Unread Messages Alert
-        unread_count = ContactMessage.objects.filter(is_read=False).count()
-        if unread_count > 0:
-            insights.append({
-                'type': 'messages_alert',
-                'severity': 'alert',
-                'title': f"{unread_count} Unread Customer Messages",
-                'description': "You have new inquiries waiting in the Contact Inbox. Fast replies increase customer conversion.",
-                'product_id': None,
-                'product_slug': None
-            })
 
-        return Response({'insights': insights})
+def _rollup_total(event_type):
+    """All-time count of `event_type` events for the outer product, read from the daily rollups."""
+    return _subquery_count(
+        AnalyticsDailyRollup.objects.filter(
+            product=OuterRef('pk'),
+            event_type=event_type
+        ).order_by().values('product').annotate(total=Sum('count'))
+    )
 
 
-class AdminProductViewSet(viewsets.ModelViewSet):
+class AdminProductViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     permission_classes = [RequireStaffPermission]
     serializer_class = AdminProductSerializer
+    pagination_class = KeysetPagination
     parser_classes = [MultiPartParser, FormParser, JSONParser]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'sku', 'description', 'short_description', 'category__name']
     ordering_fields = ['created_at', 'price', 'name', 'stock_quantity', 'stock_status']
     ordering = ['-created_at']
+    # ?view=grid: the columns of the admin product table.
+    field_presets = {
+        'grid': (
+            'id', 'name', 'slug', 'sku', 'category', 'price', 'compare_price', 'stock_quantity',
+            'stock_status', 'badge', 'is_active', 'is_featured', 'primary_image',
+            'views_count', 'wishlist_count', 'whatsapp_clicks_count'
+        ),
+    }
 
     action_permissions = {
         'list': 'products.view',
@@ -453,15 +424,25 @@ class AdminProductViewSet(viewsets.ModelViewSet):
     }
 
     def get_queryset(self):
-        queryset = Product.objects.all().select_related('category').prefetch_related(
-            Prefetch('images', queryset=ProductImage.objects.order_by('-is_primary', 'order')),
-            'videos',
-            'reviews',
-            'wishlisted_by'
-        ).annotate(
-            annotated_review_count=Count('reviews', distinct=True),
-            annotated_avg_rating=Avg('reviews__rating')
-        )
+        # Ratings are denormalized on Product; engagement counters are correlated
+        # subqueries over the rollups and wishlist, so a page costs the same number
+        # of queries however many rows it has. Relations and counters left out by
+        # ?fields= / ?view= are not loaded.
+        queryset = Product.objects.all().select_related('category')
+        if self.wants_field('images', 'primary_image'):
+            queryset = queryset.prefetch_related(
+                Prefetch('images', queryset=ProductImage.objects.order_by('-is_primary', 'order'))
+            )
+        if self.wants_field('videos'):
+            queryset = queryset.prefetch_related('videos')
+        if self.wants_field('views_count'):
+            queryset = queryset.annotate(annotated_views_count=_rollup_total('product_view'))
+        if self.wants_field('whatsapp_clicks_count'):
+            queryset = queryset.annotate(annotated_whatsapp_count=_rollup_total('whatsapp_click'))
+        if self.wants_field('wishlist_count'):
+            queryset = queryset.annotate(annotated_wishlist_count=_subquery_count(
+                Wishlist.objects.filter(product=OuterRef('pk')).order_by().values('product').annotate(total=Count('id'))
+            ))
 
         category_id = self.request.query_params.get('category', None)
         if category_id:
@@ -1051,6 +1032,7 @@ class AdminAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [RequireStaffPermission]
     required_permission = 'audit.view'
     serializer_class = AuditLogSerializer
+    pagination_class = KeysetPagination
     queryset = AuditLog.objects.all().select_related('actor')
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['actor_username', 'action', 'target_repr']
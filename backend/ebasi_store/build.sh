@@ -6,4 +6,7 @@ pip install -r requirements.txt
 
 python manage.py collectstatic --noinput
 python manage.py migrate
+# Fold analytics events recorded since the last deploy into the dashboard rollups
+# (the Procfile worker keeps them current afterwards).
+python manage.py rollup_analytics
 python manage.py auto_create_superuser
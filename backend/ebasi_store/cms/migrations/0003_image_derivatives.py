@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0002_seed_initial_cms_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='herosection',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/AVIF copies (see SHOP.images).'),
+        ),
+        migrations.AddField(
+            model_name='pagecontent',
+            name='hero_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/AVIF copies (see SHOP.images).'),
+        ),
+        migrations.AddField(
+            model_name='pagecontent',
+            name='story_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/AVIF copies (see SHOP.images).'),
+        ),
+    ]
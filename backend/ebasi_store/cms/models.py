@@ -160,6 +160,7 @@ class HeroSection(models.Model):
         null=True,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'webp', 'avif'])]
     )
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized WebP/AVIF copies (see SHOP.images).")
     image_url_fallback = models.URLField(
         max_length=500,
         blank=True,
@@ -220,12 +221,14 @@ class PageContent(models.Model):
         null=True,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'webp', 'avif'])]
     )
+    hero_image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized WebP/AVIF copies (see SHOP.images).")
     story_image = models.ImageField(
         upload_to='cms/pages/',
         blank=True,
         null=True,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'webp', 'avif'])]
     )
+    story_image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized WebP/AVIF copies (see SHOP.images).")
 
     meta_title = models.CharField(max_length=200, blank=True)
     meta_description = models.TextField(blank=True)
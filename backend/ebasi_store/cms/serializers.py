@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from SHOP.serializers import image_sources
 from .models import StoreProfile, SocialLink, HeroSection, PageContent, MediaAsset
 
 
@@ -159,6 +160,7 @@ class HeroSectionSerializer(serializers.ModelSerializer):
 
 class PublicHeroSectionSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_sources = serializers.SerializerMethodField()
 
     class Meta:
         model = HeroSection
@@ -171,6 +173,7 @@ class PublicHeroSectionSerializer(serializers.ModelSerializer):
             'secondary_cta_text',
             'secondary_cta_link',
             'image_url',
+            'image_sources',
             'image_alt',
             'floating_card_title',
             'floating_card_subtitle',
@@ -183,6 +186,9 @@ class PublicHeroSectionSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url) if request else obj.image.url
         return obj.image_url_fallback or None
 
+    def get_image_sources(self, obj):
+        return image_sources(obj.image, obj.image_derivatives, self.context.get('request'))
+
 
 class PageContentSerializer(serializers.ModelSerializer):
     hero_image_url = serializers.SerializerMethodField()
@@ -226,7 +232,9 @@ class PageContentSerializer(serializers.ModelSerializer):
 
 class PublicPageContentSerializer(serializers.ModelSerializer):
     hero_image_url = serializers.SerializerMethodField()
+    hero_image_sources = serializers.SerializerMethodField()
     story_image_url = serializers.SerializerMethodField()
+    story_image_sources = serializers.SerializerMethodField()
 
     class Meta:
         model = PageContent
@@ -237,7 +245,9 @@ class PublicPageContentSerializer(serializers.ModelSerializer):
             'intro',
             'content_json',
             'hero_image_url',
+            'hero_image_sources',
             'story_image_url',
+            'story_image_sources',
             'meta_title',
             'meta_description',
             'last_updated_date',
@@ -255,6 +265,12 @@ class PublicPageContentSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.story_image.url) if request else obj.story_image.url
         return None
 
+    def get_hero_image_sources(self, obj):
+        return image_sources(obj.hero_image, obj.hero_image_derivatives, self.context.get('request'))
+
+    def get_story_image_sources(self, obj):
+        return image_sources(obj.story_image, obj.story_image_derivatives, self.context.get('request'))
+
 
 class MediaAssetSerializer(serializers.ModelSerializer):
     file_url = serializers.SerializerMethodField()
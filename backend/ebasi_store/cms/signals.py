@@ -0,0 +1,9 @@
+"""
+Generates responsive derivatives of uploaded page images (see SHOP.images).
+"""
+from SHOP.images import register_derivatives
+
+from .models import HeroSection, PageContent
+
+register_derivatives(HeroSection, 'image')
+register_derivatives(PageContent, 'hero_image', 'story_image')
@@ -70,6 +70,26 @@ class CmsSystemTestCase(TestCase):
             self.assertEqual(res.status_code, 200, f"Failed for page slug: {slug}")
             self.assertEqual(res.json()['slug'], slug)
 
+    def test_public_reads_support_conditional_get(self):
+        """Config and pages answer 304 while unchanged and revalidate with a single query."""
+        res = self.client.get('/api/v1/cms/config/')
+        etag = res['ETag']
+        with self.assertNumQueries(1):
+            res = self.client.get('/api/v1/cms/config/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        link = SocialLink.objects.first()
+        link.delete()
+        res = self.client.get('/api/v1/cms/config/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client.get('/api/v1/cms/pages/about/')
+        last_modified = res['Last-Modified']
+        res = self.client.get('/api/v1/cms/pages/about/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, 304)
+        res = self.client.get('/api/v1/cms/pages/about/', HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, 304)
+
     def test_public_page_invalid_slug_returns_404(self):
         """Invalid slug returns 404."""
         res = self.client.get('/api/v1/cms/pages/nonexistent-page-slug/')
@@ -2,8 +2,10 @@ from rest_framework import views, viewsets, status, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.db.models import Count, DateTimeField, IntegerField, Max, Subquery
 from django.shortcuts import get_object_or_404
 
+from SHOP.conditional import ConditionalGetMixin, aggregate_subquery, make_etag
 from admin_api.permissions import RequireStaffPermission
 from admin_api.models import log_audit
 from .models import StoreProfile, SocialLink, HeroSection, PageContent, MediaAsset
@@ -24,26 +26,51 @@ from .serializers import (
 # Public CMS Views (Storefront Consumption)
 # ==============================================================================
 
-class PublicCmsConfigView(views.APIView):
+class PublicCmsConfigView(ConditionalGetMixin, views.APIView):
     """
     Public unified endpoint returning active store profile, enabled social links,
     and homepage hero configuration in a single request.
     """
     permission_classes = [permissions.AllowAny]
 
+    def get_validators(self, request, *args, **kwargs):
+        # One query: the profile row plus subqueries over the hero and social links.
+        row = StoreProfile.objects.filter(id=1).annotate(
+            hero_updated_at=Subquery(HeroSection.objects.filter(id=1).values('updated_at')[:1]),
+            links_updated_at=aggregate_subquery(SocialLink.objects.all(), Max('updated_at'), DateTimeField()),
+            links_count=aggregate_subquery(SocialLink.objects.all(), Count('id'), IntegerField())
+        ).values('updated_at', 'hero_updated_at', 'links_updated_at', 'links_count').first()
+        if row is None or row['hero_updated_at'] is None:
+            return None
+        stamps = [row['updated_at'], row['hero_updated_at'], row['links_updated_at']]
+        etag = make_etag('cms-config', *[stamp.isoformat() if stamp else '' for stamp in stamps], row['links_count'])
+        return etag, max(stamp for stamp in stamps if stamp)
+
     def get(self, request):
+        return self.conditional_get(request, self.get_config)
+
+    def get_config(self, request):
         serializer = PublicCmsConfigSerializer(instance={}, context={'request': request})
         return Response(serializer.data)
 
 
-class PublicPageContentView(views.APIView):
+class PublicPageContentView(ConditionalGetMixin, views.APIView):
     """
     Public endpoint returning published page content for About Us, Privacy Policy,
     Terms of Service, and Contact page.
     """
     permission_classes = [permissions.AllowAny]
 
+    def get_validators(self, request, slug):
+        updated_at = PageContent.objects.filter(slug=slug, is_published=True).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None
+        return make_etag('cms-page', slug, updated_at.isoformat()), updated_at
+
     def get(self, request, slug):
+        return self.conditional_get(request, self.get_page, slug)
+
+    def get_page(self, request, slug):
         page = get_object_or_404(PageContent, slug=slug, is_published=True)
         serializer = PublicPageContentSerializer(page, context={'request': request})
         return Response(serializer.data)
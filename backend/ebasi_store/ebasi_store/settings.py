@@ -120,6 +120,70 @@ DATABASES = {
 }
 
 
+# Cache
+# Local memory by default; set REDIS_URL to share cached data between workers.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'ebasi',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ebasi-store',
+        }
+    }
+
+# Public catalog response cache (0 disables); entries are purged by tag on catalog changes.
+# Purges only reach other worker processes through a shared cache, so it is off by
+# default without REDIS_URL.
+CATALOG_CACHE_TTL = config('CATALOG_CACHE_TTL', default=300 if REDIS_URL else 0, cast=int)
+CATALOG_CACHE_GZIP = config('CATALOG_CACHE_GZIP', default=True, cast=bool)
+# Safety TTL for cached catalog price bounds (they are also invalidated on product changes).
+# Without REDIS_URL the invalidation only reaches the worker that made the change, so
+# other workers keep stale bounds until this expires.
+PRICE_BOUNDS_CACHE_TTL = config('PRICE_BOUNDS_CACHE_TTL', default=3600 if REDIS_URL else 60, cast=int)
+# Most products one products/batch/ request may ask for
+PRODUCT_BATCH_MAX_ITEMS = config('PRODUCT_BATCH_MAX_ITEMS', default=50, cast=int)
+# wishlist/sync/: most products per request, and how long a sync token stays usable
+# (an expired token makes the next sync a union instead of applying removals)
+WISHLIST_SYNC_MAX_ITEMS = config('WISHLIST_SYNC_MAX_ITEMS', default=500, cast=int)
+WISHLIST_SYNC_TOKEN_MAX_AGE = config('WISHLIST_SYNC_TOKEN_MAX_AGE', default=60 * 60 * 24 * 90, cast=int)
+# Upper bounds of the price facet buckets (the last bucket is open-ended)
+CATALOG_PRICE_BUCKETS = config('CATALOG_PRICE_BUCKETS', default='500,1000,2500,5000,10000,25000', cast=Csv(int))
+# Fuzzy product search (SHOP.fuzzy): minimum trigram similarity (0..1), per-search
+# time budget, result cap, and whether ?search= falls back to it when full-text finds nothing
+FUZZY_SEARCH_THRESHOLD = config('FUZZY_SEARCH_THRESHOLD', default=0.4, cast=float)
+FUZZY_SEARCH_BUDGET_MS = config('FUZZY_SEARCH_BUDGET_MS', default=150, cast=int)
+FUZZY_SEARCH_MAX_RESULTS = config('FUZZY_SEARCH_MAX_RESULTS', default=200, cast=int)
+FUZZY_SEARCH_FALLBACK = config('FUZZY_SEARCH_FALLBACK', default=True, cast=bool)
+# Autocomplete prefix index (SHOP.suggest): full rebuild interval, how often workers check
+# for catalog changes made by other workers, the popular-query window, and how many distinct
+# sessions must have searched a query before it is suggested to everyone
+SUGGEST_INDEX_MAX_AGE = config('SUGGEST_INDEX_MAX_AGE', default=600, cast=int)
+SUGGEST_INDEX_CHECK_SECONDS = config('SUGGEST_INDEX_CHECK_SECONDS', default=5, cast=int)
+SUGGEST_POPULAR_QUERY_DAYS = config('SUGGEST_POPULAR_QUERY_DAYS', default=30, cast=int)
+SUGGEST_POPULAR_QUERY_LIMIT = config('SUGGEST_POPULAR_QUERY_LIMIT', default=500, cast=int)
+SUGGEST_POPULAR_QUERY_MIN_SESSIONS = config('SUGGEST_POPULAR_QUERY_MIN_SESSIONS', default=5, cast=int)
+# Responsive image derivatives (SHOP.images): widths in px and formats (avif, webp) generated
+# for uploaded product, category and page images; formats Pillow cannot encode are skipped
+IMAGE_DERIVATIVE_WIDTHS = config('IMAGE_DERIVATIVE_WIDTHS', default='320,640,960,1440', cast=Csv(int))
+IMAGE_DERIVATIVE_FORMATS = config('IMAGE_DERIVATIVE_FORMATS', default='avif,webp', cast=Csv())
+# Encode uploads on a background thread once their save commits (off: inline, in the
+# request that saved them)
+IMAGE_DERIVATIVE_BACKGROUND = config('IMAGE_DERIVATIVE_BACKGROUND', default=True, cast=bool)
+# Seconds the admin dashboard snapshot is served from cache (0 disables caching)
+ADMIN_DASHBOARD_CACHE_TTL = config('ADMIN_DASHBOARD_CACHE_TTL', default=60, cast=int)
+# Age in seconds after which the insights endpoint recomputes its snapshot itself
+# (normally refreshed by `manage.py refresh_insights`; 0 never recomputes on read)
+INSIGHTS_SNAPSHOT_MAX_AGE = config('INSIGHTS_SNAPSHOT_MAX_AGE', default=900, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -146,6 +210,10 @@ LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
 
+# Local timezone of the physical store (Dhemaji, Assam). Used to align analytics
+# buckets (hours / days / weeks) with the store's business day.
+STORE_TIME_ZONE = config('STORE_TIME_ZONE', default='Asia/Kolkata')
+
 USE_I18N = True
 
 USE_TZ = True
@@ -208,9 +276,29 @@ REST_FRAMEWORK = {
         'user': '1000/minute',
         'sensitive_anon': '5/minute',
         'sensitive_user': '20/minute',
+        # Autocomplete is called per keystroke
+        'suggest': '600/minute',
     }
 }
 
+# Analytics ingestion ('sync' inserts per request; 'buffered' queues events in-process
+# and bulk-inserts them from a background thread; 'spool' appends JSON lines to a local
+# segment file loaded later by `manage.py load_analytics_spool`. Both answer 202 immediately)
+ANALYTICS_INGEST_MODE = config('ANALYTICS_INGEST_MODE', default='sync')
+ANALYTICS_BUFFER_MAX_EVENTS = config('ANALYTICS_BUFFER_MAX_EVENTS', default=5000, cast=int)
+ANALYTICS_BUFFER_FLUSH_SIZE = config('ANALYTICS_BUFFER_FLUSH_SIZE', default=200, cast=int)
+ANALYTICS_BUFFER_FLUSH_INTERVAL = config('ANALYTICS_BUFFER_FLUSH_INTERVAL', default=2.0, cast=float)
+ANALYTICS_SPOOL_DIR = config('ANALYTICS_SPOOL_DIR', default=str(BASE_DIR / 'analytics_spool'))
+ANALYTICS_SPOOL_SEGMENT_BYTES = config('ANALYTICS_SPOOL_SEGMENT_BYTES', default=16 * 1024 * 1024, cast=int)
+ANALYTICS_SPOOL_SEGMENT_SECONDS = config('ANALYTICS_SPOOL_SEGMENT_SECONDS', default=60, cast=int)
+# Largest batch accepted per track request (JSON list or NDJSON, optionally gzip-encoded)
+ANALYTICS_MAX_BATCH_EVENTS = config('ANALYTICS_MAX_BATCH_EVENTS', default=500, cast=int)
+ANALYTICS_MAX_INFLATED_BODY_SIZE = config('ANALYTICS_MAX_INFLATED_BODY_SIZE', default=5 * 1024 * 1024, cast=int)
+# Seconds an event id must have been visible before rollups fold past it, so transactions
+# still holding lower ids (buffer/spool bulk inserts) can commit first. Ignored on SQLite,
+# whose single writer never leaves lower ids uncommitted behind visible ones.
+ANALYTICS_ROLLUP_LAG_SECONDS = config('ANALYTICS_ROLLUP_LAG_SECONDS', default=60, cast=int)
+
 # NOTE: The final CORS settings below override this block — see lines 230+
 
 
@@ -268,14 +356,20 @@ CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
     'authorization',
+    'content-encoding',
     'content-type',
     'dnt',
+    'if-modified-since',
+    'if-none-match',
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
 ]
 
+# Let the storefront read validators for conditional GETs
+CORS_EXPOSE_HEADERS = ['etag', 'last-modified']
+
 # Security Headers & SSL Settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Wishlist
 from SHOP.serializers import ProductListSerializer
@@ -11,3 +12,14 @@ class WishlistSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'product_id', 'created_at']
         read_only_fields = ['created_at']
 
+
+
+class WishlistSyncSerializer(serializers.Serializer):
+    """The client's complete wishlist plus the token returned by its previous sync (if any)."""
+    product_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=True)
+    token = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate_product_ids(self, value):
+        if len(value) > settings.WISHLIST_SYNC_MAX_ITEMS:
+            raise serializers.ValidationError(f"At most {settings.WISHLIST_SYNC_MAX_ITEMS} products per sync.")
+        return list(dict.fromkeys(value))
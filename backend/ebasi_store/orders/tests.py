@@ -1,3 +1,109 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from SHOP.models import Category, Product, ProductImage, Review
+from .models import Wishlist
+
+
+class WishlistQueryCountTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='shopper', password='pass12345')
+        self.client.force_authenticate(self.user)
+        categories = [Category.objects.create(name=f"Category {i}", slug=f"category-{i}") for i in range(5)]
+        products = Product.objects.bulk_create([
+            Product(name=f"Product {i}", slug=f"product-{i}", sku=f"W-{i}", price=100 + i, category=categories[i % 5])
+            for i in range(200)
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f"products/{product.slug}-{order}.jpg", order=order, is_primary=order == 1)
+            for product in products for order in range(2)
+        ])
+        Review.objects.create(product=products[0], user_name='A', rating=4, comment='Good')
+        Wishlist.objects.bulk_create([Wishlist(user=self.user, product=product) for product in products])
+
+    def test_list_queries_do_not_grow_with_the_wishlist(self):
+        # count, wishlist rows joined with product and category, prefetched images
+        for page in (1, 10):
+            with self.assertNumQueries(3):
+                res = self.client.get('/api/v1/orders/wishlist/', {'page': page})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data['count'], 200)
+            self.assertEqual(len(res.data['results']), 20)
+
+        products = {}
+        for page in range(1, 11):
+            for item in self.client.get('/api/v1/orders/wishlist/', {'page': page}).data['results']:
+                products[item['product']['slug']] = item['product']
+        self.assertEqual(len(products), 200)
+        rated = products['product-0']
+        self.assertEqual((rated['average_rating'], rated['review_count']), (4.0, 1))
+        self.assertEqual(rated['category']['slug'], 'category-0')
+        self.assertTrue(rated['primary_image'].endswith('products/product-0-1.jpg'))
+
+    def test_include_categories_sideloads_each_category_once(self):
+        with self.assertNumQueries(3):
+            res = self.client.get('/api/v1/orders/wishlist/', {'include': 'categories'})
+        self.assertEqual(len(res.data['categories']), 5)
+        item = res.data['results'][0]
+        self.assertNotIn('category', item['product'])
+        category = Product.objects.get(slug=item['product']['slug']).category
+        self.assertEqual(res.data['categories'][str(item['product']['category_id'])]['slug'], category.slug)
+
+
+class WishlistSyncTestCase(APITestCase):
+    url = '/api/v1/orders/wishlist/sync/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='shopper', password='pass12345')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name="Sarees", slug="sarees")
+        self.products = Product.objects.bulk_create([
+            Product(name=f"Product {i}", slug=f"product-{i}", sku=f"S-{i}", price=100, category=category)
+            for i in range(60)
+        ])
+        self.ids = [product.id for product in self.products]
+
+    def _sync(self, product_ids, token=None):
+        res = self.client.post(self.url, {'product_ids': product_ids, 'token': token}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def stored(self):
+        return set(Wishlist.objects.filter(user=self.user).values_list('product_id', flat=True))
+
+    def test_login_merge_is_one_request(self):
+        Wishlist.objects.create(user=self.user, product=self.products[59])
+        local = self.ids[:50]
+        # products, savepoint, stored set, insert, release, merged items, images
+        with self.assertNumQueries(7):
+            data = self._sync(local + [999999])
+        self.assertEqual(self.stored(), set(local) | {self.ids[59]})
+        self.assertEqual(set(data['product_ids']), self.stored())
+        self.assertEqual(len(data['results']), 51)
+        self.assertEqual(data['ignored'], [999999])
+        self.assertEqual(data['removed'], [])
+
+    def test_token_applies_client_changes_and_keeps_changes_made_elsewhere(self):
+        token = self._sync(self.ids[:3])['token']
+        Wishlist.objects.create(user=self.user, product=self.products[10])  # added on another device
+
+        data = self._sync([self.ids[0], self.ids[2], self.ids[4]], token)  # removed 1, added 4
+        self.assertEqual(data['added'], [self.ids[4]])
+        self.assertEqual(data['removed'], [self.ids[1]])
+        self.assertEqual(self.stored(), {self.ids[0], self.ids[2], self.ids[4], self.ids[10]})
+
+        # Another user's (or a tampered) token is ignored: the sync falls back to a union.
+        other = User.objects.create_user(username='other', password='pass12345')
+        self.client.force_authenticate(other)
+        other_token = self._sync([])['token']
+        self.client.force_authenticate(self.user)
+        self._sync([], other_token)
+        self._sync([], token + 'x')
+        self.assertEqual(len(self.stored()), 4)
+
+    def test_rejects_oversized_payloads(self):
+        with self.settings(WISHLIST_SYNC_MAX_ITEMS=2):
+            res = self.client.post(self.url, {'product_ids': self.ids[:3]}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(self.url, {'product_ids': 'x'}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
@@ -2,16 +2,28 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
-from SHOP.models import Product
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import Prefetch
+from SHOP.models import Product, ProductImage
+from SHOP.sideload import CategorySideloadViewMixin
 from .models import Wishlist
-from .serializers import WishlistSerializer
+from .serializers import WishlistSerializer, WishlistSyncSerializer
 
-class WishlistViewSet(viewsets.ModelViewSet):
+SYNC_TOKEN_SALT = 'orders.wishlist.sync'
+
+
+class WishlistViewSet(CategorySideloadViewMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = WishlistSerializer
 
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user)
+        # ProductListSerializer reads the category and the images (primary first);
+        # ratings come from Product's stored summary, so the list takes constant queries.
+        return Wishlist.objects.filter(user=self.request.user).select_related('product__category').prefetch_related(
+            Prefetch('product__images', queryset=ProductImage.objects.order_by('-is_primary', 'order'))
+        )
 
     @action(detail=False, methods=['post'])
     def toggle(self, request):
@@ -27,6 +39,59 @@ class WishlistViewSet(viewsets.ModelViewSet):
         
         return Response({'status': 'added', 'product_id': product_id}, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Merges the client's wishlist with the stored one in one round trip.
+
+        POST {"product_ids": [...], "token": "<token from the last sync>"}. With a valid
+        token, products added or removed on the client since that sync are applied
+        and changes made elsewhere in the meantime are kept. Without one (e.g. at
+        login), the two wishlists are unioned. Returns the merged wishlist and a new token.
+        """
+        serializer = WishlistSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        client_ids = set(
+            Product.objects.filter(id__in=serializer.validated_data['product_ids']).order_by().values_list('id', flat=True)
+        )
+        last_synced = self.read_sync_token(serializer.validated_data.get('token'))
+
+        with transaction.atomic():
+            stored = set(Wishlist.objects.filter(user=request.user).order_by().values_list('product_id', flat=True))
+            if last_synced is None:
+                added, removed = client_ids - stored, set()
+            else:
+                added, removed = (client_ids - last_synced) - stored, (last_synced - client_ids) & stored
+            Wishlist.objects.bulk_create(
+                [Wishlist(user=request.user, product_id=product_id) for product_id in added],
+                ignore_conflicts=True
+            )
+            if removed:
+                Wishlist.objects.filter(user=request.user, product_id__in=removed).delete()
+
+        items = list(self.get_queryset())
+        merged = [item.product_id for item in items]
+        return Response({
+            'results': self.get_serializer(items, many=True).data,
+            'product_ids': merged,
+            'added': sorted(added),
+            'removed': sorted(removed),
+            'ignored': [product_id for product_id in serializer.validated_data['product_ids'] if product_id not in client_ids],
+            'token': signing.dumps({'user': request.user.pk, 'products': sorted(merged)}, salt=SYNC_TOKEN_SALT, compress=True),
+        })
+
+    def read_sync_token(self, token):
+        """The product ids recorded by this user's previous sync, or None for a missing or foreign token."""
+        if not token:
+            return None
+        try:
+            data = signing.loads(token, salt=SYNC_TOKEN_SALT, max_age=settings.WISHLIST_SYNC_TOKEN_MAX_AGE)
+        except signing.BadSignature:
+            return None
+        if data.get('user') != self.request.user.pk:
+            return None
+        return set(data.get('products', []))
+
     def destroy(self, request, pk=None):
         """Remove item from wishlist by product ID"""
         try:
@@ -87,6 +87,7 @@ export default function AdminProductsPage() {
     try {
       const [prodRes, catRes] = await Promise.all([
         adminApi.getProducts({
+          view: "grid",
           search: searchQuery,
           category: selectedCategory !== "all" ? selectedCategory : undefined,
           stock_status: selectedStockStatus !== "all" ? selectedStockStatus : undefined,
@@ -139,7 +140,15 @@ export default function AdminProductsPage() {
     setIsModalOpen(true)
   }
 
-  const openEditModal = (p: AdminProduct) => {
+  const openEditModal = async (row: AdminProduct) => {
+    // The table is loaded with ?view=grid; the form needs the full product.
+    let p: AdminProduct
+    try {
+      p = await adminApi.getProduct(row.id)
+    } catch (err: any) {
+      alert(`Could not load product details: ${err.message}`)
+      return
+    }
     setEditingProduct(p)
     setFormName(p.name)
     setFormSlug(p.slug)
@@ -19,6 +19,19 @@ function removeCookie(name) {
   document.cookie = `${name}=; path=/; max-age=0; SameSite=Lax`;
 }
 
+// List endpoints are requested with ?include=categories: each category is sent once in
+// `categories` and cards carry `category_id`. Re-attach the objects so callers see `category`.
+function expandCategories(data, productOf = (item) => item) {
+  if (!data || !data.categories) return data;
+  for (const item of data.results || []) {
+    const product = productOf(item);
+    if (product && product.category_id != null) {
+      product.category = data.categories[product.category_id] || null;
+    }
+  }
+  return data;
+}
+
 class EbasiAPI {
   // Token management
   getToken() {
@@ -217,14 +230,13 @@ class EbasiAPI {
           queryParams.append(key, value);
         }
       });
-      const queryString = queryParams.toString();
-      const url = `${API_BASE_URL}/products/${queryString ? `?${queryString}` : ''}`;
+      queryParams.set('include', 'categories');
+      const url = `${API_BASE_URL}/products/?${queryParams.toString()}`;
       const response = await fetch(url);
       if (!response.ok) {
         throw new Error(`API error (${response.status}): ${response.statusText}`);
       }
-      const data = await response.json();
-      return data;
+      return expandCategories(await response.json());
     } catch (error) {
       console.error('API Error in getProducts:', error);
       throw error;
@@ -233,9 +245,9 @@ class EbasiAPI {
 
   async searchProducts(query) {
     try {
-      const response = await fetch(`${API_BASE_URL}/products/?search=${encodeURIComponent(query)}`);
+      const response = await fetch(`${API_BASE_URL}/products/?search=${encodeURIComponent(query)}&include=categories`);
       if (!response.ok) return [];
-      const data = await response.json();
+      const data = expandCategories(await response.json());
       return Array.isArray(data) ? data : (data.results || []);
     } catch (error) {
       console.error('Search API Error:', error);
@@ -259,6 +271,18 @@ class EbasiAPI {
     }
   }
 
+  // Compact cards for many products at once; unchanged batches revalidate with a 304.
+  async getProductBatch(ids) {
+    try {
+      const response = await fetch(`${API_BASE_URL}/products/batch/?ids=${ids.join(',')}`);
+      if (!response.ok) return null;
+      return await response.json();
+    } catch (error) {
+      console.error('Product batch API Error:', error);
+      return null;
+    }
+  }
+
   _categoriesCache = null;
   _categoriesCacheTime = 0;
 
@@ -285,9 +309,9 @@ class EbasiAPI {
 
   async getFeaturedProducts() {
     try {
-      const response = await fetch(`${API_BASE_URL}/products/featured/`);
+      const response = await fetch(`${API_BASE_URL}/products/featured/?include=categories`);
       if (!response.ok) return { results: [] };
-      return await response.json();
+      return expandCategories(await response.json());
     } catch (error) {
       console.error('Featured Products API Error:', error);
       return { results: [] };
@@ -297,7 +321,7 @@ class EbasiAPI {
   // Wishlist
   async getWishlist() {
     try {
-      const response = await fetch(`${API_BASE_URL}/orders/wishlist/`, {
+      const response = await fetch(`${API_BASE_URL}/orders/wishlist/?include=categories`, {
         method: 'GET',
         headers: this.getHeaders(),
       });
@@ -306,7 +330,7 @@ class EbasiAPI {
         throw new Error('Failed to fetch wishlist');
       }
 
-      const data = await response.json();
+      const data = expandCategories(await response.json(), (item) => item.product);
       return Array.isArray(data) ? data : (data.results || []);
     } catch (error) {
       console.error('Get Wishlist Error:', error);
@@ -333,6 +357,19 @@ class EbasiAPI {
     }
   }
 
+  // Merges the local wishlist with the account's in one request (see wishlist.ts).
+  async syncWishlist(productIds, token) {
+    const response = await fetch(`${API_BASE_URL}/orders/wishlist/sync/`, {
+      method: 'POST',
+      headers: this.getHeaders(),
+      body: JSON.stringify({ product_ids: productIds, token: token || null }),
+    });
+    if (!response.ok) {
+      throw new Error('Failed to sync wishlist');
+    }
+    return await response.json();
+  }
+
   async deleteProduct(id) {
     try {
       const response = await fetch(`${API_BASE_URL}/admin/products/${id}/`, {
@@ -14,6 +14,8 @@ export interface WishlistItem {
 }
 
 const WISHLIST_KEY = 'ebasi_wishlist_items'
+const WISHLIST_SYNC_TOKEN_KEY = 'ebasi_wishlist_sync_token'
+const WISHLIST_REFRESHED_AT_KEY = 'ebasi_wishlist_refreshed_at'
 
 export function getLocalWishlist(): WishlistItem[] {
   if (typeof window === 'undefined') return []
@@ -80,6 +82,111 @@ export async function toggleWishlistItem(product: WishlistItem): Promise<boolean
   return !exists
 }
 
+// Auth token the wishlist was last synced for in this page load, and the sync in flight.
+let syncedAuthToken: string | null = null
+let pendingSync: Promise<boolean> | null = null
+
+// Merges the local wishlist with the signed-in account's in one request. The token from
+// the previous sync lets the server apply local removals; without one (first sync after
+// login) the two lists are unioned. Returns whether the sync succeeded.
+export async function syncWishlist(): Promise<boolean> {
+  if (typeof window === 'undefined' || !localStorage.getItem('authToken')) return false
+  try {
+    const token = localStorage.getItem(WISHLIST_SYNC_TOKEN_KEY)
+    const data = await api.syncWishlist(getLocalWishlist().map(item => item.id), token)
+    localStorage.setItem(WISHLIST_SYNC_TOKEN_KEY, data.token)
+    saveLocalWishlist(data.results.map((entry: any) => ({
+      id: entry.product.id,
+      name: entry.product.name,
+      slug: entry.product.slug,
+      price: entry.product.price,
+      compare_price: entry.product.compare_price,
+      primary_image: entry.product.primary_image,
+      stock_status: entry.product.stock_status,
+      category: entry.product.category,
+    })))
+    return true
+  } catch (err) {
+    console.warn('Wishlist sync failed, kept local copy:', err)
+    return false
+  }
+}
+
+// syncWishlist() once per login and page load. Concurrent callers (every mounted
+// useWishlist) share one in-flight sync; later ones read the result from localStorage.
+export function syncWishlistOnce(): Promise<boolean> {
+  if (typeof window === 'undefined') return Promise.resolve(false)
+  const authToken = localStorage.getItem('authToken')
+  if (!authToken) return Promise.resolve(false)
+  if (pendingSync) return pendingSync
+  if (syncedAuthToken === authToken) return Promise.resolve(true)
+  pendingSync = syncWishlist().then(synced => {
+    if (synced) syncedAuthToken = authToken
+    return synced
+  }).finally(() => {
+    pendingSync = null
+  })
+  return pendingSync
+}
+
+// The backend's PRODUCT_BATCH_MAX_ITEMS: larger wishlists are refreshed in several requests.
+const PRODUCT_BATCH_SIZE = 50
+// How long refreshed snapshots are trusted before useWishlist refreshes them again.
+const WISHLIST_REFRESH_MAX_AGE_MS = 10 * 60 * 1000
+
+let pendingRefresh: Promise<void> | null = null
+
+// Refreshes the price, stock and image snapshots of saved items with batch requests and
+// drops products that are gone. Items in a batch that failed are left as they are.
+export async function refreshLocalWishlist() {
+  const current = getLocalWishlist()
+  if (current.length === 0) return
+  const chunks: number[][] = []
+  for (let start = 0; start < current.length; start += PRODUCT_BATCH_SIZE) {
+    chunks.push(current.slice(start, start + PRODUCT_BATCH_SIZE).map(item => item.id))
+  }
+  const batches = (await Promise.all(chunks.map(ids => api.getProductBatch(ids)))).filter(Boolean)
+  if (batches.length === 0) return
+
+  const fresh = new Map<number, any>(batches.flatMap((batch: any) => batch.results.map((card: any) => [card.id, card])))
+  const missing = new Set<number>(batches.flatMap((batch: any) => batch.missing))
+  const updated = current
+    .filter(item => !missing.has(item.id))
+    .map(item => {
+      const card = fresh.get(item.id)
+      if (!card) return item
+      return {
+        ...item,
+        name: card.name,
+        slug: card.slug,
+        price: card.price,
+        compare_price: card.compare_price,
+        primary_image: card.primary_image,
+        stock_status: card.stock_status,
+        category: card.category,
+      }
+    })
+  if (JSON.stringify(updated) !== JSON.stringify(current)) {
+    saveLocalWishlist(updated)
+  }
+  if (batches.length === chunks.length) {
+    localStorage.setItem(WISHLIST_REFRESHED_AT_KEY, String(Date.now()))
+  }
+}
+
+// refreshLocalWishlist() unless the snapshots are recent. Concurrent callers (every
+// mounted useWishlist) share one in-flight refresh.
+export function refreshLocalWishlistIfStale(): Promise<void> {
+  if (typeof window === 'undefined') return Promise.resolve()
+  if (pendingRefresh) return pendingRefresh
+  const refreshedAt = Number(localStorage.getItem(WISHLIST_REFRESHED_AT_KEY)) || 0
+  if (Date.now() - refreshedAt < WISHLIST_REFRESH_MAX_AGE_MS) return Promise.resolve()
+  pendingRefresh = refreshLocalWishlist().finally(() => {
+    pendingRefresh = null
+  })
+  return pendingRefresh
+}
+
 export function isItemInWishlist(productId: number): boolean {
   const items = getLocalWishlist()
   return items.some(item => item.id === productId)
@@ -90,6 +197,11 @@ export function useWishlist() {
 
   useEffect(() => {
     setItems(getLocalWishlist())
+    if (localStorage.getItem('authToken')) {
+      syncWishlistOnce()
+    } else {
+      refreshLocalWishlistIfStale()
+    }
 
     const handleUpdate = () => {
       setItems(getLocalWishlist())